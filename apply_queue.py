@@ -0,0 +1,122 @@
+# apply_queue.py
+import collections
+import threading
+import time
+import traceback
+import types
+
+
+class ApplyQueue:
+    """
+    Scene work handed from the network thread to C4D's main thread.
+
+    Items are callables or generators. drain() runs them until the per-tick time
+    budget is spent; a generator that yields gives the UI a chance to breathe and
+    is resumed on the next tick, so large lists stream into the scene gradually.
+    A generator's on_pause is called whenever a tick ends with it suspended.
+    """
+
+    def __init__(self, budget_ms=15.0):
+        self.budget_ms = budget_ms
+        self.items = collections.deque()  # (enqueued_at, work, on_pause)
+        self.lock = threading.Lock()
+        self.applied = 0
+        self.ticks = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    def put(self, work, on_pause=None):
+        with self.lock:
+            self.items.append((time.perf_counter(), work, on_pause))
+
+    def clear(self):
+        """
+        Drops pending work; safe from any thread. Generators already started may
+        be suspended inside a SceneCommit, so they are closed by a queued item on
+        the draining (main) thread rather than here or by the garbage collector.
+        """
+        with self.lock:
+            dropped = [work for _, work, _ in self.items]
+            self.items.clear()
+            if any(isinstance(work, types.GeneratorType) for work in dropped):
+                self.items.append((time.perf_counter(), lambda: _close_all(dropped), None))
+
+    @property
+    def depth(self):
+        return len(self.items)
+
+    @property
+    def lag_ms(self):
+        """Age of the oldest pending item."""
+        with self.lock:
+            if not self.items:
+                return 0.0
+            return (time.perf_counter() - self.items[0][0]) * 1000.0
+
+    def metrics(self):
+        return {
+            "depth": self.depth,
+            "lag_ms": self.lag_ms,
+            "last_lag_ms": self.last_lag_ms,
+            "max_lag_ms": self.max_lag_ms,
+            "applied": self.applied,
+            "ticks": self.ticks,
+        }
+
+    def drain(self, budget_ms=None):
+        """
+        Runs queued work for at most budget_ms (None for the configured budget,
+        0 for no limit). Always makes progress on at least one step.
+        Returns True while work is left.
+        """
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        deadline = time.perf_counter() + budget_ms / 1000.0 if budget_ms else None
+        self.ticks += 1
+
+        while True:
+            with self.lock:
+                if not self.items:
+                    return False
+                enqueued_at, work, on_pause = self.items[0]
+
+            finished = True
+            try:
+                if isinstance(work, types.GeneratorType):
+                    try:
+                        next(work)
+                        finished = False
+                    except StopIteration:
+                        pass
+                else:
+                    work()
+            except Exception as e:
+                print(f"❌ Error applying queued work: {e}")
+                traceback.print_exc()
+                finished = True
+
+            if finished:
+                with self.lock:
+                    if self.items and self.items[0][1] is work:
+                        self.items.popleft()
+                self.applied += 1
+                self.last_lag_ms = (time.perf_counter() - enqueued_at) * 1000.0
+                self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+
+            if deadline is not None and time.perf_counter() >= deadline:
+                if not finished and on_pause is not None:
+                    try:
+                        on_pause()
+                    except Exception as e:
+                        print(f"❌ Error pausing queued work: {e}")
+                        traceback.print_exc()
+                return bool(self.items)
+
+
+def _close_all(work_items):
+    for work in work_items:
+        if isinstance(work, types.GeneratorType):
+            try:
+                work.close()
+            except Exception as e:
+                print(f"❌ Error closing dropped work: {e}")
+                traceback.print_exc()
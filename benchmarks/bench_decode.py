@@ -0,0 +1,120 @@
+"""Compare the struct-based object decoder against the original int.from_bytes path.
+
+    python benchmarks/bench_decode.py [num_objects] [triangles]
+"""
+import sys
+import time
+
+import numpy as np
+
+from synthetic import build_transaction, objects_payload
+from client import ObjectType, decode_object_data, decode_objects, mask_visible
+
+
+def legacy_decode_object_data(view, offset, use_pid_suffix=True):
+    object_type = int.from_bytes(view[offset:offset + 4], 'little')
+    offset += 4
+    object_id = int.from_bytes(view[offset:offset + 4], 'little')
+    offset += 4
+    version_id = int.from_bytes(view[offset:offset + 4], 'little')
+    offset += 4
+    parent_id = int.from_bytes(view[offset:offset + 4], 'little', signed=True)
+    offset += 4
+    material_id = int.from_bytes(view[offset:offset + 4], 'little', signed=True)
+    offset += 4
+    flags = int.from_bytes(view[offset:offset + 4], 'little')
+    offset += 4
+    name_length = int.from_bytes(view[offset:offset + 4], 'little')
+    offset += 4
+    name = view[offset:offset + name_length].tobytes().decode('utf-8')
+    offset += name_length
+    name_with_id = f"{name}_{object_id}" if use_pid_suffix else name
+    padding = (4 - (name_length % 4)) % 4
+    offset += padding
+
+    vertices = faces = normals = groups = face_ids = None
+
+    if object_type == ObjectType.SOLID.value or object_type == ObjectType.SHEET.value:
+        num_vertices = int.from_bytes(view[offset:offset + 4], 'little')
+        offset += 4
+        vertices = np.frombuffer(view[offset:offset + num_vertices * 12], dtype=np.float32)
+        offset += num_vertices * 12
+        num_faces = int.from_bytes(view[offset:offset + 4], 'little')
+        offset += 4
+        faces = np.frombuffer(view[offset:offset + num_faces * 12], dtype=np.int32)
+        offset += num_faces * 12
+        num_normals = int.from_bytes(view[offset:offset + 4], 'little')
+        offset += 4
+        normals = np.frombuffer(view[offset:offset + num_normals * 12], dtype=np.float32)
+        offset += num_normals * 12
+        num_groups = int.from_bytes(view[offset:offset + 4], 'little')
+        offset += 4
+        groups = np.frombuffer(view[offset:offset + num_groups * 4], dtype=np.int32).tolist()
+        offset += num_groups * 4
+        num_face_ids = int.from_bytes(view[offset:offset + 4], 'little')
+        offset += 4
+        face_ids = np.frombuffer(view[offset:offset + num_face_ids * 4], dtype=np.int32).tolist()
+        offset += num_face_ids * 4
+
+    final_name = name_with_id
+    if final_name and final_name[0].isdigit():
+        final_name = f"Null_{final_name}"
+
+    return object_type, object_id, version_id, parent_id, material_id, flags, final_name, vertices, faces, normals, offset, groups, face_ids
+
+
+def decode_all(decoder, payload):
+    view = memoryview(payload)
+    num_objects = int.from_bytes(view[:4], 'little')
+    offset = 4
+    results = []
+    for _ in range(num_objects):
+        result = decoder(view, offset)
+        offset = result[10]
+        results.append(result)
+    return results
+
+
+def same_results(a, b):
+    for x, y in zip(a, b):
+        if isinstance(x, np.ndarray) or isinstance(y, np.ndarray):
+            if not np.array_equal(x, y):
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    triangles = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    payload = objects_payload(build_transaction(num_objects, triangles))
+
+    legacy = decode_all(legacy_decode_object_data, payload)
+    current = decode_all(decode_object_data, payload)
+    assert len(legacy) == len(current) == num_objects
+    assert all(same_results(a, b) for a, b in zip(legacy, current)), "decoders disagree"
+
+    t_legacy = best_of(lambda: decode_all(legacy_decode_object_data, payload))
+    t_current = best_of(lambda: decode_all(decode_object_data, payload))
+    t_objects = best_of(lambda: decode_objects(payload))
+    t_selected = best_of(lambda: decode_objects(payload, select=lambda index: mask_visible(index) & (index["id"] % 10 == 0)))
+
+    print(f"{num_objects} objects, {triangles} triangles each ({len(payload) / 1e6:.1f} MB)")
+    print(f"  int.from_bytes decoder : {t_legacy * 1000:8.1f} ms")
+    print(f"  struct decoder         : {t_current * 1000:8.1f} ms  ({t_legacy / t_current:.2f}x)")
+    print(f"  decode_objects         : {t_objects * 1000:8.1f} ms")
+    print(f"  scan + 10% selection   : {t_selected * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Python-heap cost of decoding a list_all: per-object dicts with list channels vs PlasticityObject views.
+
+    python benchmarks/bench_memory.py [total_triangles] [num_objects]
+"""
+import sys
+import tracemalloc
+
+from synthetic import build_transaction, objects_payload
+from bench_decode import legacy_decode_object_data
+from client import decode_objects
+
+
+def legacy_decode_objects(payload):
+    view = memoryview(payload)
+    num_objects = int.from_bytes(view[:4], 'little')
+    offset = 4
+    objects = []
+    for _ in range(num_objects):
+        object_type, object_id, version_id, parent_id, material_id, flags, name, vertices, faces, normals, offset, groups, face_ids = legacy_decode_object_data(
+            view, offset)
+        objects.append({
+            "type": object_type, "id": object_id, "version": version_id, "parent_id": parent_id,
+            "material_id": material_id, "flags": flags, "name": name, "vertices": vertices,
+            "faces": faces, "normals": normals, "groups": groups, "face_ids": face_ids
+        })
+    return objects
+
+
+def measure(decoder, payload):
+    tracemalloc.start()
+    objects = decoder(payload)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current, peak
+
+
+def main():
+    total_triangles = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    num_objects = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    payload = objects_payload(build_transaction(num_objects, total_triangles // num_objects))
+
+    print(f"list_all with {num_objects} objects, {total_triangles} triangles ({len(payload) / 1e6:.1f} MB message)")
+    for label, decoder in (("dict + tolist()", legacy_decode_objects), ("PlasticityObject", decode_objects)):
+        retained, peak = measure(decoder, payload)
+        print(f"  {label:18}: retained {retained / 1e6:7.2f} MB, peak {peak / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""EventAdd and undo-step counts for a full list followed by an update of every object.
+
+The work is drained tick by tick with the dialog's apply budget, once with the undo
+group closed at every tick (before) and once with it kept open until the commit
+ends (after). Needs Cinema 4D's Python (c4dpy or the Script Manager with the repo
+on sys.path):
+
+    c4dpy benchmarks/bench_redraw.py [num_objects]
+"""
+import sys
+
+from synthetic import build_transaction, objects_payload
+from client import PlasticityObject, decode_objects
+
+import c4d
+
+from handler import SceneHandler
+from scene_commit import SceneCommit
+
+
+class Counter:
+    def __init__(self, target):
+        self.target = target
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.target(*args, **kwargs)
+
+
+def bumped(obj):
+    """Same object one version later, with every point moved."""
+    return PlasticityObject(obj.type, obj.id, obj.version + 1, obj.parent_id, obj.material_id, obj.flags, obj.name,
+                            obj.vertices * 1.01, obj.faces, obj.normals, obj.groups, obj.face_ids)
+
+
+class TickUI:
+    """Stands in for the dialog: work stays queued until apply_pending() drains it."""
+    def schedule_apply(self):
+        pass
+
+
+def run(handler, message):
+    """Applies message tick by tick with the handler's budget; returns (ticks, EventAdd calls)."""
+    event_add = c4d.EventAdd = Counter(c4d.EventAdd)
+    ticks = 0
+    try:
+        if "update" in message:
+            handler.on_transaction(message)
+        else:
+            handler.on_list(message)
+        while True:
+            ticks += 1
+            if not handler.apply_pending():
+                break
+    finally:
+        c4d.EventAdd = event_add.target
+    return ticks, event_add.calls
+
+
+def measure(objects, label):
+    handler = SceneHandler(plasticity_ui=TickUI())
+    stats = handler.commit_stats
+    filename = f"bench_redraw_{label}"
+    steps = [
+        ("list", {"filename": filename, "version": 1, "add": objects}),
+        ("update", {"filename": filename, "version": 2, "update": [bumped(obj) for obj in objects], "delete": []}),
+    ]
+    print(f"  {label}:")
+    for step, message in steps:
+        undo_groups = stats["undo_groups"]
+        ticks, calls = run(handler, message)
+        print(f"    {step:6}: {ticks} ticks, {calls} EventAdd, {stats['undo_groups'] - undo_groups} undo groups")
+
+
+def main():
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    objects = decode_objects(objects_payload(build_transaction(num_objects, 12, filename="bench_redraw")))
+
+    print(f"{num_objects} objects, {SceneHandler().apply_queue.budget_ms:.0f} ms per tick")
+
+    redraw = SceneCommit.redraw
+
+    def closing_redraw(commit):
+        commit.close_group()
+        redraw(commit)
+
+    SceneCommit.redraw = closing_redraw
+    try:
+        measure(objects, "before")
+    finally:
+        SceneCommit.redraw = redraw
+    measure(objects, "after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Synthetic Plasticity messages for the benchmarks in this folder."""
+import os
+import struct
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "libs")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import numpy as np
+
+from client import MessageType, ObjectType
+
+
+def _padded(data):
+    return data + b"\0" * ((4 - len(data) % 4) % 4)
+
+
+def _array(values, dtype, item_size):
+    data = np.ascontiguousarray(values, dtype=dtype).tobytes()
+    return struct.pack("<I", len(data) // item_size) + data
+
+
+def build_object(object_id, triangles=12, object_type=ObjectType.SOLID, parent_id=0, flags=2, version=1, seed=None):
+    """Encode one object record the way Plasticity does inside ADD_1/UPDATE_1."""
+    name = f"Solid {object_id}".encode("utf-8")
+    data = struct.pack("<IIIiiII", object_type.value, object_id, version, parent_id, -1, flags, len(name))
+    data += _padded(name)
+
+    if object_type in (ObjectType.SOLID, ObjectType.SHEET):
+        rng = np.random.default_rng(object_id if seed is None else seed)
+        num_vertices = triangles + 2
+        num_groups = max(1, triangles // 8)
+        group_size = triangles // num_groups * 3
+        data += _array(rng.random(num_vertices * 3), np.float32, 12)
+        data += _array(rng.integers(0, num_vertices, triangles * 3), np.int32, 12)
+        data += _array(rng.random(num_vertices * 3), np.float32, 12)
+        data += _array([v for g in range(num_groups) for v in (g * group_size, group_size)], np.int32, 4)
+        data += _array(np.arange(num_groups), np.int32, 4)
+    return data
+
+
+def build_transaction(num_objects, triangles=12, filename="bench", message_type=MessageType.ADD_1):
+    """Encode a TRANSACTION_1 message carrying one ADD_1/UPDATE_1 item."""
+    item = struct.pack("<II", message_type.value, num_objects)
+    item += b"".join(build_object(i + 1, triangles) for i in range(num_objects))
+
+    name = filename.encode("utf-8")
+    data = struct.pack("<II", MessageType.TRANSACTION_1.value, len(name)) + _padded(name)
+    data += struct.pack("<II", 1, 1)
+    data += struct.pack("<I", len(item)) + item
+    return data
+
+
+def objects_payload(message):
+    """Return the ADD_1/UPDATE_1 payload (after the item type) of a single-item transaction."""
+    view = memoryview(message)
+    filename_length, = struct.unpack_from("<I", view, 4)
+    offset = 8 + filename_length + (4 - filename_length % 4) % 4 + 8
+    return view[offset + 8:]
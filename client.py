@@ -1,5 +1,7 @@
 import threading
 import asyncio
+import collections
+import concurrent.futures
 import websockets
 import weakref
 import traceback
@@ -16,6 +18,9 @@ if os.path.exists(python311_path) and python311_path not in sys.path:
 
 import numpy as np
 from enum import Enum
+from websockets.exceptions import ProtocolError
+from websockets.frames import OP_BINARY, OP_CONT, OP_TEXT
+from websockets.legacy.client import WebSocketClientProtocol
 
 class MessageType(Enum):
     TRANSACTION_1 = 0
@@ -48,9 +53,80 @@ class FacetShapeType(Enum):
     CUT = 20501
     CONVEX = 20502
 
+# Precompiled little-endian layouts for the object stream. The object header is
+# type, id, version, parent_id, material_id, flags, name_length; a refacet item
+# starts with plasticity_id, version.
+UINT32 = struct.Struct("<I")
+OBJECT_HEADER = struct.Struct("<IIIiiII")
+ITEM_HEADER = struct.Struct("<II")
+
+# Length-prefixed geometry channels of SOLID/SHEET objects, in wire order:
+# (channel, bytes per counted element, dtype)
+GEOMETRY_LAYOUT = (
+    ("vertices", 12, np.float32),
+    ("faces", 12, np.int32),
+    ("normals", 12, np.float32),
+    ("groups", 4, np.int32),
+    ("face_ids", 4, np.int32),
+)
+
+GEOMETRY_CHANNELS = tuple(channel for channel, _, _ in GEOMETRY_LAYOUT)
+
+GEOMETRY_TYPES = (ObjectType.SOLID.value, ObjectType.SHEET.value)
+
+# One row per object of an ADD_1/UPDATE_1 payload, as produced by scan_objects.
+# Offsets are byte offsets into the scanned buffer, counts are wire counts
+# (vertices/faces/normals count triples).
+OBJECT_INDEX_DTYPE = np.dtype(
+    [("type", np.uint32), ("id", np.uint32), ("version", np.uint32), ("parent_id", np.int32),
+     ("material_id", np.int32), ("flags", np.uint32), ("name_offset", np.int64), ("name_length", np.uint32)]
+    + [(f"{channel}_{field}", np.int64) for channel, _, _ in GEOMETRY_LAYOUT for field in ("offset", "count")]
+    + [("end", np.int64)])
+
+class DecodeProfile:
+    """
+    Geometry channels the decoder leaves out. A skipped channel is never sliced
+    or wrapped; it only advances the read offset and decodes to None.
+    """
+    __slots__ = ("skip",)
+
+    def __init__(self, skip=()):
+        skip = frozenset(skip)
+        unknown = skip - set(GEOMETRY_CHANNELS)
+        if unknown:
+            raise ValueError(f"Unknown geometry channels: {sorted(unknown)}")
+        self.skip = skip
+
+    @classmethod
+    def consuming(cls, channels):
+        """Profile that decodes only the given channels."""
+        return cls(channel for channel in GEOMETRY_CHANNELS if channel not in channels)
+
+    def __repr__(self):
+        return f"DecodeProfile(skip={sorted(self.skip)})"
+
+FULL_PROFILE = DecodeProfile()
+
+class PlasticityRequestError(Exception):
+    """A command answered with a non-200 code, or (code None) one that couldn't be sent."""
+    def __init__(self, message_type, code=None, reason=None):
+        super().__init__(f"{message_type.name} failed with code: {code}" if code is not None
+                         else f"{message_type.name} failed: {reason}")
+        self.message_type = message_type
+        self.code = code
+
 class PlasticityClient:
-    def __init__(self, handler=None):
+    def __init__(self, handler=None, decode_profile=None, csr_refacet=False, streaming=True, request_timeout=120.0,
+                 dispatcher=None):
         self.handler = handler
+        self.dispatcher = dispatcher  # runs command callbacks on the caller's (main) thread
+        self.request_timeout = request_timeout
+        self.csr_refacet = csr_refacet
+        self.streaming = streaming
+        if decode_profile is None:
+            consumed = getattr(handler, "CONSUMED_CHANNELS", None)
+            decode_profile = DecodeProfile.consuming(consumed) if consumed is not None else FULL_PROFILE
+        self.decode_profile = decode_profile
         self.connected = False
         self.websocket = None
         self.server = None
@@ -59,6 +135,9 @@ class PlasticityClient:
         self.subscribed = False
         self.loop = None
         self.thread = None
+        self.stream = None
+        self.object_queues = set()
+        self.pending = {}  # message_id -> concurrent.futures.Future of the response
 
     def connect(self, server):
         self.loop = asyncio.new_event_loop()
@@ -80,8 +159,14 @@ class PlasticityClient:
     async def connect_async(self, server):
         try:
             print(f"[client.py] Trying to connect to ws://{server}...")
-            ws = await asyncio.wait_for(websockets.connect(f"ws://{server}"), timeout=5)
+            if self.streaming:
+                connect = websockets.connect(f"ws://{server}", create_protocol=StreamingClientProtocol, max_size=None)
+            else:
+                connect = websockets.connect(f"ws://{server}")
+            ws = await asyncio.wait_for(connect, timeout=5)
             print("[client.py] WebSocket connected!")
+            if self.streaming:
+                ws.stream_sink = self
 
             self.connected = True
             self.websocket = weakref.proxy(ws)
@@ -94,6 +179,9 @@ class PlasticityClient:
             try:
                 while True:
                     message = await ws.recv()
+                    if isinstance(message, TransactionStreamDecoder):
+                        self.end_message(message)
+                        continue
                     await self.on_message(ws, message)
             except websockets.ConnectionClosed:
                 print("[client.py] WebSocket closed.")
@@ -102,6 +190,10 @@ class PlasticityClient:
                 self.websocket = None
                 self.filename = None
                 self.subscribed = False
+                self.stream = None
+                for queue in self.object_queues:
+                    queue.put_nowait(None)
+                self.__fail_pending(ConnectionError("Plasticity connection closed"))
                 if self.handler:
                     self.handler.on_disconnect()
 
@@ -115,6 +207,70 @@ class PlasticityClient:
             if self.handler:
                 self.handler.on_disconnect()
 
+    # Streaming methods, called by StreamingClientProtocol on the client loop
+    def begin_message(self, data):
+        """Starts streaming a message from its first fragment; False if the message type isn't streamed."""
+        if not TransactionStreamDecoder.accepts(data):
+            return False
+        self.stream = TransactionStreamDecoder(use_pid_suffix=True, profile=self.decode_profile)
+        self.feed_message(data)
+        return True
+
+    def feed_message(self, data):
+        stream = self.stream
+        for action, obj in stream.feed(data):
+            for queue in self.object_queues:
+                queue.put_nowait((stream.filename, action, obj))
+
+    def finish_message(self):
+        """Detaches the finished stream; recv() hands it back to end_message in message order."""
+        stream, self.stream = self.stream, None
+        return stream
+
+    def end_message(self, stream):
+        """Delivers a streamed message from the recv() loop, after every message received before it."""
+        if not stream.done:
+            if not stream.failed:
+                print("[client.py] Truncated streamed message.")
+            if stream.message_id is not None:
+                self.__reject(stream.message_id,
+                              PlasticityRequestError(stream.message_type, reason="malformed streamed message"))
+            return
+        if stream.code is not None and stream.code != 200:
+            print(f"List all failed with code: {stream.code}")
+            self.__reject(stream.message_id, PlasticityRequestError(stream.message_type, stream.code))
+            return
+
+        self.filename = stream.filename
+        self.__resolve(stream.message_id, stream.transaction)
+        if self.handler:
+            # A handler error must not end the recv() loop and with it the connection
+            try:
+                if stream.message_type == MessageType.TRANSACTION_1:
+                    self.handler.on_transaction(stream.transaction)
+                else:
+                    self.handler.on_list(stream.transaction)
+            except Exception as e:
+                print("[client.py] Handler failed on streamed message:", e)
+                traceback.print_exc()
+
+    async def iter_objects(self):
+        """
+        Async iterator over (filename, "add" | "update", PlasticityObject) for every object of a
+        streamed TRANSACTION_1 / LIST_*_1 message, yielded as soon as its bytes have arrived.
+        Runs on the client loop; ends when the connection closes.
+        """
+        queue = asyncio.Queue()
+        self.object_queues.add(queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            self.object_queues.discard(queue)
+
     # Message handling methods
     async def on_message(self, ws, message):
         if isinstance(message, str):
@@ -172,11 +328,18 @@ class PlasticityClient:
             self.on_message_item(view[offset:offset + item_length], transaction)
             offset += item_length
 
+        # Unfragmented messages bypass the stream decoder; iter_objects still sees their objects
+        for queue in self.object_queues:
+            for action in ("add", "update"):
+                for obj in transaction[action]:
+                    queue.put_nowait((filename, action, obj))
+
         if self.handler:
             if update_only:
                 self.handler.on_transaction(transaction)
             else:
                 self.handler.on_list(transaction)
+        return transaction
 
     def __on_list_message(self, view, offset):
         print("on list message")
@@ -187,9 +350,10 @@ class PlasticityClient:
 
         if code != 200:
             print(f"List all failed with code: {code}")
+            self.__reject(message_id, PlasticityRequestError(MessageType(int.from_bytes(view[:4], 'little')), code))
             return
 
-        self.__on_transaction(view, offset, update_only=False)
+        self.__resolve(message_id, self.__on_transaction(view, offset, update_only=False))
 
     def __on_new_version(self, view, offset):
         filename_length = int.from_bytes(view[offset:offset + 4], 'little')
@@ -225,6 +389,7 @@ class PlasticityClient:
 
         if code != 200:
             print(f"Refacet failed with code: {code}")
+            self.__reject(message_id, PlasticityRequestError(MessageType.REFACET_SOME_1, code))
             return
 
         filename_length = int.from_bytes(view[offset:offset + 4], 'little')
@@ -241,6 +406,16 @@ class PlasticityClient:
         num_items = int.from_bytes(view[offset:offset + 4], 'little')
         offset += 4
 
+        if self.csr_refacet:
+            batch = decode_refacet_batch(view, offset, num_items, self.decode_profile)
+            batch.filename = filename
+            batch.version = file_version
+            if self.handler:
+                self.handler.on_refacet_batch(filename, file_version, batch)
+            self.__resolve(message_id, batch)
+            return
+
+        skip = self.decode_profile.skip
         plasticity_ids = []
         versions = []
         faces = []
@@ -269,15 +444,15 @@ class PlasticityClient:
             offset += num_index * 4
             num_normals = int.from_bytes(view[offset:offset + 4], 'little')
             offset += 4
-            normal = np.frombuffer(view[offset:offset + num_normals * 4], dtype=np.float32)
+            normal = None if "normals" in skip else np.frombuffer(view[offset:offset + num_normals * 4], dtype=np.float32)
             offset += num_normals * 4
             num_groups = int.from_bytes(view[offset:offset + 4], 'little')
             offset += 4
-            group = np.frombuffer(view[offset:offset + num_groups * 4], dtype=np.int32).tolist()
+            group = None if "groups" in skip else np.frombuffer(view[offset:offset + num_groups * 4], dtype=np.int32).tolist()
             offset += num_groups * 4
             num_face_ids = int.from_bytes(view[offset:offset + 4], 'little')
             offset += 4
-            face_id = np.frombuffer(view[offset:offset + num_face_ids * 4], dtype=np.int32).tolist()
+            face_id = None if "face_ids" in skip else np.frombuffer(view[offset:offset + num_face_ids * 4], dtype=np.int32).tolist()
             offset += num_face_ids * 4
 
             plasticity_ids.append(plasticity_id)
@@ -293,6 +468,18 @@ class PlasticityClient:
             self.handler.on_refacet(filename, file_version, plasticity_ids,
                                    versions, faces, positions, indices, 
                                    normals, groups, face_ids)
+        self.__resolve(message_id, {
+            "filename": filename,
+            "version": file_version,
+            "plasticity_ids": plasticity_ids,
+            "versions": versions,
+            "faces": faces,
+            "positions": positions,
+            "indices": indices,
+            "normals": normals,
+            "groups": groups,
+            "face_ids": face_ids
+        })
 
     def on_message_item(self, view, transaction):
         offset = 0
@@ -306,59 +493,160 @@ class PlasticityClient:
             num_objects = int.from_bytes(view[offset:offset + 4], 'little')
             offset += 4
             transaction["delete"].extend(
-                np.frombuffer(view[offset:offset + num_objects * 4], dtype=np.int32))
+                np.frombuffer(view[offset:offset + num_objects * 4], dtype=np.uint32))
         elif message_type == MessageType.ADD_1:
-            transaction["add"].extend(decode_objects(view[offset:], True))
+            transaction["add"].extend(decode_objects(view[offset:], True, profile=self.decode_profile))
         elif message_type == MessageType.UPDATE_1:
-            transaction["update"].extend(decode_objects(view[offset:], True))
-
-    # Command methods
-    def list_all(self):
-        if self.connected:
-            asyncio.run_coroutine_threadsafe(self.list_all_async(), self.loop).result()
-
-    async def list_all_async(self):
+            transaction["update"].extend(decode_objects(view[offset:], True, profile=self.decode_profile))
+
+    # Request/response correlation
+    async def __request(self, message_type, body=b"", timeout=None):
+        """
+        Sends a command and returns a concurrent.futures.Future resolved with the
+        decoded response carrying the same message_id. The future fails with
+        TimeoutError after `timeout` seconds (default request_timeout, 0 to wait
+        forever) and is dropped from the pending table when cancelled.
+        """
         self.message_id += 1
-        get_objects_message = struct.pack("<I", MessageType.LIST_ALL_1.value)
-        get_objects_message += struct.pack("<I", self.message_id)
-        await self.websocket.send(get_objects_message)
+        message_id = self.message_id
+        future = concurrent.futures.Future()
+        self.pending[message_id] = future
+        future.add_done_callback(lambda _: self.pending.pop(message_id, None))
 
-    def list_visible(self):
-        if self.connected:
-            asyncio.run_coroutine_threadsafe(self.list_visible_async(), self.loop).result()
+        timeout = self.request_timeout if timeout is None else timeout
+        if timeout:
+            timer = self.loop.call_later(timeout, self.__reject, message_id,
+                                         TimeoutError(f"{message_type.name} #{message_id} timed out"))
+            future.add_done_callback(lambda _: self.loop.call_soon_threadsafe(timer.cancel))
 
-    async def list_visible_async(self):
-        self.message_id += 1
-        get_objects_message = struct.pack("<I", MessageType.LIST_VISIBLE_1.value)
-        get_objects_message += struct.pack("<I", self.message_id)
-        await self.websocket.send(get_objects_message)
+        try:
+            await self.websocket.send(struct.pack("<II", message_type.value, message_id) + body)
+        except Exception as e:
+            self.__reject(message_id, e)
+        return future
+
+    def __resolve(self, message_id, payload):
+        future = self.pending.pop(message_id, None)
+        if future is not None and not future.done():
+            future.set_result(payload)
+
+    def __reject(self, message_id, error):
+        future = self.pending.pop(message_id, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    def __fail_pending(self, error):
+        for message_id in list(self.pending):
+            self.__reject(message_id, error)
+
+    def __schedule(self, coroutine, callback=None):
+        """
+        Runs a command coroutine on the client loop without blocking the caller and
+        returns its concurrent.futures.Future. When given, callback(result, error) is
+        delivered through `dispatch`; errors of fire-and-forget commands are reported
+        to the handler the same way.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+        def done(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if callback is not None:
+                self.dispatch(callback, None if error else future.result(), error)
+            elif error is not None:
+                self.dispatch(self.report, "error", str(error))
+
+        future.add_done_callback(done)
+        return future
+
+    def __settled(self, callback, result=None, error=None):
+        """An already-finished Future for a command that never reaches the loop; callback still runs."""
+        future = concurrent.futures.Future()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        if callback is not None:
+            self.dispatch(callback, result, error)
+        return future
+
+    def __not_connected(self, message_type, callback):
+        return self.__settled(callback, error=PlasticityRequestError(message_type, reason="not connected"))
+
+    def dispatch(self, fn, *args):
+        if self.dispatcher is not None:
+            self.dispatcher(fn, *args)
+        else:
+            fn(*args)
+
+    # Command methods. None of them block the calling thread: each returns a Future
+    # and accepts an optional callback(result, error) delivered through `dispatch`.
+    # While disconnected the Future is already failed with PlasticityRequestError.
+    def list_all(self, callback=None, timeout=None):
+        """The Future resolves with the list transaction."""
+        if not self.connected:
+            return self.__not_connected(MessageType.LIST_ALL_1, callback)
+        return self.__schedule(self.list_all_async(timeout), callback)
+
+    async def list_all_async(self, timeout=None):
+        future = await self.__request(MessageType.LIST_ALL_1, timeout=timeout)
+        return await asyncio.wrap_future(future)
+
+    def list_visible(self, callback=None, timeout=None):
+        """The Future resolves with the list transaction."""
+        if not self.connected:
+            return self.__not_connected(MessageType.LIST_VISIBLE_1, callback)
+        return self.__schedule(self.list_visible_async(timeout), callback)
+
+    async def list_visible_async(self, timeout=None):
+        future = await self.__request(MessageType.LIST_VISIBLE_1, timeout=timeout)
+        return await asyncio.wrap_future(future)
+
+    def list_some(self, filename, plasticity_ids, callback=None, timeout=None):
+        """The Future resolves with the list transaction for the given objects."""
+        if not self.connected:
+            return self.__not_connected(MessageType.LIST_SOME_1, callback)
+        if not plasticity_ids:
+            return self.__settled(callback)
+        return self.__schedule(self.list_some_async(filename, plasticity_ids, timeout), callback)
+
+    async def list_some_async(self, filename, plasticity_ids, timeout=None):
+        if not plasticity_ids:
+            return None
+        future = await self.__request(MessageType.LIST_SOME_1, encode_id_list(filename, plasticity_ids), timeout)
+        return await asyncio.wrap_future(future)
 
-    def subscribe_all(self):
-        if self.connected:
-            asyncio.run_coroutine_threadsafe(self.subscribe_all_async(), self.loop).result()
-            self.subscribed = True
+    def subscribe_all(self, callback=None):
+        if not self.connected:
+            return self.__not_connected(MessageType.SUBSCRIBE_ALL_1, callback)
+        return self.__schedule(self.subscribe_all_async(), callback)
 
     async def subscribe_all_async(self):
         self.message_id += 1
         subscribe_message = struct.pack("<I", MessageType.SUBSCRIBE_ALL_1.value)
         subscribe_message += struct.pack("<I", self.message_id)
         await self.websocket.send(subscribe_message)
+        self.subscribed = True
 
-    def unsubscribe_all(self):
-        if self.connected:
-            asyncio.run_coroutine_threadsafe(self.unsubscribe_all_async(), self.loop).result()
-            self.subscribed = False
+    def unsubscribe_all(self, callback=None):
+        if not self.connected:
+            return self.__not_connected(MessageType.UNSUBSCRIBE_ALL_1, callback)
+        return self.__schedule(self.unsubscribe_all_async(), callback)
 
     async def unsubscribe_all_async(self):
         self.message_id += 1
         subscribe_message = struct.pack("<I", MessageType.UNSUBSCRIBE_ALL_1.value)
         subscribe_message += struct.pack("<I", self.message_id)
         await self.websocket.send(subscribe_message)
+        self.subscribed = False
 
-    def subscribe_some(self, filename, plasticity_ids):
-        if self.connected and plasticity_ids:
-            asyncio.run_coroutine_threadsafe(
-                self.subscribe_some_async(filename, plasticity_ids), self.loop).result()
+    def subscribe_some(self, filename, plasticity_ids, callback=None):
+        if not self.connected:
+            return self.__not_connected(MessageType.SUBSCRIBE_SOME_1, callback)
+        if not plasticity_ids:
+            return self.__settled(callback)
+        return self.__schedule(self.subscribe_some_async(filename, plasticity_ids), callback)
 
     async def subscribe_some_async(self, filename, plasticity_ids):
         if not plasticity_ids:
@@ -367,61 +655,43 @@ class PlasticityClient:
         self.message_id += 1
         subscribe_message = struct.pack("<I", MessageType.SUBSCRIBE_SOME_1.value)
         subscribe_message += struct.pack("<I", self.message_id)
-        subscribe_message += struct.pack("<I", len(filename))
-        subscribe_message += struct.pack(f"<{len(filename)}s", filename.encode('utf-8'))
-        padding = (4 - (len(filename) % 4)) % 4
-        subscribe_message += struct.pack(f"<{padding}x")
-        subscribe_message += struct.pack("<I", len(plasticity_ids))
-        for plasticity_id in plasticity_ids:
-            subscribe_message += struct.pack("<I", plasticity_id)
+        subscribe_message += encode_id_list(filename, plasticity_ids)
         await self.websocket.send(subscribe_message)
 
     def refacet_some(self, filename, plasticity_ids, relative_to_bbox=True, curve_chord_tolerance=0.01, 
                     curve_chord_angle=0.35, surface_plane_tolerance=0.01, surface_plane_angle=0.35, 
                     match_topology=True, max_sides=3, plane_angle=0, min_width=0, max_width=0, 
-                    curve_chord_max=0, shape=FacetShapeType.CUT):
-        if self.connected and plasticity_ids:
-            asyncio.run_coroutine_threadsafe(
-                self.refacet_some_async(filename, plasticity_ids, relative_to_bbox, curve_chord_tolerance,
-                                      curve_chord_angle, surface_plane_tolerance, surface_plane_angle,
-                                      match_topology, max_sides, plane_angle, min_width, max_width,
-                                      curve_chord_max, shape), self.loop).result()
+                    curve_chord_max=0, shape=FacetShapeType.CUT, callback=None, timeout=None):
+        """The Future resolves with the refacet response; several may be outstanding at once."""
+        if not self.connected:
+            return self.__not_connected(MessageType.REFACET_SOME_1, callback)
+        if not plasticity_ids:
+            return self.__settled(callback)
+        return self.__schedule(
+            self.refacet_some_async(filename, plasticity_ids, relative_to_bbox, curve_chord_tolerance,
+                                    curve_chord_angle, surface_plane_tolerance, surface_plane_angle,
+                                    match_topology, max_sides, plane_angle, min_width, max_width,
+                                    curve_chord_max, shape, timeout), callback)
 
     async def refacet_some_async(self, filename, plasticity_ids, relative_to_bbox=True, curve_chord_tolerance=0.01, 
                                curve_chord_angle=0.35, surface_plane_tolerance=0.01, surface_plane_angle=0.35, 
                                match_topology=True, max_sides=3, plane_angle=0, min_width=0, max_width=0, 
-                               curve_chord_max=0, shape=FacetShapeType.CUT):
+                               curve_chord_max=0, shape=FacetShapeType.CUT, timeout=None):
         if not plasticity_ids:
-            return
+            return None
 
-        self.message_id += 1
-        refacet_message = struct.pack("<I", MessageType.REFACET_SOME_1.value)
-        refacet_message += struct.pack("<I", self.message_id)
-        refacet_message += struct.pack("<I", len(filename))
-        refacet_message += struct.pack(f"<{len(filename)}s", filename.encode('utf-8'))
-        padding = (4 - (len(filename) % 4)) % 4
-        refacet_message += struct.pack(f"<{padding}x")
-        refacet_message += struct.pack("<I", len(plasticity_ids))
-        for plasticity_id in plasticity_ids:
-            refacet_message += struct.pack("<I", plasticity_id)
-        refacet_message += struct.pack("<I", relative_to_bbox)
-        refacet_message += struct.pack("<f", curve_chord_tolerance)
-        refacet_message += struct.pack("<f", curve_chord_angle)
-        refacet_message += struct.pack("<f", surface_plane_tolerance)
-        refacet_message += struct.pack("<f", surface_plane_angle)
-        refacet_message += struct.pack("<I", 1 if match_topology else 0)
-        refacet_message += struct.pack("<I", max_sides)
-        refacet_message += struct.pack("<f", plane_angle)
-        refacet_message += struct.pack("<f", min_width)
-        refacet_message += struct.pack("<f", max_width)
-        refacet_message += struct.pack("<f", curve_chord_max)
-        refacet_message += struct.pack("<I", shape.value)
-
-        await self.websocket.send(refacet_message)
-
-    def disconnect(self):
-        if self.connected:
-            asyncio.run_coroutine_threadsafe(self.disconnect_async(), self.loop).result()
+        body = encode_refacet_request(filename, plasticity_ids, relative_to_bbox, curve_chord_tolerance,
+                                      curve_chord_angle, surface_plane_tolerance, surface_plane_angle,
+                                      match_topology, max_sides, plane_angle, min_width, max_width,
+                                      curve_chord_max, shape)
+        future = await self.__request(MessageType.REFACET_SOME_1, body, timeout)
+        return await asyncio.wrap_future(future)
+
+    def disconnect(self, callback=None):
+        """Already disconnected resolves at once."""
+        if not self.connected:
+            return self.__settled(callback)
+        return self.__schedule(self.disconnect_async(), callback)
 
     async def disconnect_async(self):
         if self.websocket:
@@ -430,6 +700,7 @@ class PlasticityClient:
         self.filename = None
         self.subscribed = False
         self.websocket = None
+        self.__fail_pending(ConnectionError("Plasticity connection closed"))
         if self.handler:
             self.handler.on_disconnect()
 
@@ -437,48 +708,157 @@ class PlasticityClient:
         if self.handler:
             self.handler.report(level, message)
 
-def decode_objects(buffer, use_pid_suffix=True):
+def scan_objects(buffer):
+    """Walks the object headers of an ADD_1/UPDATE_1 payload without touching any geometry."""
     view = memoryview(buffer)
-    num_objects = int.from_bytes(view[:4], 'little')
+    num_objects, = UINT32.unpack_from(view, 0)
+    offset = 4
+    no_geometry = (0, 0) * len(GEOMETRY_LAYOUT)
+    rows = []
+
+    for _ in range(num_objects):
+        header = OBJECT_HEADER.unpack_from(view, offset)
+        offset += OBJECT_HEADER.size
+        name_offset = offset
+        name_length = header[6]
+        offset += name_length + (4 - (name_length % 4)) % 4
+
+        if header[0] in GEOMETRY_TYPES:
+            geometry = []
+            for _, item_size, _ in GEOMETRY_LAYOUT:
+                count, = UINT32.unpack_from(view, offset)
+                offset += 4
+                geometry += (offset, count)
+                offset += count * item_size
+        else:
+            geometry = no_geometry
+
+        rows.append((*header[:6], name_offset, name_length, *geometry, offset))
+
+    return np.array(rows, dtype=OBJECT_INDEX_DTYPE)
+
+def mask_geometry(index):
+    return np.isin(index["type"], GEOMETRY_TYPES)
+
+def mask_visible(index):
+    return (index["flags"] & 2) != 0
+
+def mask_newer(index, versions):
+    """Rows whose version is newer than the cached {id: version}; unknown ids count as newer."""
+    if not versions:
+        return np.ones(len(index), dtype=bool)
+    known_ids = np.fromiter(versions.keys(), dtype=np.int64, count=len(versions))
+    known_versions = np.fromiter(versions.values(), dtype=np.int64, count=len(versions))
+    order = np.argsort(known_ids)
+    known_ids = known_ids[order]
+    known_versions = known_versions[order]
+
+    position = np.clip(np.searchsorted(known_ids, index["id"]), 0, len(known_ids) - 1)
+    found = known_ids[position] == index["id"]
+    return ~found | (index["version"] > known_versions[position])
+
+class PlasticityObject:
+    """
+    A decoded Plasticity object. Geometry channels are read-only NumPy views into
+    the received message; call tolist() for the rare caller that needs Python lists.
+    Supports dict-style access (obj["vertices"], obj.get("flags")).
+    """
+    __slots__ = ("type", "id", "version", "parent_id", "material_id", "flags", "name",
+                 "vertices", "faces", "normals", "groups", "face_ids")
+
+    def __init__(self, object_type, object_id, version, parent_id, material_id, flags, name,
+                 vertices=None, faces=None, normals=None, groups=None, face_ids=None):
+        self.type = object_type
+        self.id = object_id
+        self.version = version
+        self.parent_id = parent_id
+        self.material_id = material_id
+        self.flags = flags
+        self.name = name
+        self.vertices = vertices
+        self.faces = faces
+        self.normals = normals
+        self.groups = groups
+        self.face_ids = face_ids
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def tolist(self, key):
+        value = self[key]
+        return value.tolist() if value is not None else None
+
+    def __repr__(self):
+        return f"PlasticityObject(type={self.type}, id={self.id}, version={self.version}, name={self.name!r})"
+
+def decode_objects(buffer, use_pid_suffix=True, select=None, profile=FULL_PROFILE):
+    """
+    Decodes an ADD_1/UPDATE_1 payload into PlasticityObject records. `select` is an
+    optional boolean mask, or a callable returning one from the scan_objects index,
+    choosing which objects to decode; geometry is only sliced for the rows that survive.
+    Channels named in `profile.skip` decode to None.
+    """
+    view = memoryview(buffer).toreadonly()
+    if select is not None:
+        index = scan_objects(view)
+        index = index[select(index) if callable(select) else select]
+        return [decode_indexed_object(view, row, use_pid_suffix, profile) for row in index.tolist()]
+
+    num_objects, = UINT32.unpack_from(view, 0)
     offset = 4
     objects = []
 
     for _ in range(num_objects):
         object_type, object_id, version_id, parent_id, material_id, flags, name, vertices, faces, normals, offset, groups, face_ids = decode_object_data(
-            view, offset, use_pid_suffix)
-        objects.append({
-            "type": object_type, 
-            "id": object_id, 
-            "version": version_id, 
-            "parent_id": parent_id, 
-            "material_id": material_id,
-            "flags": flags, 
-            "name": name, 
-            "vertices": vertices, 
-            "faces": faces, 
-            "normals": normals, 
-            "groups": groups, 
-            "face_ids": face_ids
-        })
-        # print(objects)
+            view, offset, use_pid_suffix, profile)
+        objects.append(PlasticityObject(object_type, object_id, version_id, parent_id, material_id, flags,
+                                        name, vertices, faces, normals, groups, face_ids))
     return objects
 
-def decode_object_data(view, offset, use_pid_suffix=True):
-    object_type = int.from_bytes(view[offset:offset + 4], 'little')
-    offset += 4
-    object_id = int.from_bytes(view[offset:offset + 4], 'little')
-    offset += 4
-    version_id = int.from_bytes(view[offset:offset + 4], 'little')
-    offset += 4
-    parent_id = int.from_bytes(view[offset:offset + 4], 'little', signed=True)
-    offset += 4
-    material_id = int.from_bytes(view[offset:offset + 4], 'little', signed=True)
-    offset += 4
-    flags = int.from_bytes(view[offset:offset + 4], 'little')
-    offset += 4
-    name_length = int.from_bytes(view[offset:offset + 4], 'little')
-    offset += 4
-    name = view[offset:offset + name_length].tobytes().decode('utf-8')
+def decode_indexed_object(view, row, use_pid_suffix=True, profile=FULL_PROFILE):
+    (object_type, object_id, version_id, parent_id, material_id, flags, name_offset, name_length,
+     vertices_offset, num_vertices, faces_offset, num_faces, normals_offset, num_normals,
+     groups_offset, num_groups, face_ids_offset, num_face_ids, _) = row
+    name = str(view[name_offset:name_offset + name_length], 'utf-8')
+    name_with_id = f"{name}_{object_id}" if use_pid_suffix else name
+
+    vertices = faces = normals = groups = face_ids = None
+
+    if object_type in GEOMETRY_TYPES:
+        skip = profile.skip
+        if "vertices" not in skip:
+            vertices = np.frombuffer(view, dtype=np.float32, count=num_vertices * 3, offset=vertices_offset)
+        if "faces" not in skip:
+            faces = np.frombuffer(view, dtype=np.int32, count=num_faces * 3, offset=faces_offset)
+        if "normals" not in skip:
+            normals = np.frombuffer(view, dtype=np.float32, count=num_normals * 3, offset=normals_offset)
+        if "groups" not in skip:
+            groups = np.frombuffer(view, dtype=np.int32, count=num_groups, offset=groups_offset)
+        if "face_ids" not in skip:
+            face_ids = np.frombuffer(view, dtype=np.int32, count=num_face_ids, offset=face_ids_offset)
+
+    final_name = name_with_id
+    if final_name and final_name[0].isdigit():
+        final_name = f"Null_{final_name}"
+
+    return PlasticityObject(object_type, object_id, version_id, parent_id, material_id, flags,
+                            final_name, vertices, faces, normals, groups, face_ids)
+
+def decode_object_data(view, offset, use_pid_suffix=True, profile=FULL_PROFILE):
+    object_type, object_id, version_id, parent_id, material_id, flags, name_length = OBJECT_HEADER.unpack_from(view, offset)
+    offset += OBJECT_HEADER.size
+    name = str(view[offset:offset + name_length], 'utf-8')
     offset += name_length
     name_with_id = f"{name}_{object_id}" if use_pid_suffix else name
     padding = (4 - (name_length % 4)) % 4
@@ -486,27 +866,18 @@ def decode_object_data(view, offset, use_pid_suffix=True):
 
     vertices = faces = normals = groups = face_ids = None
 
-    if object_type == ObjectType.SOLID.value or object_type == ObjectType.SHEET.value:
-        num_vertices = int.from_bytes(view[offset:offset + 4], 'little')
-        offset += 4
-        vertices = np.frombuffer(view[offset:offset + num_vertices * 12], dtype=np.float32)
-        offset += num_vertices * 12
-        num_faces = int.from_bytes(view[offset:offset + 4], 'little')
-        offset += 4
-        faces = np.frombuffer(view[offset:offset + num_faces * 12], dtype=np.int32)
-        offset += num_faces * 12
-        num_normals = int.from_bytes(view[offset:offset + 4], 'little')
-        offset += 4
-        normals = np.frombuffer(view[offset:offset + num_normals * 12], dtype=np.float32)
-        offset += num_normals * 12
-        num_groups = int.from_bytes(view[offset:offset + 4], 'little')
-        offset += 4
-        groups = np.frombuffer(view[offset:offset + num_groups * 4], dtype=np.int32).tolist()
-        offset += num_groups * 4
-        num_face_ids = int.from_bytes(view[offset:offset + 4], 'little')
-        offset += 4
-        face_ids = np.frombuffer(view[offset:offset + num_face_ids * 4], dtype=np.int32).tolist()
-        offset += num_face_ids * 4
+    if object_type in GEOMETRY_TYPES:
+        skip = profile.skip
+        channels = []
+        for channel, item_size, dtype in GEOMETRY_LAYOUT:
+            count, = UINT32.unpack_from(view, offset)
+            offset += 4
+            if channel in skip:
+                channels.append(None)
+            else:
+                channels.append(np.frombuffer(view, dtype=dtype, count=count * item_size // 4, offset=offset))
+            offset += count * item_size
+        vertices, faces, normals, groups, face_ids = channels
 
     final_name = name_with_id
     if final_name and final_name[0].isdigit():
@@ -515,5 +886,327 @@ def decode_object_data(view, offset, use_pid_suffix=True):
     # print(object_type, object_id, version_id, parent_id, material_id, flags, final_name, vertices, faces, normals, offset, groups, face_ids)
     return object_type, object_id, version_id, parent_id, material_id, flags, final_name, vertices, faces, normals, offset, groups, face_ids
 
+# Per-item channels of a REFACET_SOME_1 response, in wire order: (channel, dtype).
+# Every channel is a uint32 element count followed by that many 4-byte elements.
+REFACET_LAYOUT = (
+    ("faces", np.int32),
+    ("positions", np.float32),
+    ("indices", np.int32),
+    ("normals", np.float32),
+    ("groups", np.int32),
+    ("face_ids", np.int32),
+)
+
+class RefacetBatch:
+    """
+    A REFACET_SOME_1 response in structure-of-arrays form. Each channel holds the
+    data of all items back to back; offsets[channel][i]:offsets[channel][i + 1]
+    is item i's slice. Skipped channels are None.
+    """
+    __slots__ = ("filename", "version", "plasticity_ids", "versions", "faces", "positions", "indices",
+                 "normals", "groups", "face_ids", "offsets")
+
+    def __init__(self, plasticity_ids, versions, channels, offsets, filename=None, version=None):
+        self.filename = filename
+        self.version = version
+        self.plasticity_ids = plasticity_ids
+        self.versions = versions
+        self.faces = channels["faces"]
+        self.positions = channels["positions"]
+        self.indices = channels["indices"]
+        self.normals = channels["normals"]
+        self.groups = channels["groups"]
+        self.face_ids = channels["face_ids"]
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.plasticity_ids)
+
+    def channel(self, name, i):
+        data = getattr(self, name)
+        if data is None:
+            return None
+        offsets = self.offsets[name]
+        return data[offsets[i]:offsets[i + 1]]
+
+    def item(self, i):
+        """Item i as (plasticity_id, version, faces, positions, indices, normals, groups, face_ids) views."""
+        return (int(self.plasticity_ids[i]), int(self.versions[i]),
+                *(self.channel(name, i) for name, _ in REFACET_LAYOUT))
+
+    def __iter__(self):
+        return (self.item(i) for i in range(len(self)))
+
+def decode_refacet_batch(view, offset, num_items, profile=FULL_PROFILE):
+    """Decodes the items of a REFACET_SOME_1 response into one RefacetBatch. Ids and versions are uint32."""
+    headers = []
+    spans = []
+
+    for _ in range(num_items):
+        headers.append(ITEM_HEADER.unpack_from(view, offset))
+        offset += ITEM_HEADER.size
+        for _ in REFACET_LAYOUT:
+            count, = UINT32.unpack_from(view, offset)
+            offset += 4
+            spans.append((offset >> 2, count))
+            offset += count * 4
+
+    headers = np.array(headers, dtype=np.uint32).reshape(num_items, 2)
+    plasticity_ids = headers[:, 0].copy()
+    versions = headers[:, 1].copy()
+    spans = np.array(spans, dtype=np.int64).reshape(num_items, len(REFACET_LAYOUT), 2)
+    starts = spans[:, :, 0].T
+    counts = spans[:, :, 1].T
+
+    # The whole message is 4-byte aligned, so every channel can be gathered from one word view.
+    words = np.frombuffer(view, dtype=np.int32, count=len(view) // 4)
+    channels = {}
+    offsets = {}
+    for c, (name, dtype) in enumerate(REFACET_LAYOUT):
+        if name in profile.skip:
+            channels[name] = offsets[name] = None
+            continue
+        channel_offsets = np.zeros(num_items + 1, dtype=np.int64)
+        np.cumsum(counts[c], out=channel_offsets[1:])
+        gather = np.arange(channel_offsets[-1], dtype=np.int64)
+        gather += np.repeat(starts[c] - channel_offsets[:-1], counts[c])
+        channels[name] = words[gather].view(dtype)
+        offsets[name] = channel_offsets
+
+    return RefacetBatch(plasticity_ids, versions, channels, offsets)
+
+class TransactionStreamDecoder:
+    """
+    Incremental decoder for TRANSACTION_1 and LIST_*_1 messages. feed() accepts the
+    message in arbitrary chunks and returns the (action, PlasticityObject) pairs
+    completed by that chunk; the assembled transaction dict is ready once done is set.
+    Chunks are kept as received: an object lying in one chunk is decoded from a
+    view into it, and only objects spanning chunks are copied together.
+    """
+    STREAMED_TYPES = (MessageType.TRANSACTION_1.value, MessageType.LIST_ALL_1.value,
+                      MessageType.LIST_SOME_1.value, MessageType.LIST_VISIBLE_1.value)
+
+    def __init__(self, use_pid_suffix=True, profile=FULL_PROFILE):
+        self.use_pid_suffix = use_pid_suffix
+        self.profile = profile
+        self.chunks = collections.deque()  # unread chunks; the first is read from `position`
+        self.position = 0
+        self.available = 0  # unread bytes
+        self.offset = 0     # read position within the message
+        self.message_type = None
+        self.message_id = None
+        self.code = None
+        self.filename = None
+        self.transaction = None
+        self.done = False
+        self.failed = False
+        self.completed = []
+        self.parser = self.__parse()
+
+    @classmethod
+    def accepts(cls, data):
+        return len(data) >= 4 and UINT32.unpack_from(data, 0)[0] in cls.STREAMED_TYPES
+
+    def feed(self, data):
+        if self.done or self.failed:
+            return []
+        chunk = memoryview(data).toreadonly()
+        if len(chunk):
+            self.chunks.append(chunk)
+            self.available += len(chunk)
+        try:
+            next(self.parser)
+        except StopIteration:
+            self.done = True
+        except Exception as e:
+            print("[client.py] Malformed streamed message:", e)
+            self.failed = True
+        completed, self.completed = self.completed, []
+        return completed
+
+    def __wait(self, size):
+        while self.available < size:
+            yield
+
+    def __slice(self, at, size):
+        """The size bytes at read position + at; a view into the chunk when they don't straddle two."""
+        start = self.position + at
+        pieces = []
+        missing = size
+        for chunk in self.chunks:
+            if start >= len(chunk):
+                start -= len(chunk)
+                continue
+            piece = chunk[start:start + missing]
+            if not pieces and len(piece) == size:
+                return piece
+            pieces.append(piece)
+            missing -= len(piece)
+            if not missing:
+                break
+            start = 0
+        return memoryview(b"".join(pieces))
+
+    def __peek_uint32(self, at=0):
+        return UINT32.unpack_from(self.__slice(at, 4))[0]
+
+    def __skip(self, size):
+        self.available -= size
+        self.offset += size
+        self.position += size
+        while self.chunks and self.position >= len(self.chunks[0]):
+            self.position -= len(self.chunks.popleft())
+
+    def __read(self, size):
+        data = self.__slice(0, size)
+        self.__skip(size)
+        return data
+
+    def __read_uint32(self):
+        value = self.__peek_uint32()
+        self.__skip(4)
+        return value
+
+    def __parse(self):
+        yield from self.__wait(4)
+        self.message_type = MessageType(self.__read_uint32())
+
+        if self.message_type != MessageType.TRANSACTION_1:
+            yield from self.__wait(8)
+            self.message_id = self.__read_uint32()
+            self.code = self.__read_uint32()
+            if self.code != 200:
+                return
+
+        yield from self.__wait(4)
+        filename_length = self.__read_uint32()
+        padded_length = filename_length + (4 - (filename_length % 4)) % 4
+        yield from self.__wait(padded_length)
+        self.filename = self.__read(padded_length)[:filename_length].tobytes().decode('utf-8')
+
+        yield from self.__wait(8)
+        version = self.__read_uint32()
+        num_messages = self.__read_uint32()
+        self.transaction = {
+            "filename": self.filename,
+            "version": version,
+            "delete": [],
+            "add": [],
+            "update": []
+        }
+
+        for _ in range(num_messages):
+            yield from self.__wait(8)
+            item_length = self.__read_uint32()
+            item_end = self.offset + item_length
+            item_type = self.__read_uint32()
+
+            if item_type == MessageType.DELETE_1.value:
+                yield from self.__wait(4)
+                num_objects = self.__read_uint32()
+                yield from self.__wait(num_objects * 4)
+                self.transaction["delete"].extend(np.frombuffer(self.__read(num_objects * 4), dtype=np.uint32))
+            elif item_type == MessageType.ADD_1.value or item_type == MessageType.UPDATE_1.value:
+                action = "add" if item_type == MessageType.ADD_1.value else "update"
+                yield from self.__wait(4)
+                num_objects = self.__read_uint32()
+                for _ in range(num_objects):
+                    size = yield from self.__object_size()
+                    object_type, object_id, version_id, parent_id, material_id, flags, name, vertices, faces, normals, _, groups, face_ids = decode_object_data(
+                        self.__read(size), 0, self.use_pid_suffix, self.profile)
+                    obj = PlasticityObject(object_type, object_id, version_id, parent_id, material_id, flags,
+                                           name, vertices, faces, normals, groups, face_ids)
+                    self.transaction[action].append(obj)
+                    self.completed.append((action, obj))
+
+            remaining = item_end - self.offset
+            yield from self.__wait(remaining)
+            self.__skip(remaining)
+
+    def __object_size(self):
+        """Waits until the next object is complete in the buffer and returns its size in bytes."""
+        yield from self.__wait(OBJECT_HEADER.size)
+        object_type = self.__peek_uint32()
+        name_length = self.__peek_uint32(OBJECT_HEADER.size - 4)
+        size = OBJECT_HEADER.size + name_length + (4 - (name_length % 4)) % 4
+
+        if object_type in GEOMETRY_TYPES:
+            for _, item_size, _ in GEOMETRY_LAYOUT:
+                yield from self.__wait(size + 4)
+                size += 4 + self.__peek_uint32(size) * item_size
+
+        yield from self.__wait(size)
+        return size
+
+class StreamingClientProtocol(WebSocketClientProtocol):
+    """
+    Client protocol that hands the fragments of fragmented streamable binary
+    messages to `stream_sink` as they arrive instead of reassembling the whole
+    message. Such messages surface from recv() as the finished stream decoder,
+    queued in order with the unstreamed messages.
+    """
+    stream_sink = None
+
+    async def read_message(self):
+        frame = await self.read_data_frame(max_size=self.max_size)
+
+        # A close frame was received.
+        if frame is None:
+            return None
+
+        if frame.opcode != OP_TEXT and frame.opcode != OP_BINARY:
+            raise ProtocolError("unexpected opcode")
+
+        text = frame.opcode == OP_TEXT
+        sink = self.stream_sink
+        # Unfragmented messages take the regular zero-copy decode through recv()
+        streamed = not text and not frame.fin and sink is not None and sink.begin_message(frame.data)
+        fragments = [] if streamed else [frame.data]
+
+        while not frame.fin:
+            frame = await self.read_data_frame(max_size=self.max_size)
+            if frame is None:
+                raise ProtocolError("incomplete fragmented message")
+            if frame.opcode != OP_CONT:
+                raise ProtocolError("unexpected opcode")
+            if streamed:
+                sink.feed_message(frame.data)
+            else:
+                fragments.append(frame.data)
+
+        if streamed:
+            return sink.finish_message()
+
+        data = b"".join(fragments)
+        return data.decode("utf-8") if text else data
+
+def encode_id_list(filename, plasticity_ids):
+    message = struct.pack("<I", len(filename))
+    message += struct.pack(f"<{len(filename)}s", filename.encode('utf-8'))
+    padding = (4 - (len(filename) % 4)) % 4
+    message += struct.pack(f"<{padding}x")
+    message += struct.pack("<I", len(plasticity_ids))
+    for plasticity_id in plasticity_ids:
+        message += struct.pack("<I", plasticity_id)
+    return message
+
+def encode_refacet_request(filename, plasticity_ids, relative_to_bbox, curve_chord_tolerance, curve_chord_angle,
+                           surface_plane_tolerance, surface_plane_angle, match_topology, max_sides, plane_angle,
+                           min_width, max_width, curve_chord_max, shape):
+    refacet_message = encode_id_list(filename, plasticity_ids)
+    refacet_message += struct.pack("<I", relative_to_bbox)
+    refacet_message += struct.pack("<f", curve_chord_tolerance)
+    refacet_message += struct.pack("<f", curve_chord_angle)
+    refacet_message += struct.pack("<f", surface_plane_tolerance)
+    refacet_message += struct.pack("<f", surface_plane_angle)
+    refacet_message += struct.pack("<I", 1 if match_topology else 0)
+    refacet_message += struct.pack("<I", max_sides)
+    refacet_message += struct.pack("<f", plane_angle)
+    refacet_message += struct.pack("<f", min_width)
+    refacet_message += struct.pack("<f", max_width)
+    refacet_message += struct.pack("<f", curve_chord_max)
+    refacet_message += struct.pack("<I", shape.value)
+    return refacet_message
+
 def sanitize_name(name):
     return re.sub(r'[^a-zA-Z0-9_]', '_', name).strip() if isinstance(name, str) else ""
\ No newline at end of file
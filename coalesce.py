@@ -0,0 +1,84 @@
+# coalesce.py
+import threading
+
+
+class TransactionCoalescer:
+    """
+    Latest-wins buffer for live-link transactions waiting to be applied.
+
+    Keeps only the newest pending ADD/UPDATE per (filename, plasticity id), judged by
+    the object version, and folds DELETEs: a delete drops any pending update of the
+    same id, a later add/update cancels a pending delete. take() hands back one
+    merged transaction per file.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}  # filename -> {"version", "delete": set, "objects": {id: (action, obj)}}
+        self.flush_scheduled = False
+        self.received = 0
+        self.dropped = 0
+
+    def push(self, transaction):
+        """Merges a transaction in. Returns True when the caller should schedule a flush."""
+        filename = transaction.get("filename", "unknown")
+        with self.lock:
+            state = self.pending.get(filename)
+            if state is None:
+                state = self.pending[filename] = {"version": 0, "delete": set(), "objects": {}}
+            state["version"] = max(state["version"], transaction.get("version", 0))
+            objects = state["objects"]
+            deletes = state["delete"]
+
+            for plasticity_id in transaction.get("delete", []):
+                plasticity_id = int(plasticity_id)
+                self.received += 1
+                if objects.pop(plasticity_id, None) is not None:
+                    self.dropped += 1
+                deletes.add(plasticity_id)
+
+            for action in ("add", "update"):
+                for obj in transaction.get(action, []):
+                    self.received += 1
+                    plasticity_id = obj["id"]
+                    previous = objects.get(plasticity_id)
+                    if previous is not None:
+                        self.dropped += 1
+                        if previous[1]["version"] > obj["version"]:
+                            continue
+                    # An update of an object still waiting to be added is still an add
+                    kept_action = "add" if previous is not None and previous[0] == "add" else action
+                    deletes.discard(plasticity_id)
+                    objects[plasticity_id] = (kept_action, obj)
+
+            schedule = not self.flush_scheduled
+            self.flush_scheduled = True
+            return schedule
+
+    def take(self):
+        """Returns the merged transactions and empties the buffer."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flush_scheduled = False
+
+        transactions = []
+        for filename, state in pending.items():
+            transaction = {
+                "filename": filename,
+                "version": state["version"],
+                "delete": sorted(state["delete"]),
+                "add": [],
+                "update": []
+            }
+            for action, obj in state["objects"].values():
+                transaction[action].append(obj)
+            transactions.append(transaction)
+        return transactions
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+            self.flush_scheduled = False
+
+    def metrics(self):
+        return {"received": self.received, "dropped": self.dropped}
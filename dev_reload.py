@@ -6,7 +6,7 @@ if PLUGIN_DIR not in sys.path:
     sys.path.insert(0, PLUGIN_DIR)
 
 # Reload core modules in dependency order
-for mod in ["handler", "client"]:
+for mod in ["apply_queue", "coalesce", "geometry", "hierarchy", "scene_commit", "topology", "uv", "handler", "client"]:
     if mod in sys.modules:
         importlib.reload(sys.modules[mod])
 
@@ -0,0 +1,519 @@
+# geometry.py
+import collections
+import time
+import zlib
+
+import numpy as np
+import c4d
+
+from topology import _ranges
+
+
+def triangles_to_polygons(indices):
+    """Flat triangle index buffer -> (T, 4) int32 CPolygon layout with d == c."""
+    triangles = np.asarray(indices, dtype=np.int32).reshape(-1, 3)
+    polygons = np.empty((len(triangles), 4), dtype=np.int32)
+    polygons[:, :3] = triangles
+    polygons[:, 3] = triangles[:, 2]
+    return polygons
+
+
+def faces_to_polygons(faces, indices, keep_quads=True, points=None):
+    """
+    Refacet CSR buffers (vertex count per face + flat indices) -> (P, 4) int32
+    CPolygons and the (P,) face index of every polygon. Triangles and quads map
+    1:1; larger faces (and quads unless keep_quads) are fan-triangulated from
+    their first vertex. With points, faces that aren't convex are ear clipped
+    instead, into the same number of triangles.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int32)
+    starts = np.zeros(len(faces), dtype=np.int64)
+    np.cumsum(faces[:-1], out=starts[1:])
+
+    quad_faces = (faces == 4) if keep_quads else np.zeros(len(faces), dtype=bool)
+    counts = np.where(quad_faces, 1, np.maximum(faces - 2, 0))
+    polygon_faces = np.repeat(np.arange(len(faces), dtype=np.int32), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    fan = np.arange(len(polygon_faces), dtype=np.int64) - first  # k-th triangle of its face
+    base = starts[polygon_faces]
+
+    polygons = np.empty((len(polygon_faces), 4), dtype=np.int32)
+    polygons[:, 0] = indices[base]
+    polygons[:, 1] = indices[base + fan + 1]
+    polygons[:, 2] = indices[base + fan + 2]
+    quads = quad_faces[polygon_faces]
+    polygons[:, 3] = polygons[:, 2]
+    polygons[quads, 3] = indices[base[quads] + 3]
+
+    if points is not None:
+        fanned = np.flatnonzero((faces > 3) & ~quad_faces)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        concave = fanned[~_convex_faces(points, faces, starts, indices, fanned)]
+        if len(concave):
+            # Ear clipping yields as many triangles as the fan, so they take over its rows
+            triangles = _ear_clip(points, faces, starts, indices, concave)
+            rows = _ranges(np.searchsorted(polygon_faces, concave), faces[concave] - 2)
+            polygons[rows, :3] = triangles
+            polygons[rows, 3] = triangles[:, 2]
+    return polygons, polygon_faces
+
+
+def _convex_faces(points, faces, starts, indices, selected):
+    """(len(selected),) bool: whether each selected face turns the same way at every corner."""
+    if not len(selected):
+        return np.ones(0, dtype=bool)
+    sides = faces[selected]
+    offsets = np.cumsum(sides) - sides
+    corner = np.arange(sides.sum()) - np.repeat(offsets, sides)
+    owner = np.repeat(np.arange(len(selected)), sides)
+    loop_start = starts[selected][owner]
+    current = points[indices[loop_start + corner]]
+    following = points[indices[loop_start + (corner + 1) % sides[owner]]]
+    preceding = points[indices[loop_start + (corner - 1) % sides[owner]]]
+
+    # Newell normal per face, then the turn at every corner measured against it
+    normals = np.add.reduceat(np.cross(current, following), offsets)
+    turns = np.einsum("ij,ij->i", np.cross(current - preceding, following - current), normals[owner])
+    tolerance = 1e-9 * np.einsum("ij,ij->i", normals, normals)[owner]
+    return np.logical_and.reduceat(turns >= -tolerance, offsets)
+
+
+# Upper bound on the (faces, corners, blockers) arrays of one ear clipping round
+EAR_CLIP_CHUNK = 1 << 21
+
+
+def _ear_clip(points, faces, starts, indices, selected):
+    """
+    (sum(sides - 2), 3) vertex indices triangulating the selected faces, face by
+    face and wound like them. Faces of similar size are clipped together as
+    padded (faces, corners) arrays: every round clips a set of non-adjacent ears
+    from every face, testing each convex corner only against the face's other
+    non-convex corners. Whatever a face has left without a clean ear is fanned.
+    """
+    sides = faces[selected]
+    emitted_faces = []
+    emitted = []
+
+    buckets = np.ceil(np.log2(sides)).astype(np.int64)
+    for bucket in np.unique(buckets).tolist():
+        members = np.flatnonzero(buckets == bucket)
+        count = sides[members].copy()
+        width = int(count.max())
+        column = np.arange(width)
+        valid = column < count[:, None]
+        loops = np.where(valid, indices[np.minimum(starts[selected[members]][:, None] + column,
+                                                   len(indices) - 1)], 0).astype(np.int64)
+
+        # Project every face onto the plane of its dominant normal axis, counter-clockwise
+        loop_points = points[loops]
+        following = np.take_along_axis(loop_points, np.where(column + 1 < count[:, None], column + 1, 0)[:, :, None], 1)
+        normals = (np.cross(loop_points, following) * valid[:, :, None]).sum(axis=1)
+        axis = np.abs(normals).argmax(axis=1)
+        kept = np.array([(1, 2), (2, 0), (0, 1)])[axis]  # (u, v) with u x v along +axis
+        xy = np.take_along_axis(loop_points, kept[:, None, :], 2)
+        xy[:, :, 0] *= np.where(normals[np.arange(len(members)), axis] < 0, -1.0, 1.0)[:, None]
+
+        remaining = valid.copy()
+        active = np.flatnonzero(count > 3)
+        while len(active):
+            step = max(1, EAR_CLIP_CHUNK // (width * width))
+            for chunk in range(0, len(active), step):
+                rows = active[chunk:chunk + step]
+                ears, previous, following = _ears(xy[rows], remaining[rows], count[rows])
+                stuck = ~ears.any(axis=1)
+                if stuck.any():
+                    _emit_fans(members[rows[stuck]], loops[rows[stuck]], remaining[rows[stuck]], emitted_faces, emitted)
+                    count[rows[stuck]] = 0
+                face, corner = np.nonzero(ears)
+                corners = np.stack((previous[face, corner], corner, following[face, corner]), axis=1)
+                emitted_faces.append(members[rows[face]])
+                emitted.append(loops[rows[face][:, None], corners])
+                remaining[rows[face], corner] = False
+                count[rows] -= ears.sum(axis=1)
+            active = np.flatnonzero(count > 3)
+
+        last = np.flatnonzero(count == 3)
+        _emit_fans(members[last], loops[last], remaining[last], emitted_faces, emitted)
+
+    emitted_faces = np.concatenate(emitted_faces)
+    order = np.argsort(emitted_faces, kind="stable")
+    return np.concatenate(emitted)[order]
+
+
+def _ears(xy, remaining, count):
+    """
+    One clipping round over padded faces: a (faces, corners) bool of pairwise
+    non-adjacent ears, and the previous/next remaining corner of every corner.
+    """
+    faces, width = remaining.shape
+    column = np.arange(width)
+    # Next remaining corner, wrapping around to the first one; previous likewise
+    ahead = np.where(remaining, column, width)
+    ahead = np.minimum.accumulate(ahead[:, ::-1], axis=1)[:, ::-1]
+    following = np.concatenate((ahead[:, 1:], np.full((faces, 1), width)), axis=1)
+    following = np.where(following == width, ahead[:, :1], following)
+    behind = np.maximum.accumulate(np.where(remaining, column, -1), axis=1)
+    previous = np.concatenate((np.full((faces, 1), -1), behind[:, :-1]), axis=1)
+    previous = np.where(previous < 0, behind[:, -1:], previous)
+
+    a = np.take_along_axis(xy, previous[:, :, None], 1)
+    c = np.take_along_axis(xy, following[:, :, None], 1)
+    turn = _cross(a, xy, c)
+    convex = remaining & (turn > 0.0)
+    blockers = remaining & ~convex
+
+    # Only non-convex corners can lie inside an ear: test the convex corners against them
+    candidates = _front(convex)
+    tested = np.take_along_axis(convex, candidates, 1)
+    blocking_corners = _front(blockers)
+    inside = (np.take_along_axis(blockers, blocking_corners, 1)[:, None, :]
+              & (blocking_corners[:, None, :] != np.take_along_axis(previous, candidates, 1)[:, :, None])
+              & (blocking_corners[:, None, :] != np.take_along_axis(following, candidates, 1)[:, :, None]))
+    points = np.take_along_axis(xy, blocking_corners[:, :, None], 1)
+    px = points[:, None, :, 0]
+    py = points[:, None, :, 1]
+    corners = [np.take_along_axis(p, candidates[:, :, None], 1) for p in (a, xy, c)]
+    for start, end in zip(corners, corners[1:] + corners[:1]):
+        # p lies left of (or on) start -> end when dx * (py - sy) - dy * (px - sx) >= 0
+        dx = end[..., 0] - start[..., 0]
+        dy = end[..., 1] - start[..., 1]
+        offset = dx * start[..., 1] - dy * start[..., 0]
+        inside &= dx[:, :, None] * py - dy[:, :, None] * px >= offset[:, :, None]
+    ears = np.zeros_like(convex)
+    np.put_along_axis(ears, candidates, tested & ~inside.any(axis=2), 1)
+
+    # Clip every other ear of each run of consecutive ears, never the last next to the first
+    rank = np.cumsum(remaining, axis=1) - 1
+    run_start = np.maximum.accumulate(np.where(remaining & ~ears, rank, -1), axis=1)
+    ears &= (rank - run_start - 1) % 2 == 0
+    ears &= ~((rank == (count - 1)[:, None]) & np.take_along_axis(ears, ahead[:, :1], 1))
+    return ears, previous, following
+
+
+def _front(mask):
+    """Column indices gathering each row's True entries to the front, as wide as the fullest row."""
+    width = max(int(mask.sum(axis=1).max(initial=0)), 1)
+    return np.argsort(~mask, axis=1, kind="stable")[:, :width]
+
+
+def _cross(o, a, b):
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+
+def _emit_fans(owners, loops, remaining, emitted_faces, emitted):
+    """Fans the remaining corners of each padded face from its first remaining corner."""
+    if not len(owners):
+        return
+    order = np.argsort(~remaining, axis=1, kind="stable")
+    left = remaining.sum(axis=1)
+    fans = np.maximum(left - 2, 0)
+    face = np.repeat(np.arange(len(owners)), fans)
+    k = _ranges(np.ones(len(owners), dtype=np.int64), fans)
+    corners = np.stack((np.zeros_like(k), k, k + 1), axis=1)
+    emitted_faces.append(owners[face])
+    emitted.append(loops[face[:, None], order[face[:, None], corners]])
+
+
+def ngon_rounds(faces, indices, polygon_faces, seed=0):
+    """
+    Groups the fan-triangulated faces (> 4 sides) into rounds of faces that share
+    no edge, so each round can be melted into N-gons with one polygon selection
+    without neighbours fusing. Returns one (P,) bool polygon mask per round.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    large = np.flatnonzero(faces > 4)
+    if not len(large):
+        return []
+
+    # Outline edges of the large faces as sorted (min, max) keys
+    starts = np.zeros(len(faces), dtype=np.int64)
+    np.cumsum(faces[:-1], out=starts[1:])
+    sides = faces[large]
+    edge_face = np.repeat(np.arange(len(large)), sides)
+    corner = np.arange(len(edge_face)) - np.repeat(np.cumsum(sides) - sides, sides)
+    a = indices[starts[large][edge_face] + corner]
+    b = indices[starts[large][edge_face] + (corner + 1) % sides[edge_face]]
+    keys = np.minimum(a, b) * (int(indices.max()) + 1) + np.maximum(a, b)
+
+    order = np.argsort(keys, kind="stable")
+    shared = np.flatnonzero(keys[order][1:] == keys[order][:-1])
+    u = edge_face[order][shared]
+    v = edge_face[order][shared + 1]
+    keep = u != v
+    u, v = u[keep], v[keep]
+
+    # Each round takes the faces whose random priority is lowest among their remaining neighbours
+    priority = np.random.default_rng(seed).permutation(len(large))
+    remaining = np.ones(len(large), dtype=bool)
+    rounds = []
+    while remaining.any():
+        active = remaining[u] & remaining[v]
+        blocked = np.zeros(len(large), dtype=bool)
+        pu, pv = priority[u[active]], priority[v[active]]
+        blocked[np.where(pu > pv, u[active], v[active])] = True
+        chosen = remaining & ~blocked
+        remaining &= ~chosen
+
+        selected = np.zeros(len(faces), dtype=bool)
+        selected[large[chosen]] = True
+        rounds.append(selected[polygon_faces])
+    return rounds
+
+
+def buffer_fingerprint(array):
+    """Cheap identity of a buffer's contents: (byte length, crc32), computed without copying."""
+    if array is None:
+        return None
+    data = memoryview(np.ascontiguousarray(array)).cast("B")
+    return len(data), zlib.crc32(data)
+
+
+def convert_points(points, scale, out):
+    """
+    Plasticity (Z-up, right-handed) -> C4D (Y-up, left-handed): scales and swaps
+    Y/Z straight into out (N, 3). Products are taken in float64, so dividing by
+    the scale gives the float32 source points back exactly (see rescale).
+    """
+    np.multiply(points[:, 0], scale, out=out[:, 0], dtype=np.float64)
+    np.multiply(points[:, 2], scale, out=out[:, 1], dtype=np.float64)
+    np.multiply(points[:, 1], scale, out=out[:, 2], dtype=np.float64)
+    return out
+
+
+def convert_polygons(polygons, out):
+    """
+    Reverses the winding of (P, 4) CPolygons into out, undoing the mirror of the
+    Y/Z swap: quads (a, b, c, d) -> (a, d, c, b), triangles (a, b, c, c) -> (a, c, b, b).
+    """
+    a, b, c, d = polygons.T
+    out[:, 0] = a
+    out[:, 1] = d
+    out[:, 2] = c
+    out[:, 3] = b
+    triangles = np.flatnonzero(c == d)
+    out[triangles, 1] = c[triangles]
+    out[triangles, 2] = b[triangles]
+    return out
+
+
+def convert_normals(normals, polygons, out):
+    """
+    Per-point normals gathered onto the corners of already converted polygons,
+    Y/Z swapped and packed the way Tnormal stores them: (P, 4, 3) int16 * 32000.
+    """
+    corners = np.asarray(normals, dtype=np.float32).reshape(-1, 3)[polygons]
+    np.multiply(corners[..., 0], 32000.0, out=out[..., 0], casting="unsafe")
+    np.multiply(corners[..., 2], 32000.0, out=out[..., 1], casting="unsafe")
+    np.multiply(corners[..., 1], 32000.0, out=out[..., 2], casting="unsafe")
+    return out
+
+
+class GeometryWriter:
+    """
+    Fills PolygonObjects from NumPy buffers in Plasticity's space. Points are
+    float32/float64 (N, 3) or flat, polygons are (P, 4) int32 in CPolygon order
+    (a, b, c, d), normals are per point. Scale, the Z-up -> Y-up swap and the
+    winding fix are applied on the way into the destination buffers.
+
+    The bulk route copies straight into the object's Tpoint/Tpolygon/Tnormal
+    storage via VariableTag.GetLowlevelDataAddressW(); when that isn't available
+    the fallback builds Vectors/CPolygons with map() instead of Python loops.
+    Every write is timed; the last few are kept in `timings`.
+    """
+
+    def __init__(self, history=256, scale=1.0):
+        self.timings = collections.deque(maxlen=history)
+        self.bulk = True  # cleared once the low-level buffer API turns out to be missing
+        self.scale = scale
+
+    def write(self, obj, points, polygons=None, name=None, normals=None):
+        """
+        Writes points (and polygons, unless None) into obj, resizing it when the
+        counts differ, plus a normal tag when normals are given. Returns the route used.
+        """
+        start = time.perf_counter()
+        points = np.asarray(points).reshape(-1, 3)
+        point_count = len(points)
+        polygon_count = obj.GetPolygonCount() if polygons is None else len(polygons)
+        if polygons is not None:
+            polygons = np.asarray(polygons, dtype=np.int32).reshape(-1, 4)
+
+        if obj.GetPointCount() != point_count or obj.GetPolygonCount() != polygon_count:
+            obj.ResizeObject(point_count, polygon_count)
+
+        route = "bulk"
+        done, written = self.__write_bulk(obj, points, polygons) if self.bulk else (False, None)
+        if not done:
+            route = "fallback"
+            written = self.__write_fallback(obj, points, polygons)
+
+        if normals is not None and len(normals) == point_count * 3:
+            self.__write_normals(obj, normals, written)
+        elif polygons is not None and obj.GetTag(c4d.Tnormal):
+            obj.KillTag(c4d.Tnormal)  # sized for the old polygons
+
+        obj.Message(c4d.MSG_UPDATE)
+        elapsed = time.perf_counter() - start
+        self.timings.append((name or obj.GetName(), point_count, polygon_count, route, elapsed))
+        return route
+
+    def rescale(self, obj, previous, scale):
+        """
+        Rewrites the points in obj, written at the previous scale, for a new one.
+        They are recovered as Plasticity's float32 values first and scaled from
+        those, so any number of changes leaves the same points as a fresh write.
+        """
+        point_buffer = _lowlevel_array(obj, c4d.Tpoint, np.float64, obj.GetPointCount() * 3) if self.bulk else None
+        points = point_buffer if point_buffer is not None else self.read_points(obj).ravel()
+        source = (points / previous).astype(np.float32)
+        if point_buffer is not None:
+            np.multiply(source, scale, out=point_buffer, dtype=np.float64)
+        else:
+            xs, ys, zs = np.multiply(source, scale, dtype=np.float64).reshape(-1, 3).T.tolist()
+            obj.SetAllPoints(list(map(c4d.Vector, xs, ys, zs)))
+        obj.Message(c4d.MSG_UPDATE)
+
+    def read_polygons(self, obj):
+        """The (P, 4) int32 CPolygons stored in obj, as a view when the low-level buffer is available."""
+        polygon_buffer = _lowlevel_array(obj, c4d.Tpolygon, np.int32, obj.GetPolygonCount() * 4) if self.bulk else None
+        if polygon_buffer is not None:
+            return polygon_buffer.reshape(-1, 4)
+        polygons = obj.GetAllPolygons()
+        return np.array([(p.a, p.b, p.c, p.d) for p in polygons], dtype=np.int32).reshape(-1, 4)
+
+    def read_points(self, obj):
+        """The (N, 3) float64 points stored in obj, as a view when the low-level buffer is available."""
+        point_buffer = _lowlevel_array(obj, c4d.Tpoint, np.float64, obj.GetPointCount() * 3) if self.bulk else None
+        if point_buffer is not None:
+            return point_buffer.reshape(-1, 3)
+        return np.array([(p.x, p.y, p.z) for p in obj.GetAllPoints()], dtype=np.float64).reshape(-1, 3)
+
+    def write_uvs(self, obj, uvs):
+        """Writes (P, 4, 2) per-corner UVs into obj's UVW tag, creating or resizing it as needed. Returns the tag."""
+        polygon_count = obj.GetPolygonCount()
+        tag = obj.GetTag(c4d.Tuvw)
+        if tag is None or tag.GetDataCount() != polygon_count:
+            obj.KillTag(c4d.Tuvw)
+            tag = obj.MakeVariableTag(c4d.Tuvw, polygon_count)
+
+        # UVWStruct is 4 corners x float32 (u, v, w) per polygon
+        uvw_buffer = _lowlevel_array(obj, c4d.Tuvw, np.float32, polygon_count * 12) if self.bulk else None
+        if uvw_buffer is not None:
+            corners = uvw_buffer.reshape(-1, 4, 3)
+            corners[..., :2] = uvs
+            corners[..., 2] = 0.0
+        else:
+            for index, corners in enumerate(np.asarray(uvs, dtype=np.float64).tolist()):
+                a, b, c, d = (c4d.Vector(u, v, 0.0) for u, v in corners)
+                tag.SetSlow(index, a, b, c, d)
+        tag.Message(c4d.MSG_UPDATE)
+        return tag
+
+    def write_polygon_colors(self, obj, colors):
+        """
+        Writes one RGB color per polygon (P, 3) into a per-polygon vertex color
+        tag, creating or resizing it as needed. Returns the tag.
+        """
+        polygon_count = obj.GetPolygonCount()
+        tag = obj.GetTag(c4d.Tvertexcolor)
+        if tag is None or tag.GetDataCount() != polygon_count or tag.IsPerPointColor():
+            obj.KillTag(c4d.Tvertexcolor)
+            tag = c4d.VertexColorTag(polygon_count)
+            tag.SetPerPointMode(False)
+            obj.InsertTag(tag)
+
+        # Per-polygon mode stores 4 corners x RGBA float32 per polygon
+        color_buffer = _lowlevel_array(tag, None, np.float32, polygon_count * 16) if self.bulk else None
+        if color_buffer is not None:
+            corners = color_buffer.reshape(-1, 4, 4)
+            corners[..., :3] = colors[:, None, :]
+            corners[..., 3] = 1.0
+        else:
+            data = tag.GetDataAddressW()
+            for index, (r, g, b) in enumerate(np.asarray(colors, dtype=np.float64).tolist()):
+                color = c4d.Vector4d(r, g, b, 1.0)
+                c4d.VertexColorTag.SetPolygon(data, index, {"a": color, "b": color, "c": color, "d": color})
+        tag.Message(c4d.MSG_UPDATE)
+        return tag
+
+    def __write_bulk(self, obj, points, polygons):
+        """
+        Returns (done, polygons): the converted polygons as now stored in obj,
+        or done=False when this object's low-level buffers can't be used. Only a
+        missing buffer API turns the bulk route off for later writes.
+        """
+        empty = np.empty((0, 4), dtype=np.int32)
+        if not len(points) and not obj.GetPolygonCount():
+            return True, empty
+        try:
+            point_buffer = _lowlevel_array(obj, c4d.Tpoint, np.float64, len(points) * 3) if len(points) else empty
+            polygon_buffer = _lowlevel_array(obj, c4d.Tpolygon, np.int32, obj.GetPolygonCount() * 4) if obj.GetPolygonCount() else empty
+        except (AttributeError, TypeError, NotImplementedError) as e:
+            print(f"[geometry] Bulk write unavailable, using fallback: {e}")
+            self.bulk = False
+            return False, None
+        if point_buffer is None or polygon_buffer is None:
+            return False, None
+
+        try:
+            convert_points(points, self.scale, point_buffer.reshape(-1, 3))
+            polygon_buffer = polygon_buffer.reshape(-1, 4)
+            if polygons is not None:
+                convert_polygons(polygons, polygon_buffer)
+            return True, polygon_buffer
+        except Exception as e:
+            print(f"[geometry] Bulk write failed for {obj.GetName()}, using fallback: {e}")
+            return False, None
+
+    def __write_fallback(self, obj, points, polygons):
+        converted = convert_points(points, self.scale, np.empty((len(points), 3), dtype=np.float64))
+        xs, ys, zs = converted.T.tolist()
+        obj.SetAllPoints(list(map(c4d.Vector, xs, ys, zs)))
+        if polygons is None:
+            return None
+        polygons = convert_polygons(polygons, np.empty_like(polygons))
+        if len(polygons):
+            a, b, c, d = polygons.T.tolist()
+            collections.deque(map(obj.SetPolygon, range(len(a)), map(c4d.CPolygon, a, b, c, d)), maxlen=0)
+        return polygons
+
+    def __write_normals(self, obj, normals, polygons):
+        if polygons is None:
+            return  # points-only fallback write; the existing normal tag is kept
+        polygon_count = len(polygons)
+        tag = obj.GetTag(c4d.Tnormal)
+        if tag is None or tag.GetDataCount() != polygon_count:
+            obj.KillTag(c4d.Tnormal)
+            tag = obj.MakeVariableTag(c4d.Tnormal, polygon_count)
+        if obj.GetTag(c4d.Tphong) is None:
+            obj.MakeTag(c4d.Tphong)
+
+        normal_buffer = _lowlevel_array(obj, c4d.Tnormal, np.int16, polygon_count * 12) if self.bulk else None
+        if normal_buffer is not None:
+            convert_normals(normals, polygons, normal_buffer.reshape(-1, 4, 3))
+        else:
+            packed = convert_normals(normals, polygons, np.empty((polygon_count, 4, 3), dtype=np.int16))
+            tag.SetAllHighlevelData(packed.ravel().tolist())
+
+    def report(self, last=1):
+        for name, point_count, polygon_count, route, elapsed in list(self.timings)[-last:]:
+            print(f"[geometry] {name}: {point_count} points, {polygon_count} polygons via {route} in {elapsed * 1000:.2f} ms")
+
+
+def _lowlevel_array(obj, tag_type, dtype, count):
+    """
+    Writable NumPy view over a variable tag's storage, or None if its size doesn't
+    match. obj is the object (tag_type picks its tag) or, with tag_type None, the tag.
+    """
+    tag = obj.GetTag(tag_type) if tag_type is not None else obj
+    if tag is None:
+        return None
+    buffer = tag.GetLowlevelDataAddressW()
+    if buffer is None:
+        return None
+    array = np.frombuffer(memoryview(buffer).cast("B"), dtype=dtype)
+    if array.size != count or not array.flags.writeable:
+        return None
+    return array
@@ -1,10 +1,19 @@
 # handler.py
 import traceback
+import time
 from enum import Enum
 import numpy as np
 import re
 import c4d
 
+from apply_queue import ApplyQueue
+from coalesce import TransactionCoalescer
+from geometry import GeometryWriter, buffer_fingerprint, faces_to_polygons, ngon_rounds, triangles_to_polygons
+from hierarchy import parent_first, placement_changes
+from scene_commit import SceneCommit
+from topology import FaceIndex, match_polygons, plasticity_edges
+from uv import chart_layouts
+
 class PlasticityIdUniquenessScope(Enum):
     ITEM = 0
     GROUP = 1
@@ -17,20 +26,132 @@ class ObjectType(Enum):
     GROUP = 5
     EMPTY = 6
 
+def _index_ids(index):
+    """Plasticity ids of one index scope as an int64 array (ids are uint32 on the wire)."""
+    return np.fromiter(index.keys(), dtype=np.int64, count=len(index))
+
+
 class SceneHandler:
-    def __init__(self, plasticity_ui=None):
+    # Geometry channels read by the scene code; the client skips the rest while decoding.
+    CONSUMED_CHANNELS = ("vertices", "faces", "normals", "groups", "face_ids")
+
+    def __init__(self, plasticity_ui=None, apply_budget_ms=15.0, live_link_undo=False, scale=1.0):
         self.connected = False
         self.plasticity_ui = plasticity_ui  # Optional UI reference
         self.files = {}
+        # Scene work queued by the client thread, drained on C4D's main thread
+        self.apply_queue = ApplyQueue(apply_budget_ms)
+        # Live-link transactions waiting for the queue, newest version per object only
+        self.coalescer = TransactionCoalescer()
+        # Converts Plasticity units and axes while writing; see set_scale()
+        self.geometry_writer = GeometryWriter(scale=scale)
+        # (filename, plasticity_id) -> fingerprints of the (vertices, faces, normals) last written
+        self.geometry_hashes = {}
+        self.geometry_cache_hits = 0
+        self.geometry_cache_misses = 0
+        # Last applied version per (filename, plasticity_id) and per file, and the newest
+        # file version announced by the server (written from the client thread)
+        self.applied_versions = {}
+        self.file_versions = {}
+        self.announced_versions = {}
+        self.stale_updates = 0
+        # filename -> (document, hierarchy dirty count, inbox) recorded after our own edits;
+        # self.files[filename] is only rescanned when C4D reports other hierarchy changes
+        self.index_stamps = {}
+        # filename -> {(scope, plasticity_id): (parent_id, flags)} as last applied to the scene
+        self.placements = {}
+        self.hierarchy_mutations = 0
+        # (filename, plasticity_id) -> face index of every polygon of the last N-gon refacet
+        self.polygon_faces = {}
+        # (filename, plasticity_id) -> FaceIndex from Plasticity faces to polygons of the mesh in the scene
+        self.face_indices = {}
+        # (filename, plasticity_id) -> (version, faces, positions, indices, normals, groups, face_ids) of the
+        # last refacet, so switching between N-gons and triangles rebuilds locally, face index included
+        self.refacet_buffers = {}
+        self.triangulate = False
+        # One undo group and one EventAdd per transaction and tick; live-link pushes skip undo by default
+        self.live_link_undo = live_link_undo
+        self.commit_stats = {"commits": 0, "event_adds": 0, "undo_groups": 0}
 
     def sanitize_name(self, name):
         """Sanitizes a string to remove invalid characters."""
         return re.sub(r'[^a-zA-Z0-9_]', '_', name) if isinstance(name, str) else ""
 
+    def __enqueue(self, work, on_pause=None):
+        """Queues scene work for the main thread; without a UI to drain it, applies it right away."""
+        self.apply_queue.put(work, on_pause)
+        if self.plasticity_ui and hasattr(self.plasticity_ui, 'schedule_apply'):
+            self.plasticity_ui.schedule_apply()
+        else:
+            self.apply_queue.drain(0)
+
+    def __enqueue_commit(self, apply, *args, undo=True):
+        """
+        Queues generator apply(commit, *args) with a SceneCommit of its own. The
+        commit redraws whenever a tick ends with the generator suspended and closes
+        its undo group when the generator finishes.
+        """
+        commit = SceneCommit(undo, self.commit_stats)
+        self.__enqueue(apply(commit, *args), commit.redraw)
+
+    def apply_pending(self, budget_ms=None):
+        """Applies queued scene work within the per-tick budget. Returns True while work is left."""
+        return self.apply_queue.drain(budget_ms)
+
+    def geometry_cache_metrics(self):
+        """Hit/miss counters of the content-hash cache that skips unchanged geometry."""
+        return {
+            "entries": len(self.geometry_hashes),
+            "hits": self.geometry_cache_hits,
+            "misses": self.geometry_cache_misses,
+        }
+
+    def version_metrics(self):
+        """Counters of the version gate: tracked objects and updates dropped as stale."""
+        return {"objects": len(self.applied_versions), "stale": self.stale_updates}
+
+    def is_outdated(self, filename):
+        """True when the server announced a newer version of the file than the one applied."""
+        return self.announced_versions.get(filename, -1) > self.file_versions.get(filename, -1)
+
+    def selected_plasticity_ids(self, doc=None):
+        """Plasticity ids of the selected bridge meshes, grouped by filename."""
+        doc = doc or c4d.documents.GetActiveDocument()
+        selected = {}
+        for obj in doc.GetActiveObjects(c4d.GETACTIVEOBJECTFLAGS_CHILDREN):
+            bc = obj.GetDataInstance()
+            plasticity_id = bc.GetInt32(1001) if bc else 0
+            if plasticity_id and not obj.CheckType(c4d.Onull):
+                selected.setdefault(bc.GetString(1002), []).append(plasticity_id)
+        return selected
+
+    def __reset_files(self):
+        self.files.clear()
+        self.geometry_hashes.clear()
+        self.applied_versions.clear()
+        self.file_versions.clear()
+        self.index_stamps.clear()
+        self.placements.clear()
+        self.polygon_faces.clear()
+        self.face_indices.clear()
+        self.refacet_buffers.clear()
+
+    def __is_stale(self, filename, plasticity_id, version):
+        applied = self.applied_versions.get((filename, plasticity_id))
+        return applied is not None and version <= applied
+
+    def __forget_object(self, filename, plasticity_id):
+        self.applied_versions.pop((filename, plasticity_id), None)
+        self.geometry_hashes.pop((filename, plasticity_id), None)
+        self.placements.get(filename, {}).pop((PlasticityIdUniquenessScope.ITEM, plasticity_id), None)
+        self.polygon_faces.pop((filename, plasticity_id), None)
+        self.face_indices.pop((filename, plasticity_id), None)
+        self.refacet_buffers.pop((filename, plasticity_id), None)
+
     def on_connect(self):
         """Called when the client connects to the server."""
         self.connected = True
-        self.files = {}
+        self.__enqueue(self.__reset_files)
         print("✅ Connected to Plasticity server")
         if self.plasticity_ui and hasattr(self.plasticity_ui, 'update_ui_connected'):
             self.plasticity_ui.update_ui_connected()
@@ -38,7 +159,9 @@ class SceneHandler:
     def on_disconnect(self):
         """Called when the client disconnects from the server."""
         self.connected = False
-        self.files = {}
+        self.apply_queue.clear()
+        self.coalescer.clear()
+        self.__enqueue(self.__reset_files)
         print("❌ Disconnected from Plasticity server")
         if self.plasticity_ui and hasattr(self.plasticity_ui, 'update_ui_disconnected'):
             self.plasticity_ui.update_ui_disconnected()
@@ -46,6 +169,18 @@ class SceneHandler:
     def on_new_file(self, filename):
         """Called when a new file is received from Plasticity."""
         print(f"📄 New file received: {filename}")
+        # Announcements are recorded on this thread, so drop the old file's here
+        self.announced_versions.pop(filename, None)
+        self.__enqueue(lambda: self.__register_file(filename))
+
+    def __register_file(self, filename):
+        """(Re)starts tracking a file. A new document may reuse the name with versions restarting from 0."""
+        self.file_versions.pop(filename, None)
+        for cache in (self.applied_versions, self.geometry_hashes, self.polygon_faces, self.refacet_buffers, self.face_indices):
+            for key in [key for key in cache if key[0] == filename]:
+                del cache[key]
+        self.placements.pop(filename, None)
+        self.index_stamps.pop(filename, None)
         self.files[filename] = {
             PlasticityIdUniquenessScope.ITEM: {},
             PlasticityIdUniquenessScope.GROUP: {}
@@ -53,34 +188,64 @@ class SceneHandler:
 
 
     def on_new_version(self, filename, version):
-        """Called when a new version of a file is received."""
+        """
+        Called from the client thread when a new version of a file is announced.
+        Only records it: the scene is marked outdated until a transaction or list
+        of that version has been applied.
+        """
+        if version > self.announced_versions.get(filename, -1):
+            self.announced_versions[filename] = version
         print(f"🔄 New version {version} received for file: {filename}")
+        if self.plasticity_ui and hasattr(self.plasticity_ui, 'schedule_apply'):
+            self.plasticity_ui.schedule_apply()  # refreshes the outdated status
 
     def on_transaction(self, transaction):
-        """Called when a transaction message is received."""
+        """Called from the client thread when a transaction message is received."""
+        if self.coalescer.push(transaction):
+            self.__enqueue_commit(self.__apply_coalesced, undo=self.live_link_undo)
+
+    def __apply_coalesced(self, commit):
+        for transaction in self.coalescer.take():
+            yield from self.__apply_transaction(commit, transaction)
+
+    def __apply_transaction(self, commit, transaction):
         try:
             filename = transaction.get("filename", "unknown")
             version = transaction.get("version", 0)
             print(f"📝 Transaction received for {filename} (v{version})")
 
             if filename not in self.files:
-                self.on_new_file(filename)
+                self.__register_file(filename)
 
-            inbox = self.__prepare(filename)
+            # Already covered by a transaction or list of the same or a later version
+            if version <= self.file_versions.get(filename, -1):
+                print(f"⏭️ Skipping stale transaction v{version} (applied v{self.file_versions[filename]})")
+                self.stale_updates += 1
+                return
+            self.file_versions[filename] = version
 
-            if "delete" in transaction:
-                print(f"🗑️ Deleted {len(transaction['delete'])} objects")
-                for pid in transaction["delete"]:
-                    self.__delete_object(filename, version, pid)
+            with commit:
+                inbox = self.__prepare(filename)
 
-            if "add" in transaction:
-                print(f"➕ Added {len(transaction['add'])} objects")
-                print("send to replace objects")
-                self.__replace_objects(filename, inbox, version, transaction["add"])
+                if "delete" in transaction and len(transaction["delete"]):
+                    deleted = np.unique(np.asarray(transaction["delete"], dtype=np.int64))
+                    items = self.files[filename][PlasticityIdUniquenessScope.ITEM]
+                    # Ids that aren't items are group deletes
+                    groups = np.setdiff1d(deleted, _index_ids(items), assume_unique=True)
+                    removed = self.__delete_objects(commit, filename, PlasticityIdUniquenessScope.ITEM, np.setdiff1d(deleted, groups, assume_unique=True))
+                    removed += self.__delete_objects(commit, filename, PlasticityIdUniquenessScope.GROUP, groups)
+                    print(f"🗑️ Deleted {removed} of {len(deleted)} objects")
 
-            if "update" in transaction:
-                print(f"✏️ Updated {len(transaction['update'])} objects")
-                self.__replace_objects(filename, inbox, version, transaction["update"])
+                if "add" in transaction:
+                    print(f"➕ Added {len(transaction['add'])} objects")
+                    print("send to replace objects")
+                    yield from self.__replace_objects(commit, filename, inbox, version, transaction["add"])
+
+                if "update" in transaction:
+                    print(f"✏️ Updated {len(transaction['update'])} objects")
+                    yield from self.__replace_objects(commit, filename, inbox, version, transaction["update"])
+
+                self.__stamp_index(filename)
 
         except Exception as e:
             print(f"❌ Error processing transaction: {e}")
@@ -88,47 +253,40 @@ class SceneHandler:
 
 
     def on_list(self, message):
-        """Called when a list message is received (full sync)."""
+        """Called from the client thread when a list message is received (full sync)."""
         print("📋 List message received")
+        self.__enqueue_commit(self.__apply_list, message)
 
+    def __apply_list(self, commit, message):
         try:
             filename = message.get("filename", "unknown")
             version = message.get("version", 0)
             print(f"📝 Transaction received for {filename} (v{version})")
             if filename not in self.files:
-                self.on_new_file(filename)
-
-            inbox = self.__prepare(filename)
+                self.__register_file(filename)
+            self.file_versions[filename] = max(version, self.file_versions.get(filename, -1))
 
-            all_items = set()
-            all_groups = set()
+            with commit:
+                inbox = self.__prepare(filename)
 
-            if "add" in message:
-                for item in message["add"]:
-                    if item["type"] == ObjectType.GROUP.value:
-                        all_groups.add(item["id"])
-                    else:
-                        all_items.add(item["id"])
-
-                self.__replace_objects(filename, inbox, version, message["add"])
+                objects = message.get("add", [])
+                ids = np.fromiter((item["id"] for item in objects), dtype=np.int64, count=len(objects))
+                is_group = np.fromiter((item["type"] == ObjectType.GROUP.value for item in objects), dtype=bool, count=len(objects))
 
-            # Clean up deleted ITEMs
-            to_delete = []
-            for plasticity_id in self.files[filename][PlasticityIdUniquenessScope.ITEM]:
-                if plasticity_id not in all_items:
-                    to_delete.append(plasticity_id)
-            for plasticity_id in to_delete:
-                self.__delete_object(filename, version, plasticity_id)
+                if objects:
+                    yield from self.__replace_objects(commit, filename, inbox, version, objects)
 
-            # Clean up deleted GROUPs
-            to_delete = []
-            for plasticity_id in self.files[filename][PlasticityIdUniquenessScope.GROUP]:
-                if plasticity_id not in all_groups:
-                    to_delete.append(plasticity_id)
-            for plasticity_id in to_delete:
-                self.__delete_group(filename, version, plasticity_id)
+                # Anything indexed but missing from the full list was deleted in Plasticity; items go first
+                # so their undo steps don't depend on groups that are removed along with them
+                removed = 0
+                for scope, incoming in ((PlasticityIdUniquenessScope.ITEM, ids[~is_group]),
+                                        (PlasticityIdUniquenessScope.GROUP, ids[is_group])):
+                    orphans = np.setdiff1d(_index_ids(self.files[filename][scope]), incoming)
+                    removed += self.__delete_objects(commit, filename, scope, orphans)
+                if removed:
+                    print(f"🗑️ Removed {removed} objects no longer in {filename}")
 
-            c4d.EventAdd()
+                self.__stamp_index(filename)
 
         except Exception as e:
             print(f"❌ Error processing list message: {e}")
@@ -137,31 +295,102 @@ class SceneHandler:
 
 
     def on_refacet(self, filename, version, plasticity_ids, versions, faces, positions, indices, normals, groups, face_ids):
-        """Called when a refacet message is received."""
+        """Called from the client thread when a refacet message is received, with per-object lists."""
+        print(f"🔷 Refacet received for {filename} (v{version})")
+        items = zip(plasticity_ids, versions, faces or [None] * len(plasticity_ids), positions,
+                    indices, normals, groups, face_ids)
+        self.__enqueue_commit(self.__apply_refacet, filename, version, items)
+
+    def on_refacet_batch(self, filename, version, batch):
+        """Called from the client thread with a client RefacetBatch when csr_refacet is on."""
         print(f"🔷 Refacet received for {filename} (v{version})")
-        print(f"Affected objects: {plasticity_ids}")
+        self.__enqueue_commit(self.__apply_refacet, filename, version, batch)
 
+    def __apply_refacet(self, commit, filename, version, items):
         try:
-            self.__prepare(filename)
+            with commit:
+                self.__prepare(filename)
+
+                for plasticity_id, item_version, face, position, index, normal, group, face_id in items:
+                    obj = self.files[filename][PlasticityIdUniquenessScope.ITEM].get(plasticity_id)
+                    if not obj:
+                        print(f"Object with plasticity_id {plasticity_id} not found.")
+                        continue
+
+                    # Refacetted polygons no longer match the buffers from the last update
+                    self.geometry_hashes.pop((filename, plasticity_id), None)
+                    self.refacet_buffers[(filename, plasticity_id)] = (version, face, position, index, normal, group, face_id)
+                    self.__update_mesh_ngons(commit, obj, version, face, position, index, normal, group, face_id,
+                                             cache_key=(filename, plasticity_id))
+                    self.__stamp_index(filename)
+                    yield
+                    self.__prepare(filename)
 
-            for i in range(len(plasticity_ids)):
-                plasticity_id = plasticity_ids[i]
-                obj = self.files[filename][PlasticityIdUniquenessScope.ITEM].get(plasticity_id)
-                if not obj:
-                    print(f"Object with plasticity_id {plasticity_id} not found.")
-                    continue
+        except Exception as e:
+            print(f"Error processing refacet: {e}")
+            traceback.print_exc()
 
-                face = faces[i] if faces else None
-                position = positions[i]
-                index = indices[i]
-                normal = normals[i]
-                group = groups[i]
-                face_id = face_ids[i]
 
-                self.__update_mesh_ngons(obj, version, face, position, index, normal, group, face_id)
+    def set_scale(self, scale):
+        """
+        Sets the Plasticity -> C4D unit scale applied to points as they are written.
+        Meshes already in the scene are rescaled in place, without a refresh. The
+        change is queued, so work queued before it still writes at the old scale.
+        """
+        if scale <= 0:
+            return
+        self.__enqueue_commit(self.__rescale, scale)
+
+    def __rescale(self, commit, scale):
+        try:
+            previous = self.geometry_writer.scale
+            if scale == previous:
+                return
+            self.geometry_writer.scale = scale
+            print(f"📏 Scale {previous:g} -> {scale:g}")
+            with commit:
+                for filename in list(self.files):
+                    self.__prepare(filename)
+                    for obj in list(self.files[filename][PlasticityIdUniquenessScope.ITEM].values()):
+                        if isinstance(obj, c4d.PolygonObject):
+                            commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+                            self.geometry_writer.rescale(obj, previous, scale)
+                    self.__stamp_index(filename)
+                    yield
 
         except Exception as e:
-            print(f"Error processing refacet: {e}")
+            print(f"Error rescaling meshes: {e}")
+            traceback.print_exc()
+
+    def set_triangulate(self, triangulate):
+        """
+        Switches refaceted meshes between N-gons and triangles. Rebuilds them from
+        the cached refacet buffers; no request goes to Plasticity.
+        """
+        if triangulate == self.triangulate:
+            return
+        self.triangulate = triangulate
+        print(f"🔷 Facet mode: {'triangles' if triangulate else 'N-gons'} ({len(self.refacet_buffers)} cached refacets)")
+        if self.refacet_buffers:
+            self.__enqueue_commit(self.__rebuild_refacets)
+
+    def __rebuild_refacets(self, commit):
+        try:
+            with commit:
+                for (filename, plasticity_id), (version, face, position, index, normal, group, face_id) in list(self.refacet_buffers.items()):
+                    if filename not in self.files:
+                        continue
+                    self.__prepare(filename)
+                    obj = self.files[filename][PlasticityIdUniquenessScope.ITEM].get(plasticity_id)
+                    if not obj:
+                        continue
+                    self.__update_mesh_ngons(commit, obj, version, face, position, index, normal, group, face_id,
+                                             cache_key=(filename, plasticity_id))
+                    self.__stamp_index(filename)
+                    yield
+
+        except Exception as e:
+            print(f"Error rebuilding refacets: {e}")
             traceback.print_exc()
 
 
@@ -179,30 +408,15 @@ class SceneHandler:
         try:
             print(f"Creating mesh: {name}")
 
-            # Build vertex list
-            points = []
-            for i in range(0, len(vertices), 3):
-                x = float(vertices[i])
-                y = float(vertices[i + 1])
-                z = float(vertices[i + 2])
-                points.append(c4d.Vector(x, y, z))
-
-            # Build polygon list
-            polygons = []
             try:
-                face_array = np.array(indices, dtype=np.int32).reshape(-1, 3)
-                for face in face_array:
-                    polygons.append(c4d.CPolygon(face[0], face[1], face[2], face[2]))  # triangle
+                polygons = triangles_to_polygons(indices)
             except Exception as e:
                 print(f"[create_mesh] Error reshaping/processing faces: {e}")
                 return None
 
-            mesh = c4d.PolygonObject(len(points), len(polygons))
-            mesh.SetAllPoints(points)
-            for i, poly in enumerate(polygons):
-                mesh.SetPolygon(i, poly)
-
-            mesh.Message(c4d.MSG_UPDATE)
+            mesh = c4d.PolygonObject(len(vertices) // 3, len(polygons))
+            self.geometry_writer.write(mesh, vertices, polygons, name, normals)
+            self.geometry_writer.report()
             return mesh
 
         except Exception as e:
@@ -211,24 +425,152 @@ class SceneHandler:
             return None
 
 
-    def __update_object_and_mesh(self, obj, object_type, version, name, verts, indices, normals, groups, face_ids, parent_id):
+    def __index_faces(self, cache_key, groups, face_ids, polygon_count):
+        if groups is None or face_ids is None:
+            self.face_indices.pop(cache_key, None)
+            return
+        self.face_indices[cache_key] = FaceIndex.from_groups(groups, face_ids, polygon_count)
+
+    def __selected_meshes(self, doc):
+        """(key, object) of the selected bridge meshes."""
+        for filename, plasticity_ids in self.selected_plasticity_ids(doc).items():
+            if filename not in self.files:
+                continue
+            self.__prepare(filename)
+            for plasticity_id in plasticity_ids:
+                obj = self.files[filename][PlasticityIdUniquenessScope.ITEM].get(plasticity_id)
+                if isinstance(obj, c4d.PolygonObject):
+                    yield (filename, plasticity_id), obj
+
+    def select_plasticity_faces(self, doc=None):
+        """
+        Grows the polygon selection of the selected meshes to whole Plasticity faces.
+        Returns the number of polygons selected.
+        """
+        doc = doc or c4d.documents.GetActiveDocument()
+        total = 0
+        with SceneCommit(True, self.commit_stats) as commit:
+            for key, obj in self.__selected_meshes(doc):
+                face_index = self.face_indices.get(key)
+                polygon_count = obj.GetPolygonCount()
+                if face_index is None or len(face_index.polygon_faces) != polygon_count:
+                    print(f"[select_faces] No Plasticity face data for {obj.GetName()}")
+                    continue
+                selection = obj.GetPolygonS()
+                selected = face_index.expand(selection.GetAll(polygon_count))
+                commit.touch(obj, c4d.UNDOTYPE_CHANGE_SELECTION)
+                selection.SetAll(selected.tolist())
+                total += int(np.count_nonzero(selected))
+        return total
+
+    def select_plasticity_edges(self, doc=None):
+        """
+        Replaces the edge selection of the selected meshes with the Plasticity
+        face boundaries. Returns the number of polygon edges selected.
+        """
+        doc = doc or c4d.documents.GetActiveDocument()
+        total = 0
+        with SceneCommit(True, self.commit_stats) as commit:
+            for key, obj in self.__selected_meshes(doc):
+                face_index = self.face_indices.get(key)
+                polygon_count = obj.GetPolygonCount()
+                if face_index is None or len(face_index.polygon_faces) != polygon_count:
+                    print(f"[select_edges] No Plasticity face data for {obj.GetName()}")
+                    continue
+                if face_index.edges is None:
+                    face_index.edges = plasticity_edges(self.geometry_writer.read_polygons(obj), face_index.polygon_faces)
+                selected = np.zeros(polygon_count * 4, dtype=bool)
+                selected[face_index.edges] = True
+                commit.touch(obj, c4d.UNDOTYPE_CHANGE_SELECTION)
+                obj.GetEdgeS().SetAll(selected.tolist())
+                total += len(face_index.edges)
+        return total
+
+    def paint_plasticity_faces(self, doc=None):
+        """
+        Colors every polygon of the selected meshes by its Plasticity face, in a
+        per-polygon vertex color tag. Meshes already painted since their last
+        geometry write are skipped. Returns (painted, skipped).
+        """
+        doc = doc or c4d.documents.GetActiveDocument()
+        painted = skipped = 0
+        with SceneCommit(True, self.commit_stats) as commit:
+            for key, obj in self.__selected_meshes(doc):
+                face_index = self.face_indices.get(key)
+                polygon_count = obj.GetPolygonCount()
+                if face_index is None or len(face_index.polygon_faces) != polygon_count:
+                    print(f"[paint_faces] No Plasticity face data for {obj.GetName()}")
+                    continue
+                tag = obj.GetTag(c4d.Tvertexcolor)
+                if face_index.painted and tag is not None and tag.GetDataCount() == polygon_count:
+                    skipped += 1
+                    continue
+                commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+                self.geometry_writer.write_polygon_colors(obj, face_index.polygon_colors())
+                face_index.painted = True
+                painted += 1
+        return painted, skipped
+
+    def auto_uv(self, doc=None, max_workers=None):
+        """
+        Lays out UVs for the selected meshes with one chart per Plasticity face
+        (see uv.chart_uvs). Geometry is read and UVs written on the main thread;
+        the layouts run on a thread pool. Returns the number of meshes mapped.
+        """
+        doc = doc or c4d.documents.GetActiveDocument()
+        targets, meshes = [], []
+        for key, obj in self.__selected_meshes(doc):
+            face_index = self.face_indices.get(key)
+            if face_index is None or len(face_index.polygon_faces) != obj.GetPolygonCount():
+                print(f"[auto_uv] No Plasticity face data for {obj.GetName()}")
+                continue
+            targets.append(obj)
+            meshes.append((np.array(self.geometry_writer.read_points(obj)),
+                           np.array(self.geometry_writer.read_polygons(obj)),
+                           face_index.polygon_faces))
+        if not targets:
+            return 0
+
+        start = time.perf_counter()
+        layouts = chart_layouts(meshes, max_workers)
+        with SceneCommit(True, self.commit_stats) as commit:
+            for obj, uvs in zip(targets, layouts):
+                commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+                self.geometry_writer.write_uvs(obj, uvs)
+        print(f"[auto_uv] Mapped {len(targets)} meshes in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return len(targets)
+
+    def __geometry_hash(self, verts, indices, normals):
+        return buffer_fingerprint(verts), buffer_fingerprint(indices), buffer_fingerprint(normals)
+
+    def __update_object_and_mesh(self, commit, obj, object_type, version, name, verts, indices, normals, groups, face_ids, parent_id, cache_key=None):
         try:
+            content = self.__geometry_hash(verts, indices, normals)
+            cached = self.geometry_hashes.get(cache_key) if cache_key is not None else None
+
+            # Byte-identical geometry: nothing to write, only the name may have changed
+            if cached == content and isinstance(obj, c4d.PolygonObject):
+                self.geometry_cache_hits += 1
+                if obj.GetName() != name:
+                    commit.touch(obj, c4d.UNDOTYPE_CHANGE_SMALL)
+                    obj.SetName(name)
+                return
+            self.geometry_cache_misses += 1
             print(f"[update] Updating object '{name}' with new geometry.")
 
-            # Convert vertices from flat array to c4d.Vector list
-            points = []
-            for i in range(0, len(verts), 3):
-                x = float(verts[i])
-                y = float(verts[i + 1])
-                z = float(verts[i + 2])
-                points.append(c4d.Vector(x, y, z))
+            # Same index buffer as last time: only the points moved
+            if (cached is not None and cached[1] == content[1]
+                    and isinstance(obj, c4d.PolygonObject)
+                    and obj.GetPointCount() == len(verts) // 3 and obj.GetPolygonCount() == len(indices) // 3):
+                commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+                self.geometry_writer.write(obj, verts, None, name, normals)
+                self.geometry_writer.report()
+                self.geometry_hashes[cache_key] = content
+                self.__index_faces(cache_key, groups, face_ids, len(indices) // 3)
+                return
 
-            # Convert indices to c4d.CPolygon list
-            polygons = []
             try:
-                face_array = np.array(indices, dtype=np.int32).reshape(-1, 3)
-                for face in face_array:
-                    polygons.append(c4d.CPolygon(face[0], face[1], face[2], face[2]))  # triangle padded
+                polygons = triangles_to_polygons(indices)
             except Exception as e:
                 print(f"[update_object_and_mesh] Failed to parse face indices: {e}")
                 return
@@ -238,14 +580,14 @@ class SceneHandler:
                 print("[update_object_and_mesh] Target object is not a PolygonObject.")
                 return
 
-            # Resize and update geometry
-            obj.ResizeObject(len(points), len(polygons))
-            obj.SetAllPoints(points)
-            for i, poly in enumerate(polygons):
-                obj.SetPolygon(i, poly)
-
-            obj.Message(c4d.MSG_UPDATE)
-            c4d.EventAdd()
+            commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+            self.geometry_writer.write(obj, verts, polygons, name, normals)
+            self.geometry_writer.report()
+            if cache_key is not None:
+                self.geometry_hashes[cache_key] = content
+                self.polygon_faces.pop(cache_key, None)
+                self.__index_faces(cache_key, groups, face_ids, len(polygons))
+                self.refacet_buffers.pop(cache_key, None)
 
         except Exception as e:
             print(f"❌ Error in __update_object_and_mesh: {e}")
@@ -256,7 +598,7 @@ class SceneHandler:
 
 
 
-    def __create_group(self, name, matrix=None, parent=None):
+    def __create_group(self, commit, name, matrix=None, parent=None):
         """
         Creates a group (Null object) and inserts into the scene.
 
@@ -293,7 +635,7 @@ class SceneHandler:
             else:
                 c4d.documents.GetActiveDocument().InsertObject(group)
 
-            c4d.EventAdd()
+            commit.touch(group, c4d.UNDOTYPE_NEWOBJ)
             print(f"[__create_group] Created group: {name}")
             return group
 
@@ -304,15 +646,16 @@ class SceneHandler:
             return None
 
 
-    def __replace_objects(self, filename, inbox_collection, version, objects):
+    def __replace_objects(self, commit, filename, inbox_collection, version, objects):
         """
-        Replace or create objects/groups from Plasticity transaction data.
+        Replace or create objects/groups from Plasticity transaction data in one
+        pass, groups before their children, placing each object right after it is
+        created or updated. Generator: yields after each object so the apply queue
+        can spread a large list over several UI ticks.
         """
         doc = c4d.documents.GetActiveDocument()
-        scale = 1.0
 
-        # First pass: create or update
-        for item in objects:
+        for item in parent_first(objects, ObjectType.GROUP.value):
             object_type = item["type"]
             plasticity_id = item["id"]
             name = item["name"]
@@ -327,18 +670,29 @@ class SceneHandler:
                 if plasticity_id not in self.files[filename][PlasticityIdUniquenessScope.ITEM]:
                     print("Before create")
                     mesh = self.__create_mesh(name, verts, indices, normals, groups, face_ids)
-                    obj = self.__add_object(filename, object_type, plasticity_id, name, mesh)
+                    obj = self.__add_object(commit, filename, object_type, plasticity_id, name, mesh)
                     if obj:
-                        obj.SetAbsScale(c4d.Vector(scale, scale, scale))
+                        self.geometry_hashes[(filename, plasticity_id)] = self.__geometry_hash(verts, indices, normals)
+                        self.__index_faces((filename, plasticity_id), groups, face_ids, len(indices) // 3)
                         self.files[filename][PlasticityIdUniquenessScope.ITEM][plasticity_id] = obj
+                        self.applied_versions[(filename, plasticity_id)] = item["version"]
                 else:
                     obj = self.files[filename][PlasticityIdUniquenessScope.ITEM][plasticity_id]
-                    self.__update_object_and_mesh(obj, object_type, version, name, verts, indices, normals, groups, face_ids, parent_id)
+                    if self.__is_stale(filename, plasticity_id, item["version"]):
+                        # Nothing newer than what is in the scene; skip before touching the buffers
+                        self.stale_updates += 1
+                        if obj.GetName() != name:
+                            commit.touch(obj, c4d.UNDOTYPE_CHANGE_SMALL)
+                            obj.SetName(name)
+                    else:
+                        self.__update_object_and_mesh(commit, obj, object_type, version, name, verts, indices, normals, groups, face_ids, parent_id,
+                                                      cache_key=(filename, plasticity_id))
+                        self.applied_versions[(filename, plasticity_id)] = item["version"]
 
             elif object_type == ObjectType.GROUP.value:
                 if plasticity_id > 0:
                     if plasticity_id not in self.files[filename][PlasticityIdUniquenessScope.GROUP]:
-                        group = self.__create_group(name)
+                        group = self.__create_group(commit, name)
                         # Tag only non-Inbox groups
                         if group.GetName().lower() != "inbox":
                             bc = group.GetDataInstance()
@@ -347,36 +701,50 @@ class SceneHandler:
                             self.files[filename][PlasticityIdUniquenessScope.GROUP][plasticity_id] = group
                     else:
                         group = self.files[filename][PlasticityIdUniquenessScope.GROUP][plasticity_id]
-                        group.SetName(name)
-
-        # Second pass: parenting and visibility
-        for item in objects:
-            object_type = item["type"]
-            plasticity_id = item["id"]
-            parent_id = item["parent_id"]
-            flags = item["flags"]
-
-            is_hidden = flags & 1
-            is_visible = flags & 2
-            is_selectable = flags & 4
-
-            if plasticity_id == 0:
-                continue
-
-            scope = PlasticityIdUniquenessScope.GROUP if object_type == ObjectType.GROUP.value else PlasticityIdUniquenessScope.ITEM
-            obj = self.files[filename][scope].get(plasticity_id)
-            if not obj:
-                print(f"[__replace_objects] Missing object {plasticity_id}")
-                continue
-
-            parent = self.files[filename][PlasticityIdUniquenessScope.GROUP].get(parent_id) if parent_id > 0 else inbox_collection
-
+                        if group.GetName() != name:
+                            commit.touch(group, c4d.UNDOTYPE_CHANGE_SMALL)
+                            group.SetName(name)
+            if plasticity_id != 0:
+                self.__place_object(commit, filename, doc, inbox_collection, item)
+
+            # The user may edit the scene between ticks; pick that up on resume
+            self.__stamp_index(filename)
+            yield
+            inbox_collection = self.__prepare(filename)
+
+    def __place_object(self, commit, filename, doc, inbox_collection, item):
+        """Reparents and sets visibility of one object, only where they differ from what was last applied."""
+        object_type = item["type"]
+        plasticity_id = item["id"]
+        parent_id = item["parent_id"]
+        flags = item["flags"]
+
+        is_hidden = flags & 1
+        is_visible = flags & 2
+        is_selectable = flags & 4
+
+        scope = PlasticityIdUniquenessScope.GROUP if object_type == ObjectType.GROUP.value else PlasticityIdUniquenessScope.ITEM
+        obj = self.files[filename][scope].get(plasticity_id)
+        if not obj:
+            print(f"[__replace_objects] Missing object {plasticity_id}")
+            return
+
+        placements = self.placements.setdefault(filename, {})
+        reparent, revisibility = placement_changes(placements.get((scope, plasticity_id)), parent_id, flags)
+
+        parent = self.files[filename][PlasticityIdUniquenessScope.GROUP].get(parent_id) if parent_id > 0 else inbox_collection
+        if reparent or revisibility:
+            commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+        if reparent:
+            self.hierarchy_mutations += 1
             if parent:
                 obj.InsertUnder(parent)
             else:
                 doc.InsertObject(obj)
 
-            # Visibility
+        # Visibility
+        if revisibility:
+            self.hierarchy_mutations += 1
             if object_type == ObjectType.GROUP.value:
                 obj[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR] = 1 if is_visible else 0
                 obj[c4d.ID_BASEOBJECT_VISIBILITY_RENDER] = 1 if is_visible else 0
@@ -384,7 +752,11 @@ class SceneHandler:
                 obj.SetEditorMode(c4d.MODE_ON if is_visible else c4d.MODE_OFF)
                 obj.SetRenderMode(c4d.MODE_ON if is_visible else c4d.MODE_OFF)
 
-        c4d.EventAdd()
+        # A parent group that hasn't arrived yet is retried on the next message
+        if parent:
+            placements[(scope, plasticity_id)] = (parent_id, flags)
+        else:
+            placements.pop((scope, plasticity_id), None)
 
 
 
@@ -427,19 +799,30 @@ class SceneHandler:
 
     def __prepare(self, filename):
         """
-        Scans the existing scene structure and builds up the ID -> object mapping.
-        Returns the inbox group where new objects should be inserted.
+        Returns the inbox group where new objects should be inserted, with
+        self.files[filename] holding the ID -> object mapping. The mapping is kept up
+        to date by our own edits and only rebuilt from the scene when the active
+        document or its object hierarchy changed since __stamp_index().
         """
+        doc = c4d.documents.GetActiveDocument()
+        stamp = self.index_stamps.get(filename)
+        if (stamp is not None and filename in self.files and stamp[0] == doc
+                and stamp[1] == doc.GetHDirty(c4d.HDIRTYFLAGS_OBJECT_HIERARCHY) and stamp[2].IsAlive()):
+            return stamp[2]
+
         inbox_group = self.__inbox_for_filename(filename)
 
         existing_objects = {
             PlasticityIdUniquenessScope.ITEM: {},
             PlasticityIdUniquenessScope.GROUP: {}
         }
+        items = existing_objects[PlasticityIdUniquenessScope.ITEM]
+        groups = existing_objects[PlasticityIdUniquenessScope.GROUP]
 
-        def walk_hierarchy(obj):
-            objs = []
-            groups = []
+        # Iterative walk of the inbox subtree
+        stack = [inbox_group.GetDown()]
+        while stack:
+            obj = stack.pop()
             while obj:
                 bc = obj.GetDataInstance()
                 pid = bc.GetInt32(1001) if bc else None
@@ -448,32 +831,62 @@ class SceneHandler:
                 if pid:
                     if obj.CheckType(c4d.Onull):
                         if obj.GetName().lower() != "inbox":
-                            groups.append((pid, obj))
+                            groups[pid] = obj
                     else:
-                        objs.append((pid, obj))
-
-                if obj.GetDown():
-                    sub_objs, sub_groups = walk_hierarchy(obj.GetDown())
-                    objs += sub_objs
-                    groups += sub_groups
+                        items[pid] = obj
 
+                down = obj.GetDown()
+                if down:
+                    stack.append(down)
                 obj = obj.GetNext()
 
-            return objs, groups
-
-        objects, groups = walk_hierarchy(inbox_group)
-
-        for pid, obj in objects:
-            existing_objects[PlasticityIdUniquenessScope.ITEM][pid] = obj
-        for pid, group in groups:
-            existing_objects[PlasticityIdUniquenessScope.GROUP][pid] = group
-
         self.files[filename] = existing_objects
+        # The scene was edited outside the bridge; only objects moved or toggled since are placed again
+        placements = self.placements.get(filename)
+        if placements:
+            self.placements[filename] = {
+                key: placement for key, placement in placements.items()
+                if self.__placement_holds(existing_objects[key[0]].get(key[1]), key[0], placement, groups, inbox_group)}
+        print(f"[prepare] Indexed {len(items)} objects and {len(groups)} groups for {filename}")
+        self.__stamp_index(filename, inbox_group)
         return inbox_group
 
+    def __placement_holds(self, obj, scope, placement, groups, inbox_group):
+        """Whether obj is still where, and as visible as, the recorded (parent_id, flags) put it."""
+        if obj is None:
+            return False
+        parent_id, flags = placement
+        if obj.GetUp() != (groups.get(parent_id) if parent_id > 0 else inbox_group):
+            return False
+        visible = bool(flags & 2)
+        if scope == PlasticityIdUniquenessScope.GROUP:
+            return bool(obj[c4d.ID_BASEOBJECT_VISIBILITY_EDITOR]) == visible
+        return obj.GetEditorMode() == (c4d.MODE_ON if visible else c4d.MODE_OFF)
+
+    def __stamp_index(self, filename, inbox_group=None):
+        """Records the hierarchy state after our own edits, so they don't trigger a rescan."""
+        if inbox_group is None:
+            stamp = self.index_stamps.get(filename)
+            if stamp is None:
+                return
+            inbox_group = stamp[2]
+        doc = c4d.documents.GetActiveDocument()
+        self.index_stamps[filename] = (doc, doc.GetHDirty(c4d.HDIRTYFLAGS_OBJECT_HIERARCHY), inbox_group)
+
 
 
-    def __update_mesh_ngons(self, obj, version, faces, verts, indices, normals, groups, face_ids):
+    def __melt_ngons(self, obj, rounds):
+        """Melts each round's polygon selection into N-gons; faces within a round never share an edge."""
+        doc = c4d.documents.GetActiveDocument()
+        selection = obj.GetPolygonS()
+        for mask in rounds:
+            selection.SetAll(mask.tolist())
+            c4d.utils.SendModelingCommand(c4d.MCOMMAND_MELT, [obj], c4d.MODELINGCOMMANDMODE_POLYGONSELECTION,
+                                          c4d.BaseContainer(), doc)
+        selection.DeselectAll()
+        print(f"[update_mesh_ngons] Melted N-gons in {len(rounds)} rounds")
+
+    def __update_mesh_ngons(self, commit, obj, version, faces, verts, indices, normals, groups, face_ids, cache_key=None):
         """Update an existing mesh object with new ngon geometry."""
         try:
             if not isinstance(obj, c4d.BaseObject):
@@ -485,36 +898,34 @@ class SceneHandler:
                 print(f"Object has no data: {obj}")
                 return
 
-            doc = c4d.documents.GetActiveDocument()
-            doc.StartUndo()
-            doc.AddUndo(c4d.UNDOTYPE_CHANGE, obj)
-
-            # Convert verts to Vector list
-            vert_count = len(verts) // 3
-            points = [c4d.Vector(verts[i], verts[i+1], verts[i+2]) for i in range(0, len(verts), 3)]
-            obj.ResizeObject(vert_count, len(faces))
-            obj.SetAllPoints(points)
-
-            # Build polygons
-            polygons = []
-            current = 0
-            for face_vert_count in faces:
-                if face_vert_count == 3:
-                    polygons.append(c4d.CPolygon(indices[current], indices[current+1], indices[current+2]))
-                elif face_vert_count == 4:
-                    polygons.append(c4d.CPolygon(indices[current], indices[current+1], indices[current+2], indices[current+3]))
+            commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+
+            # Tris and quads as-is, larger faces fan-triangulated and melted back into N-gons;
+            # in triangle mode every face is triangulated, concave ones by ear clipping, and
+            # nothing is melted. The melt replaces the triangles, so N-gon mode keeps the fan.
+            polygons, polygon_faces = faces_to_polygons(faces, indices, keep_quads=not self.triangulate,
+                                                        points=verts if self.triangulate else None)
+            self.geometry_writer.write(obj, verts, polygons, normals=normals)
+            self.geometry_writer.report()
+            rounds = [] if self.triangulate else ngon_rounds(faces, indices, polygon_faces)
+            if rounds:
+                written = np.array(self.geometry_writer.read_polygons(obj))
+                self.__melt_ngons(obj, rounds)
+                # The melt may reorder polygons; follow them by their corners
+                source = match_polygons(written, self.geometry_writer.read_polygons(obj))
+                polygon_faces = polygon_faces[source] if source is not None else None
+
+            if cache_key is not None:
+                if polygon_faces is not None:
+                    self.polygon_faces[cache_key] = polygon_faces
+                    if groups is not None and face_ids is not None:
+                        self.face_indices[cache_key] = FaceIndex.from_refacet(groups, face_ids, faces, polygon_faces)
+                    else:
+                        self.face_indices.pop(cache_key, None)
                 else:
-                    print(f"Ngon with {face_vert_count} verts not directly supported here. Skipped.")
-                current += face_vert_count
-
-            obj.SetPolygonCount(len(polygons))
-            for i, poly in enumerate(polygons):
-                obj.SetPolygon(i, poly)
-
-            obj.Message(c4d.MSG_UPDATE)
-            doc.AddUndo(c4d.UNDOTYPE_CHANGE, obj)
-            doc.EndUndo()
-            c4d.EventAdd()
+                    print(f"[update_mesh_ngons] Polygons changed while building N-gons; no face map for {obj.GetName()}")
+                    self.polygon_faces.pop(cache_key, None)
+                    self.face_indices.pop(cache_key, None)
 
             # Store meta
             obj.SetName(obj.GetName())  # force rename refresh
@@ -529,40 +940,31 @@ class SceneHandler:
             print(f"Error in __update_mesh_ngons: {e}")
             traceback.print_exc()
 
-    def __delete_object(self, obj):
-        """Delete a single object from the scene."""
-        try:
-            if obj is None:
-                return
-            obj.Remove()
-            c4d.EventAdd()
-        except Exception as e:
-            print(f"Error in __delete_object: {e}")
-            import traceback
-            traceback.print_exc()
-
-
-    def __delete_group(self, filename, version, plasticity_id):
-        """Deletes a group (null object or similar) from the scene and internal registry."""
-        try:
-            group = self.files[filename][PlasticityIdUniquenessScope.GROUP].pop(plasticity_id, None)
-            if group:
-                doc = c4d.documents.GetActiveDocument()
-                doc.StartUndo()
-                doc.AddUndo(c4d.UNDOTYPE_DELETE, group)
-                group.Remove()  # ← Fixed
-                doc.EndUndo()
-                c4d.EventAdd()
-                print(f"🗑️ Deleted group: {group.GetName()}")
+    def __delete_objects(self, commit, filename, scope, plasticity_ids):
+        """Removes the given ids of one scope from the scene and the index. Returns how many were removed."""
+        index = self.files[filename][scope]
+        placements = self.placements.get(filename, {})
+        removed = 0
+        for plasticity_id in plasticity_ids.tolist():
+            obj = index.pop(plasticity_id, None)
+            if scope == PlasticityIdUniquenessScope.ITEM:
+                self.__forget_object(filename, plasticity_id)
             else:
-                print(f"Group with id {plasticity_id} not found in file: {filename}")
-        except Exception as e:
-            print(f"Error in __delete_group: {e}")
-            import traceback
-            traceback.print_exc()
+                placements.pop((scope, plasticity_id), None)
+            if obj is None:
+                continue
+            try:
+                if obj.IsAlive():
+                    commit.touch(obj, c4d.UNDOTYPE_DELETE)
+                    obj.Remove()
+                removed += 1
+            except Exception as e:
+                print(f"Error deleting {plasticity_id} from {filename}: {e}")
+                traceback.print_exc()
+        return removed
 
 
-    def __add_object(self, filename, object_type, plasticity_id, name, mesh):
+    def __add_object(self, commit, filename, object_type, plasticity_id, name, mesh):
         """Adds a new mesh object to the document and internal files registry."""
         try:
             mesh.SetName(name)
@@ -583,7 +985,7 @@ class SceneHandler:
 
             doc = c4d.documents.GetActiveDocument()
             doc.InsertObject(mesh)
-            c4d.EventAdd()
+            commit.touch(mesh, c4d.UNDOTYPE_NEWOBJ)
 
             print(f"Added object: {name} (ID {plasticity_id})")
             return mesh
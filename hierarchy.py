@@ -0,0 +1,42 @@
+# hierarchy.py
+
+
+def parent_first(objects, group_type):
+    """
+    Orders objects so every group comes before the objects parented to it.
+    Only parents present in the same message matter; the rest keep their
+    relative order (the sort is stable). Parent cycles are cut where found.
+    """
+    groups = {obj["id"]: obj["parent_id"] for obj in objects if obj["type"] == group_type}
+    if not groups:
+        return objects
+
+    depths = {}
+
+    def depth(group_id):
+        # Number of ancestors of group_id that are in this message
+        chain = []
+        current = group_id
+        while current in groups and current not in depths and current not in chain:
+            chain.append(current)
+            current = groups[current]
+        base = depths[current] + 1 if current in depths else 0
+        for offset, member in enumerate(reversed(chain)):
+            depths[member] = base + offset
+        return depths[group_id]
+
+    def key(obj):
+        parent_id = obj["parent_id"]
+        return depth(parent_id) + 1 if parent_id in groups else 0
+
+    return sorted(objects, key=key)
+
+
+def placement_changes(recorded, parent_id, flags):
+    """
+    Compares an object's parent/flags against what was last applied.
+    Returns (reparent, revisibility).
+    """
+    if recorded is None:
+        return True, True
+    return recorded[0] != parent_id, recorded[1] != flags
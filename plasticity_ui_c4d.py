@@ -1,9 +1,23 @@
 import c4d
 from c4d import gui
 import os, sys
+import collections
+import traceback
 
 PLUGIN_ID = 1058612
 
+# Milliseconds of scene work applied per UI tick
+APPLY_BUDGET_MS = 15
+
+# Plasticity units -> C4D units (cm)
+DEFAULT_SCALE = 100.0
+
+# Face size limit requested from Plasticity; the "Triangles" mode triangulates locally
+MAX_NGON_SIDES = 128
+
+# Scale edits are applied once the field has been left alone this long
+SCALE_APPLY_DELAY_MS = 500
+
 # Connect section
 BTN_CONNECT = 1000
 EDIT_HOST = 1001
@@ -63,11 +77,13 @@ class PlasticityDialog(gui.GeDialog):
     def __init__(self):
         super().__init__()
         from handler import SceneHandler
-        self.handler = SceneHandler(self)  # store reference if UI needs updates
-        self.client = PlasticityClient(handler=self.handler)
+        self.handler = SceneHandler(self, apply_budget_ms=APPLY_BUDGET_MS, scale=DEFAULT_SCALE)  # store reference if UI needs updates
+        self.client = PlasticityClient(handler=self.handler, csr_refacet=True,
+                                       dispatcher=self.call_on_main_thread)
 
         self.connected = False
         self._signal_state = None
+        self._main_thread_calls = collections.deque()
 
 
     def CreateLayout(self):
@@ -87,7 +103,7 @@ class PlasticityDialog(gui.GeDialog):
         self.AddCheckbox(CHK_PID_SUFFIX, c4d.BFH_LEFT, initw=100, inith=0, name="PID Suffix")
         self.SetBool(CHK_PID_SUFFIX, True)
         self.AddEditNumber(EDIT_SCALE, c4d.BFH_SCALEFIT, inith=0)
-        self.SetFloat(EDIT_SCALE, 100)
+        self.SetFloat(EDIT_SCALE, DEFAULT_SCALE)
         self.GroupEnd()
 
         # --- Visibility + Facet Type ---
@@ -185,7 +201,7 @@ class PlasticityDialog(gui.GeDialog):
                 self.client.connect(host)
             else:
                 print("Disconnected")
-                self.client = None
+                self.client.disconnect()
                 self.SetString(BTN_CONNECT, "Connect")
                 self.Enable(EDIT_HOST, True)
                 self.connected = False
@@ -202,15 +218,60 @@ class PlasticityDialog(gui.GeDialog):
         elif id == BTN_LIVE_LINK:
             self.toggle_live_link()
 
+        elif id == BTN_REFACET:
+            self.refacet_selection()
+
+        elif id == BTN_SELECT_FACE:
+            count = self.handler.select_plasticity_faces()
+            self.SetString(TEXT_SUBSTATUS, f"[INFO] Selected {count} polygons of Plasticity faces")
+
+        elif id == BTN_SELECT_EDGE:
+            count = self.handler.select_plasticity_edges()
+            self.SetString(TEXT_SUBSTATUS, f"[INFO] Selected {count} Plasticity edges")
+
+        elif id == BTN_AUTO_UV:
+            count = self.handler.auto_uv()
+            self.SetString(TEXT_SUBSTATUS, f"[INFO] Auto UV mapped {count} meshes")
+
+        elif id == BTN_PAINT_FACE:
+            painted, skipped = self.handler.paint_plasticity_faces()
+            self.SetString(TEXT_SUBSTATUS, f"[INFO] Painted {painted} meshes ({skipped} unchanged)")
+
+        elif id == EDIT_SCALE:
+            # Every keystroke and arrow tick lands here; apply only the settled value
+            if not msg.GetBool(c4d.BFM_ACTION_INDRAG):
+                self.SetTimer(SCALE_APPLY_DELAY_MS)
+
+        elif id == RADIO_GROUP:
+            self.handler.set_triangulate(self.GetInt32(RADIO_GROUP) == RADIO_TRI)
+
 
         return True
 
 
 
+    def Timer(self, msg):
+        self.SetTimer(0)
+        self.handler.set_scale(self.GetFloat(EDIT_SCALE))
+
     def CoreMessage(self, id, bc):
         if id != PLUGIN_ID:
             return False
 
+        # Callbacks posted from the client thread
+        while self._main_thread_calls:
+            fn, args = self._main_thread_calls.popleft()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"❌ Error in Plasticity callback: {e}")
+                traceback.print_exc()
+
+        # Scene work queued by the handler, spread over ticks to keep the UI responsive
+        if self.handler.apply_pending():
+            c4d.SpecialEventAdd(PLUGIN_ID, 3)
+        self.update_apply_status()
+
         state = self._signal_state
         self._signal_state = None  # ✅ clear immediately
 
@@ -236,6 +297,51 @@ class PlasticityDialog(gui.GeDialog):
         self._signal_state = "disconnected"
         c4d.SpecialEventAdd(PLUGIN_ID, 1)
 
+    def schedule_apply(self):
+        """Called from the client thread when scene work was queued."""
+        c4d.SpecialEventAdd(PLUGIN_ID, 3)
+
+    def update_apply_status(self):
+        metrics = self.handler.apply_queue.metrics()
+        superseded = self.handler.coalescer.metrics()["dropped"]
+        stale = self.handler.version_metrics()["stale"]
+        cache = self.handler.geometry_cache_metrics()
+        outdated = [filename for filename in list(self.handler.announced_versions) if self.handler.is_outdated(filename)]
+        if metrics["depth"]:
+            self.SetString(TEXT_SUBSTATUS, f"[INFO] Applying: {metrics['depth']} queued, lag {metrics['lag_ms']:.0f} ms")
+        elif outdated:
+            self.SetString(TEXT_SUBSTATUS, f"[WARNING] {', '.join(outdated)} changed in Plasticity, refresh to update")
+        else:
+            self.SetString(TEXT_SUBSTATUS, f"[INFO] Up to date (last lag {metrics['last_lag_ms']:.0f} ms, {superseded} superseded and {stale} stale updates skipped, {cache['hits']}/{cache['hits'] + cache['misses']} unchanged meshes reused)")
+
+    def call_on_main_thread(self, fn, *args):
+        """Queues fn(*args) to run from CoreMessage on C4D's main thread."""
+        self._main_thread_calls.append((fn, args))
+        c4d.SpecialEventAdd(PLUGIN_ID, 2)
+
+    def refacet_selection(self):
+        """Requests a refacet of the selected Plasticity meshes with the dialog's facet settings."""
+        selected = self.handler.selected_plasticity_ids()
+        if not selected:
+            self.SetString(TEXT_SUBSTATUS, "[WARNING] Select Plasticity objects to refacet")
+            return
+
+        advanced = self.GetInt32(TAB_FACET_MODE) == 4200
+        tolerance = self.GetFloat(EDIT_TOLERANCE)
+        angle = self.GetFloat(EDIT_ANGLE)
+
+        for filename, plasticity_ids in selected.items():
+            print(f"C4D> Refacet {len(plasticity_ids)} objects from {filename}")
+            self.client.refacet_some(
+                filename, plasticity_ids,
+                curve_chord_tolerance=self.GetFloat(EDIT_EDGE_CHORD) if advanced else tolerance,
+                curve_chord_angle=self.GetFloat(EDIT_EDGE_ANGLE) if advanced else angle,
+                surface_plane_tolerance=self.GetFloat(EDIT_FACE_PLANE) if advanced else tolerance,
+                surface_plane_angle=self.GetFloat(EDIT_FACE_ANGLE) if advanced else angle,
+                min_width=self.GetFloat(EDIT_MIN_WIDTH) if advanced else 0,
+                max_width=self.GetFloat(EDIT_MAX_WIDTH) if advanced else 0,
+                max_sides=MAX_NGON_SIDES)
+
     def toggle_live_link(self):
         """Toggle the live link state and update the button text."""
         btn = self.GetBool(BTN_LIVE_LINK)
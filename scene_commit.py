@@ -0,0 +1,75 @@
+# scene_commit.py
+import c4d
+
+
+class SceneCommit:
+    """
+    Batches the scene edits of one transaction, list or refacet. Collects undo
+    steps into one undo group (skipped when undo is off, e.g. for live-link
+    pushes) and the objects touched, and fires one EventAdd for them.
+
+    Use as a context manager around the apply work and pass the commit to every
+    edit. Work that spans several apply-queue ticks calls redraw() whenever a tick
+    ends: the edits so far are drawn, but the undo group stays open until the
+    commit exits, so the whole transaction is still one undo step. Only one group
+    is open at a time; a commit that needs one while another is open (e.g. a
+    selection command between two ticks of a list) closes it first, and the
+    interrupted commit carries on in a new group.
+    """
+    open_group = None  # the commit whose undo group is open
+
+    def __init__(self, undo=True, stats=None):
+        self.undo = undo
+        self.stats = stats if stats is not None else {"commits": 0, "event_adds": 0, "undo_groups": 0}
+        self.doc = None
+        self.grouping = False
+        self.touched = {}
+
+    def __enter__(self):
+        self.doc = c4d.documents.GetActiveDocument()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        self.stats["commits"] += 1
+        return False
+
+    def add_undo(self, undo_type, obj):
+        """Records an undo step for obj in the commit's group. NEWOBJ goes after inserting, the rest before editing."""
+        if not self.undo or obj is None:
+            return
+        if not self.grouping:
+            if SceneCommit.open_group is not None:
+                SceneCommit.open_group.close_group()
+            self.doc = c4d.documents.GetActiveDocument()
+            self.doc.StartUndo()
+            self.grouping = True
+            SceneCommit.open_group = self
+        self.doc.AddUndo(undo_type, obj)
+
+    def touch(self, obj, undo_type=None):
+        """Marks obj as edited so the commit redraws it, with an undo step when undo_type is given."""
+        if undo_type is not None:
+            self.add_undo(undo_type, obj)
+        self.touched[id(obj)] = obj
+
+    def close_group(self):
+        """Closes the commit's undo group, if open."""
+        if self.grouping:
+            self.doc.EndUndo()
+            self.grouping = False
+            self.stats["undo_groups"] += 1
+            if SceneCommit.open_group is self:
+                SceneCommit.open_group = None
+
+    def redraw(self):
+        """Redraws the edits made since the last redraw."""
+        if self.touched:
+            c4d.EventAdd()
+            self.stats["event_adds"] += 1
+            self.touched = {}
+
+    def flush(self):
+        """Closes the undo group and redraws what is left."""
+        self.close_group()
+        self.redraw()
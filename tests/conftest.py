@@ -0,0 +1,85 @@
+"""
+Shared setup for the tests. These run outside Cinema 4D: the repo root and the
+bundled libs go on sys.path, and when the real c4d module is unavailable the
+in-memory stand-in from fake_c4d is registered in its place, so the scene code
+(SceneHandler, SceneCommit, GeometryWriter) can be driven as well.
+"""
+import os
+import struct
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "libs")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import fake_c4d  # noqa: E402
+
+try:
+    import c4d  # noqa: F401
+except ImportError:
+    fake_c4d.install()
+
+
+@pytest.fixture
+def doc():
+    """A fresh, empty active document."""
+    fake_c4d.reset()
+    return fake_c4d.documents.GetActiveDocument()
+
+
+def padded(data):
+    return data + b"\0" * ((4 - len(data) % 4) % 4)
+
+
+def counted(values, dtype, item_size):
+    data = np.ascontiguousarray(values, dtype=dtype).tobytes()
+    return struct.pack("<I", len(data) // item_size) + data
+
+
+def encode_object(object_id, object_type=0, version=1, parent_id=0, flags=2, name=None, triangles=2):
+    """One ADD_1/UPDATE_1 object record. Solids and sheets (types 0 and 1) get a small triangle mesh."""
+    name = (name if name is not None else f"Solid {object_id}").encode("utf-8")
+    data = struct.pack("<IIIiiII", object_type, object_id, version, parent_id, -1, flags, len(name)) + padded(name)
+    if object_type in (0, 1):
+        vertices = np.arange((triangles + 2) * 3, dtype=np.float32)
+        faces = np.array([(0, k + 1, k + 2) for k in range(triangles)], dtype=np.int32).ravel()
+        data += counted(vertices, np.float32, 12)
+        data += counted(faces, np.int32, 12)
+        data += counted(-vertices, np.float32, 12)
+        data += counted([0, len(faces)], np.int32, 4)
+        data += counted([object_id % 1000], np.int32, 4)
+    return data
+
+
+def encode_objects(records):
+    return struct.pack("<I", len(records)) + b"".join(records)
+
+
+def encode_transaction(filename, version, items, message_type=0, message_id=None):
+    """
+    TRANSACTION_1 (or, with message_id, a LIST_*_1 response) carrying the given
+    items, each (item type, payload after the type).
+    """
+    name = filename.encode("utf-8")
+    data = struct.pack("<I", message_type)
+    if message_id is not None:
+        data += struct.pack("<II", message_id, 200)
+    data += struct.pack("<I", len(name)) + padded(name)
+    data += struct.pack("<II", version, len(items))
+    for item_type, payload in items:
+        item = struct.pack("<I", item_type) + payload
+        data += struct.pack("<I", len(item)) + item
+    return data
+
+
+def encode_refacet_item(plasticity_id, version, faces, positions, indices, normals, groups, face_ids):
+    """One REFACET_SOME_1 item: its id and version, then every channel as a counted array."""
+    data = struct.pack("<II", plasticity_id, version)
+    for values, dtype in ((faces, np.int32), (positions, np.float32), (indices, np.int32),
+                          (normals, np.float32), (groups, np.int32), (face_ids, np.int32)):
+        data += counted(values, dtype, 4)
+    return data
@@ -0,0 +1,472 @@
+"""
+A small in-memory stand-in for the parts of Cinema 4D's c4d module the bridge
+uses, so SceneHandler, SceneCommit and GeometryWriter can be exercised outside
+C4D. Points and polygons live in bytearrays exposed through the Tpoint/Tpolygon
+low-level buffers, like a real PolygonObject; the document records its undo
+calls and counts EventAdd and hierarchy changes.
+"""
+import sys
+import types
+
+import numpy as np
+
+Onull = 5140
+Opolygon = 5100
+
+Tpoint = 5600
+Tpolygon = 5604
+Tphong = 5612
+Tuvw = 5671
+Tnormal = 5711
+Tvertexcolor = 431000045
+
+MODE_ON = 0
+MODE_OFF = 1
+MODE_UNDEF = 2
+
+UNDOTYPE_CHANGE = 0
+UNDOTYPE_CHANGE_SMALL = 1
+UNDOTYPE_CHANGE_SELECTION = 2
+UNDOTYPE_NEWOBJ = 3
+UNDOTYPE_DELETE = 4
+
+ID_BASEOBJECT_VISIBILITY_EDITOR = 901
+ID_BASEOBJECT_VISIBILITY_RENDER = 902
+
+MSG_UPDATE = 1
+DIRTY_DATA = 1
+BIT_ACTIVE = 2
+HDIRTYFLAGS_OBJECT_HIERARCHY = 1
+GETACTIVEOBJECTFLAGS_NONE = 0
+GETACTIVEOBJECTFLAGS_CHILDREN = 1
+
+MCOMMAND_MELT = 1
+MODELINGCOMMANDMODE_POLYGONSELECTION = 2
+
+# Bytes per element of the variable tags the bridge fills
+_TAG_SIZES = {Tpoint: 24, Tpolygon: 16, Tnormal: 24, Tuvw: 48}
+
+events = {"event_adds": 0}
+
+
+def EventAdd(*args):
+    events["event_adds"] += 1
+
+
+def SpecialEventAdd(*args):
+    pass
+
+
+class Vector:
+    def __init__(self, x=0.0, y=None, z=None):
+        if y is None:
+            y = z = x
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __repr__(self):
+        return f"Vector({self.x}, {self.y}, {self.z})"
+
+
+class Vector4d(Vector):
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=0.0):
+        super().__init__(x, y, z)
+        self.w = float(w)
+
+
+class Matrix:
+    def __init__(self, off=None, v1=None, v2=None, v3=None):
+        self.off = off or Vector()
+        self.v1 = v1 or Vector(1.0, 0.0, 0.0)
+        self.v2 = v2 or Vector(0.0, 1.0, 0.0)
+        self.v3 = v3 or Vector(0.0, 0.0, 1.0)
+
+
+class CPolygon:
+    def __init__(self, a, b, c, d=None):
+        self.a, self.b, self.c = int(a), int(b), int(c)
+        self.d = self.c if d is None else int(d)
+
+
+class BaseContainer(dict):
+    def SetInt32(self, key, value):
+        self[key] = value
+
+    def GetInt32(self, key, default=0):
+        return self.get(key, default)
+
+    def SetString(self, key, value):
+        self[key] = value
+
+    def GetString(self, key, default=""):
+        return self.get(key, default)
+
+
+class BaseSelect:
+    def __init__(self):
+        self.selected = set()
+
+    def Select(self, index):
+        self.selected.add(index)
+
+    def DeselectAll(self):
+        self.selected.clear()
+
+    def IsSelected(self, index):
+        return index in self.selected
+
+    def GetCount(self):
+        return len(self.selected)
+
+    def SetAll(self, states):
+        self.selected = {index for index, state in enumerate(states) if state}
+
+    def GetAll(self, count):
+        return [index in self.selected for index in range(count)]
+
+
+class BaseTag:
+    def __init__(self, tag_type):
+        self.type = tag_type
+        self.data = BaseContainer()
+
+    def GetType(self):
+        return self.type
+
+    def CheckType(self, tag_type):
+        return self.type == tag_type
+
+    def GetDataInstance(self):
+        return self.data
+
+    def Message(self, *args):
+        return True
+
+
+class VariableTag(BaseTag):
+    def __init__(self, tag_type, count, buffer=None):
+        super().__init__(tag_type)
+        self.count = count
+        self.buffer = buffer if buffer is not None else bytearray(count * _TAG_SIZES.get(tag_type, 16))
+        self.lowlevel = True  # False: the buffer isn't exposed, as for tags C4D can't hand out
+
+    def GetDataCount(self):
+        return self.count
+
+    def GetLowlevelDataAddressW(self):
+        return memoryview(self.buffer) if self.lowlevel else None
+
+    def SetAllHighlevelData(self, values):
+        np.frombuffer(self.buffer, dtype=np.int16)[:] = values
+
+    def SetSlow(self, index, a, b, c, d):
+        corners = np.frombuffer(self.buffer, dtype=np.float32).reshape(-1, 4, 3)
+        corners[index] = [(v.x, v.y, v.z) for v in (a, b, c, d)]
+
+
+class VertexColorTag(VariableTag):
+    def __init__(self, count):
+        super().__init__(Tvertexcolor, count, bytearray(count * 16))
+        self.per_point = True
+
+    def SetPerPointMode(self, per_point):
+        self.per_point = per_point
+        self.buffer = bytearray(self.count * (16 if per_point else 64))
+
+    def IsPerPointColor(self):
+        return self.per_point
+
+
+class BaseObject:
+    def __init__(self, object_type=Onull):
+        self.type = object_type
+        self.name = ""
+        self.data = BaseContainer()
+        self.params = {}
+        self.parent = None
+        self.children = []
+        self.doc = None
+        self.tags = []
+        self.editor_mode = MODE_UNDEF
+        self.render_mode = MODE_UNDEF
+        self.alive = True
+
+    def GetType(self):
+        return self.type
+
+    def CheckType(self, object_type):
+        return self.type == object_type
+
+    def GetName(self):
+        return self.name
+
+    def SetName(self, name):
+        self.name = name
+
+    def GetDataInstance(self):
+        return self.data
+
+    def __getitem__(self, key):
+        return self.params.get(key)
+
+    def __setitem__(self, key, value):
+        self.params[key] = value
+
+    # Hierarchy
+    def __siblings(self):
+        if self.parent is not None:
+            return self.parent.children
+        return self.doc.objects if self.doc is not None else []
+
+    def GetUp(self):
+        return self.parent
+
+    def GetDown(self):
+        return self.children[0] if self.children else None
+
+    def GetNext(self):
+        siblings = self.__siblings()
+        index = siblings.index(self)
+        return siblings[index + 1] if index + 1 < len(siblings) else None
+
+    def GetChildren(self):
+        return list(self.children)
+
+    def GetDocument(self):
+        return self.doc
+
+    def Remove(self):
+        siblings = self.__siblings()
+        if self in siblings:
+            siblings.remove(self)
+            self.doc.hierarchy_changed()
+        self.parent = None
+
+    def InsertUnder(self, parent):
+        self.Remove()
+        self.parent = parent
+        self.doc = parent.doc or documents.GetActiveDocument()
+        parent.children.insert(0, self)
+        self.__adopt(self.doc)
+
+    def InsertUnderLast(self, parent):
+        self.InsertUnder(parent)
+        parent.children.append(parent.children.pop(0))
+
+    def __adopt(self, doc):
+        self.doc = doc
+        for child in self.children:
+            child.__adopt(doc)
+        doc.hierarchy_changed()
+
+    # State
+    def GetEditorMode(self):
+        return self.editor_mode
+
+    def SetEditorMode(self, mode):
+        self.editor_mode = mode
+
+    def GetRenderMode(self):
+        return self.render_mode
+
+    def SetRenderMode(self, mode):
+        self.render_mode = mode
+
+    def IsAlive(self):
+        return self.alive
+
+    def Message(self, *args):
+        return True
+
+    def SetDirty(self, *args):
+        pass
+
+    def SetBit(self, bit):
+        pass
+
+    def DelBit(self, bit):
+        pass
+
+    def SetMg(self, matrix):
+        pass
+
+    def SetAbsPos(self, vector):
+        pass
+
+    def SetAbsRot(self, vector):
+        pass
+
+    def SetAbsScale(self, vector):
+        pass
+
+    def SetUserDataContainer(self, *args):
+        pass
+
+    # Tags
+    def GetTag(self, tag_type):
+        return next((tag for tag in self.tags if tag.type == tag_type), None)
+
+    def GetTags(self):
+        return list(self.tags)
+
+    def MakeTag(self, tag_type):
+        tag = BaseTag(tag_type)
+        self.tags.append(tag)
+        return tag
+
+    def InsertTag(self, tag, pred=None):
+        self.tags.append(tag)
+
+    def KillTag(self, tag_type, nr=0):
+        self.tags = [tag for tag in self.tags if tag.type != tag_type]
+
+
+class PointObject(BaseObject):
+    pass
+
+
+class PolygonObject(PointObject):
+    """Points (float64 x, y, z) and polygons (int32 a, b, c, d) are kept in tag-backed bytearrays."""
+
+    def __init__(self, point_count=0, polygon_count=0):
+        super().__init__(Opolygon)
+        self.polygon_selection = BaseSelect()
+        self.edge_selection = BaseSelect()
+        self.resizes = 0
+        self.ResizeObject(point_count, polygon_count)
+        self.resizes = 0
+
+    def ResizeObject(self, point_count, polygon_count, ngon_count=-1):
+        self.points = VariableTag(Tpoint, point_count)
+        self.polygons = VariableTag(Tpolygon, polygon_count)
+        self.resizes += 1
+        return True
+
+    def point_array(self):
+        return np.frombuffer(self.points.buffer, dtype=np.float64).reshape(-1, 3)
+
+    def polygon_array(self):
+        return np.frombuffer(self.polygons.buffer, dtype=np.int32).reshape(-1, 4)
+
+    def GetTag(self, tag_type):
+        if tag_type == Tpoint:
+            return self.points
+        if tag_type == Tpolygon:
+            return self.polygons
+        return super().GetTag(tag_type)
+
+    def GetPointCount(self):
+        return self.points.count
+
+    def GetPolygonCount(self):
+        return self.polygons.count
+
+    def GetAllPoints(self):
+        return [Vector(*point) for point in self.point_array().tolist()]
+
+    def SetAllPoints(self, points):
+        assert len(points) == self.GetPointCount()
+        self.point_array()[:] = [(p.x, p.y, p.z) for p in points]
+
+    def GetPolygon(self, index):
+        return CPolygon(*self.polygon_array()[index].tolist())
+
+    def GetAllPolygons(self):
+        return [CPolygon(*polygon) for polygon in self.polygon_array().tolist()]
+
+    def SetPolygon(self, index, polygon):
+        self.polygon_array()[index] = (polygon.a, polygon.b, polygon.c, polygon.d)
+
+    def GetPolygonS(self):
+        return self.polygon_selection
+
+    def GetEdgeS(self):
+        return self.edge_selection
+
+    def MakeVariableTag(self, tag_type, count, pred=None):
+        self.KillTag(tag_type)
+        tag = VariableTag(tag_type, count)
+        self.tags.append(tag)
+        return tag
+
+
+class BaseDocument:
+    def __init__(self):
+        self.objects = []
+        self.undo = []  # "start", (undo type, object), "end"
+        self.hierarchy_dirty = 0
+        self.active = []
+
+    def hierarchy_changed(self):
+        self.hierarchy_dirty += 1
+
+    def InsertObject(self, obj, parent=None, pred=None):
+        if parent is not None:
+            obj.InsertUnder(parent)
+            return
+        obj.Remove()
+        obj.doc = self
+        self.objects.insert(0, obj)
+        self.hierarchy_changed()
+
+    def GetFirstObject(self):
+        return self.objects[0] if self.objects else None
+
+    def SearchObject(self, name):
+        stack = list(self.objects)
+        while stack:
+            obj = stack.pop(0)
+            if obj.GetName() == name:
+                return obj
+            stack[:0] = obj.children
+        return None
+
+    def GetHDirty(self, flags):
+        return self.hierarchy_dirty
+
+    def GetActiveObjects(self, flags=GETACTIVEOBJECTFLAGS_NONE):
+        return list(self.active)
+
+    def GetActiveObject(self):
+        return self.active[0] if self.active else None
+
+    def StartUndo(self):
+        self.undo.append("start")
+
+    def EndUndo(self):
+        self.undo.append("end")
+
+    def AddUndo(self, undo_type, obj):
+        self.undo.append((undo_type, obj))
+
+
+def _send_modeling_command(command, objects, mode, settings, doc):
+    """Melt stand-in: records the polygons selected for each call and leaves the mesh as it is."""
+    utils.melted.append([sorted(obj.GetPolygonS().selected) for obj in objects])
+    return True
+
+
+documents = types.ModuleType("c4d.documents")
+documents.BaseDocument = BaseDocument
+documents.active = BaseDocument()
+documents.GetActiveDocument = lambda: documents.active
+
+utils = types.ModuleType("c4d.utils")
+utils.melted = []
+utils.SendModelingCommand = _send_modeling_command
+
+
+def install():
+    """Registers this module as c4d (with c4d.documents and c4d.utils) in sys.modules."""
+    module = sys.modules[__name__]
+    module.documents = documents
+    module.utils = utils
+    sys.modules["c4d"] = module
+    sys.modules["c4d.documents"] = documents
+    sys.modules["c4d.utils"] = utils
+
+
+def reset():
+    """Starts a fresh active document and clears the counters."""
+    documents.active = BaseDocument()
+    utils.melted.clear()
+    events["event_adds"] = 0
@@ -0,0 +1,65 @@
+from apply_queue import ApplyQueue
+
+
+def test_drain_runs_callables_and_generators():
+    queue = ApplyQueue()
+    done = []
+
+    def work():
+        for step in range(3):
+            done.append(step)
+            yield
+
+    queue.put(lambda: done.append("call"))
+    queue.put(work())
+    assert queue.drain(0) is False
+    assert done == ["call", 0, 1, 2]
+    assert queue.applied == 2 and queue.depth == 0
+
+
+def test_paused_generator_gets_on_pause():
+    queue = ApplyQueue()
+    pauses = []
+
+    def work():
+        while True:
+            yield
+
+    queue.put(work(), on_pause=lambda: pauses.append(True))
+    assert queue.drain(1e-6) is True
+    assert pauses == [True]
+
+
+def test_clear_closes_generators_on_the_next_drain():
+    queue = ApplyQueue()
+    closed = []
+
+    def work():
+        try:
+            while True:
+                yield
+        finally:
+            closed.append(True)
+
+    generator = work()
+    queue.put(generator)
+    queue.drain(1e-6)
+    queue.clear()
+    assert closed == [] and queue.depth == 1
+    assert queue.drain(0) is False
+    assert closed == [True]
+
+
+def test_clear_without_generators_leaves_nothing():
+    queue = ApplyQueue()
+    queue.put(lambda: None)
+    queue.clear()
+    assert queue.depth == 0
+
+
+def test_failing_work_is_dropped():
+    queue = ApplyQueue()
+    queue.put(lambda: 1 / 0)
+    queue.put(lambda: None)
+    assert queue.drain(0) is False
+    assert queue.applied == 2
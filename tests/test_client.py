@@ -0,0 +1,168 @@
+import asyncio
+import concurrent.futures
+import struct
+import time
+
+import pytest
+import websockets
+
+from client import MessageType, PlasticityClient, PlasticityRequestError, TransactionStreamDecoder
+from conftest import encode_object, encode_objects, encode_transaction
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.calls = []
+
+    def on_connect(self):
+        pass
+
+    def on_disconnect(self):
+        pass
+
+    def on_transaction(self, transaction):
+        self.calls.append(("transaction", transaction["version"]))
+
+    def on_list(self, transaction):
+        self.calls.append(("list", transaction["version"]))
+
+
+class SentMessages:
+    """The websocket side of a connected client: records what it sends."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(data)
+
+
+def list_response(message_id, version, message_type=MessageType.LIST_ALL_1, objects=(1,)):
+    return encode_transaction("part.plasticity", version,
+                              [(MessageType.ADD_1.value, encode_objects([encode_object(i) for i in objects]))],
+                              message_type.value, message_id=message_id)
+
+
+def connected_client(handler=None):
+    client = PlasticityClient(handler=handler)
+    client.loop = asyncio.get_running_loop()
+    client.connected = True
+    client.websocket = SentMessages()
+    return client
+
+
+def test_commands_fail_right_away_when_not_connected():
+    results = []
+    client = PlasticityClient()
+    future = client.list_all(callback=lambda result, error: results.append((result, error)))
+    assert future.done()
+    assert isinstance(future.exception(), PlasticityRequestError)
+    assert "not connected" in str(future.exception())
+    assert results == [(None, future.exception())]
+
+
+def test_callbacks_go_through_the_dispatcher():
+    dispatched = []
+    client = PlasticityClient(dispatcher=lambda fn, *args: dispatched.append((fn, args)))
+    client.refacet_some("part.plasticity", [1], callback=print)
+    (fn, (result, error)), = dispatched
+    assert fn is print and result is None and error.message_type == MessageType.REFACET_SOME_1
+
+
+def test_responses_resolve_the_request_with_their_message_id():
+    async def run():
+        client = connected_client()
+        first = asyncio.ensure_future(client.list_all_async())
+        second = asyncio.ensure_future(client.list_visible_async())
+        await asyncio.sleep(0)
+        sent_ids = [struct.unpack_from("<II", data)[1] for data in client.websocket.sent]
+        assert sent_ids == [1, 2]
+        # Answered out of order
+        await client.on_message(None, list_response(2, 20, MessageType.LIST_VISIBLE_1))
+        await client.on_message(None, list_response(1, 10))
+        assert (await first)["version"] == 10
+        assert (await second)["version"] == 20
+        assert client.pending == {}
+
+    asyncio.run(run())
+
+
+def test_failed_and_timed_out_requests():
+    async def run():
+        client = connected_client()
+        failed = asyncio.ensure_future(client.list_all_async())
+        await asyncio.sleep(0)
+        await client.on_message(None, struct.pack("<III", MessageType.LIST_ALL_1.value, 1, 404))
+        with pytest.raises(PlasticityRequestError) as error:
+            await failed
+        assert error.value.code == 404
+
+        with pytest.raises(TimeoutError):
+            await client.list_all_async(timeout=0.01)
+        assert client.pending == {}
+
+    asyncio.run(run())
+
+
+def test_end_message_delivers_a_finished_stream():
+    async def run():
+        handler = RecordingHandler()
+        client = connected_client(handler)
+        future = concurrent.futures.Future()
+        client.pending[4] = future
+        decoder = TransactionStreamDecoder()
+        decoder.feed(list_response(4, 7, objects=(1, 2)))
+        client.end_message(decoder)
+        assert [obj.id for obj in future.result()["add"]] == [1, 2]
+        assert handler.calls == [("list", 7)]
+
+    asyncio.run(run())
+
+
+def test_end_message_rejects_a_truncated_stream():
+    async def run():
+        handler = RecordingHandler()
+        client = connected_client(handler)
+        future = concurrent.futures.Future()
+        client.pending[4] = future
+        response = list_response(4, 7, objects=(1, 2))
+        decoder = TransactionStreamDecoder()
+        decoder.feed(response[:len(response) // 2])
+        client.end_message(decoder)
+        assert isinstance(future.exception(), PlasticityRequestError)
+        assert handler.calls == []
+
+    asyncio.run(run())
+
+
+def test_streamed_messages_keep_their_order():
+    small = encode_transaction("part.plasticity", 1, [(MessageType.ADD_1.value, encode_objects([encode_object(1)]))])
+    large = list_response(1, 2, objects=range(2, 40))
+    malformed = struct.pack("<III", MessageType.LIST_ALL_1.value, 2, 200) + b"\x05\0\0\0ab"
+
+    async def serve(ws, path=None):
+        await ws.recv()
+        await ws.recv()
+        await ws.send(small)
+        await ws.send([large[i:i + 64] for i in range(0, len(large), 64)])
+        await ws.send([malformed[:6], malformed[6:]])
+        await asyncio.sleep(1.0)
+
+    async def run():
+        async with websockets.serve(serve, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            handler = RecordingHandler()
+            client = PlasticityClient(handler=handler)
+            client.connect(f"127.0.0.1:{port}")
+            deadline = time.monotonic() + 5.0
+            while not client.connected and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            listed, broken = client.list_all(), client.list_all()
+            while not broken.done() and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            # The small transaction was received first and is delivered first
+            assert handler.calls == [("transaction", 1), ("list", 2)]
+            assert len(listed.result(0)["add"]) == 38
+            assert isinstance(broken.exception(0), PlasticityRequestError)
+
+    asyncio.run(run())
@@ -0,0 +1,225 @@
+import random
+import struct
+
+import numpy as np
+import pytest
+
+from client import (DecodeProfile, MessageType, ObjectType, PlasticityClient, TransactionStreamDecoder,
+                    decode_object_data, decode_objects, decode_refacet_batch, mask_geometry, mask_newer, mask_visible, scan_objects)
+from conftest import counted, encode_object, encode_objects, encode_refacet_item, encode_transaction, padded
+
+HIGH_ID = 2 ** 31 + 5
+MAX_UINT32 = 2 ** 32 - 1
+
+
+def sample_payload():
+    return encode_objects([
+        encode_object(1, triangles=3),
+        encode_object(2, ObjectType.GROUP.value, flags=0, name="Group"),
+        encode_object(HIGH_ID, ObjectType.SHEET.value, version=MAX_UINT32, parent_id=2, name="Sheet"),
+    ])
+
+
+def test_decode_object_data_reads_header_and_channels():
+    record = encode_object(7, name="Body", triangles=2)
+    (object_type, object_id, version, parent_id, _, flags, name, vertices, faces, normals, end,
+     groups, face_ids) = decode_object_data(memoryview(record), 0)
+    assert (object_type, object_id, version, parent_id, flags) == (0, 7, 1, 0, 2)
+    assert name == "Body_7" and end == len(record)
+    assert faces.tolist() == [0, 1, 2, 0, 2, 3]
+    assert np.array_equal(normals, -vertices)
+    assert list(groups) == [0, 6] and list(face_ids) == [7]
+
+    record = encode_object(2, ObjectType.GROUP.value, name="2nd")
+    decoded = decode_object_data(memoryview(record), 0, use_pid_suffix=False)
+    assert decoded[6] == "Null_2nd" and decoded[10] == len(record)
+    assert decoded[7] is None and decoded[11] is None
+
+
+def test_scan_objects_reads_headers():
+    index = scan_objects(sample_payload())
+    assert index["id"].tolist() == [1, 2, HIGH_ID]
+    assert index["version"].tolist() == [1, 1, MAX_UINT32]
+    assert index["type"].tolist() == [0, 5, 1]
+    assert mask_geometry(index).tolist() == [True, False, True]
+    assert mask_visible(index).tolist() == [True, False, True]
+    assert index["faces_count"].tolist() == [3, 0, 2]
+
+
+def test_scan_objects_empty_payload():
+    assert len(scan_objects(struct.pack("<I", 0))) == 0
+
+
+def test_mask_newer_handles_uint32_ids_and_versions():
+    index = scan_objects(sample_payload())
+    assert mask_newer(index, {1: 1, 2: 0, HIGH_ID: MAX_UINT32 - 1}).tolist() == [False, True, True]
+    assert mask_newer(index, {HIGH_ID: MAX_UINT32}).tolist() == [True, True, False]
+    assert mask_newer(index, {}).all()
+
+
+def test_decode_objects_round_trip():
+    first, group, sheet = decode_objects(sample_payload())
+    assert (first.id, first.name, first.parent_id) == (1, "Solid 1_1", 0)
+    assert first.vertices.tolist() == list(range(15))
+    assert first.faces.tolist() == [0, 1, 2, 0, 2, 3, 0, 3, 4]
+    assert first.normals.tolist() == [-v for v in range(15)]
+    assert first.groups.tolist() == [0, 9]
+    assert first.face_ids.tolist() == [1]
+    assert first.vertices.flags.writeable is False
+    assert group.vertices is None and group.name == "Group_2"
+    assert (sheet.id, sheet.version, sheet.parent_id) == (HIGH_ID, MAX_UINT32, 2)
+
+
+def test_decode_objects_select_matches_full_decode():
+    payload = sample_payload()
+    full = decode_objects(payload)
+    selected = decode_objects(payload, select=mask_geometry)
+    assert [obj.id for obj in selected] == [1, HIGH_ID]
+    for obj, expected in zip(selected, (full[0], full[2])):
+        assert (obj.id, obj.version, obj.name) == (expected.id, expected.version, expected.name)
+        assert np.array_equal(obj.faces, expected.faces)
+        assert np.array_equal(obj.vertices, expected.vertices)
+    assert decode_objects(payload, select=np.zeros(3, dtype=bool)) == []
+
+
+def test_decode_profile_skips_channels():
+    obj, = decode_objects(encode_objects([encode_object(7)]), profile=DecodeProfile(("normals", "groups")))
+    assert obj.normals is None and obj.groups is None
+    assert obj.faces.tolist() == [0, 1, 2, 0, 2, 3]
+    assert obj.face_ids.tolist() == [7]
+    with pytest.raises(ValueError):
+        DecodeProfile(("colors",))
+
+
+def test_decode_refacet_batch_round_trip():
+    items = [
+        (HIGH_ID, MAX_UINT32, [4, 3], np.arange(15) * 0.5, [0, 1, 2, 3, 0, 3, 4], np.ones(15), [0, 7], [11]),
+        (3, 2, [], [], [], [], [], []),
+        (4, 1, [3], np.arange(9), [2, 1, 0], -np.ones(9), [0, 3], [12]),
+    ]
+    prefix = b"\0" * 8  # decoding starts mid-message
+    message = prefix + b"".join(encode_refacet_item(*item) for item in items)
+    batch = decode_refacet_batch(memoryview(message), len(prefix), len(items))
+
+    assert len(batch) == 3
+    assert batch.plasticity_ids.dtype == np.uint32
+    for item, decoded in zip(items, batch):
+        assert decoded[:2] == item[:2]
+        for expected, channel in zip(item[2:], decoded[2:]):
+            assert np.array_equal(channel, np.asarray(expected, dtype=channel.dtype))
+    assert batch.positions.dtype == np.float32 and batch.faces.dtype == np.int32
+
+
+def test_decode_refacet_batch_skips_channels():
+    message = encode_refacet_item(1, 1, [3], np.arange(9), [0, 1, 2], np.zeros(9), [0, 3], [5])
+    batch = decode_refacet_batch(memoryview(message), 0, 1, DecodeProfile(("normals",)))
+    assert batch.normals is None
+    assert batch.channel("normals", 0) is None
+    assert batch.channel("indices", 0).tolist() == [0, 1, 2]
+
+
+def sample_transaction():
+    return encode_transaction("part.plasticity", 9, [
+        (MessageType.DELETE_1.value, counted([4, HIGH_ID], np.uint32, 4)),
+        (MessageType.ADD_1.value, encode_objects([encode_object(1), encode_object(2, ObjectType.GROUP.value)])),
+        (MessageType.UPDATE_1.value, encode_objects([encode_object(HIGH_ID, version=MAX_UINT32, triangles=40)])),
+    ])
+
+
+def stream(message, sizes):
+    decoder = TransactionStreamDecoder()
+    completed = []
+    offset = 0
+    for size in sizes:
+        completed += decoder.feed(message[offset:offset + size])
+        offset += size
+    completed += decoder.feed(message[offset:])
+    return decoder, completed
+
+
+def summary(transaction):
+    return {
+        "filename": transaction["filename"],
+        "version": transaction["version"],
+        "delete": [int(i) for i in transaction["delete"]],
+        "add": [(obj.id, obj.version, obj.name, obj.tolist("vertices"), obj.tolist("faces")) for obj in transaction["add"]],
+        "update": [(obj.id, obj.version, obj.name, obj.tolist("vertices"), obj.tolist("faces")) for obj in transaction["update"]],
+    }
+
+
+def test_stream_decoder_whole_message():
+    decoder, completed = stream(sample_transaction(), [])
+    assert decoder.done and not decoder.failed
+    transaction = decoder.transaction
+    assert transaction["filename"] == "part.plasticity" and transaction["version"] == 9
+    assert [int(i) for i in transaction["delete"]] == [4, HIGH_ID]
+    assert [action for action, _ in completed] == ["add", "add", "update"]
+    assert transaction["update"][0].id == HIGH_ID and transaction["update"][0].version == MAX_UINT32
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_stream_decoder_any_chunking_matches_whole(seed):
+    message = sample_transaction()
+    whole, _ = stream(message, [])
+    rng = random.Random(seed)
+    sizes = []
+    while sum(sizes) < len(message):
+        sizes.append(rng.choice((1, 2, 3, 5, 8, 13, 64, 200)))
+    chunked, completed = stream(message, sizes)
+    assert chunked.done and not chunked.failed
+    assert summary(chunked.transaction) == summary(whole.transaction)
+    assert len(completed) == 3
+
+
+def test_stream_decoder_byte_by_byte():
+    message = sample_transaction()
+    decoder, _ = stream(message, [1] * len(message))
+    assert summary(decoder.transaction) == summary(stream(message, [])[0].transaction)
+
+
+def test_stream_decoder_list_response():
+    message = encode_transaction("a", 3, [(MessageType.ADD_1.value, encode_objects([encode_object(5)]))],
+                                 MessageType.LIST_ALL_1.value, message_id=42)
+    decoder, completed = stream(message, [7, 7])
+    assert decoder.message_type == MessageType.LIST_ALL_1
+    assert (decoder.message_id, decoder.code) == (42, 200)
+    assert [obj.id for _, obj in completed] == [5]
+
+
+def test_stream_decoder_failed_list_response_stops():
+    message = struct.pack("<III", MessageType.LIST_ALL_1.value, 1, 500)
+    decoder, completed = stream(message, [])
+    assert decoder.done and decoder.code == 500
+    assert decoder.transaction is None and completed == []
+
+
+def test_stream_decoder_rejects_unknown_message_type():
+    assert not TransactionStreamDecoder.accepts(struct.pack("<I", MessageType.REFACET_SOME_1.value))
+    assert not TransactionStreamDecoder.accepts(b"\0\0")
+    decoder = TransactionStreamDecoder()
+    decoder.feed(struct.pack("<I", 999))
+    assert decoder.failed
+    assert decoder.feed(b"more") == []
+
+
+def test_message_item_delete_ids_are_uint32():
+    transaction = {"delete": [], "add": [], "update": []}
+    item = struct.pack("<I", MessageType.DELETE_1.value) + counted([MAX_UINT32, 1], np.uint32, 4)
+    PlasticityClient().on_message_item(memoryview(item), transaction)
+    assert [int(i) for i in transaction["delete"]] == [MAX_UINT32, 1]
+
+
+def test_message_item_empty_add():
+    transaction = {"delete": [], "add": [], "update": []}
+    PlasticityClient().on_message_item(memoryview(struct.pack("<II", MessageType.ADD_1.value, 0)), transaction)
+    assert transaction["add"] == []
+
+
+def test_padded_names_keep_alignment():
+    # Names of every length mod 4 must leave the following geometry 4-byte aligned
+    records = [encode_object(i, name="n" * length) for i, length in enumerate(range(1, 6), 1)]
+    index = scan_objects(encode_objects(records))
+    assert (index["vertices_offset"] % 4 == 0).all()
+    assert [obj.name for obj in decode_objects(encode_objects(records), use_pid_suffix=False)] == \
+        ["n" * length for length in range(1, 6)]
+    assert padded(b"abc") == b"abc\0"
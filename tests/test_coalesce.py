@@ -0,0 +1,86 @@
+from coalesce import TransactionCoalescer
+
+
+def obj(plasticity_id, version, name=None):
+    return {"id": plasticity_id, "version": version, "name": name or f"Solid {plasticity_id}"}
+
+
+def transaction(filename="a", version=1, add=(), update=(), delete=()):
+    return {"filename": filename, "version": version, "add": list(add), "update": list(update), "delete": list(delete)}
+
+
+def only(coalescer):
+    merged = coalescer.take()
+    assert len(merged) == 1
+    return merged[0]
+
+
+def test_first_push_schedules_a_flush():
+    coalescer = TransactionCoalescer()
+    assert coalescer.push(transaction(add=[obj(1, 1)])) is True
+    assert coalescer.push(transaction(update=[obj(1, 2)])) is False
+    coalescer.take()
+    assert coalescer.push(transaction(update=[obj(1, 3)])) is True
+
+
+def test_latest_version_wins():
+    coalescer = TransactionCoalescer()
+    coalescer.push(transaction(version=1, update=[obj(1, 1, "old")]))
+    coalescer.push(transaction(version=3, update=[obj(1, 3, "new")]))
+    coalescer.push(transaction(version=2, update=[obj(1, 2, "stale")]))
+    merged = only(coalescer)
+    assert merged["version"] == 3
+    assert [o["name"] for o in merged["update"]] == ["new"]
+    assert coalescer.metrics() == {"received": 3, "dropped": 2}
+
+
+def test_update_of_pending_add_stays_an_add():
+    coalescer = TransactionCoalescer()
+    coalescer.push(transaction(add=[obj(1, 1)]))
+    coalescer.push(transaction(update=[obj(1, 2)]))
+    merged = only(coalescer)
+    assert [o["version"] for o in merged["add"]] == [2]
+    assert merged["update"] == []
+
+
+def test_delete_drops_pending_update():
+    coalescer = TransactionCoalescer()
+    coalescer.push(transaction(update=[obj(1, 1), obj(2, 1)]))
+    coalescer.push(transaction(delete=[1]))
+    merged = only(coalescer)
+    assert merged["delete"] == [1]
+    assert [o["id"] for o in merged["update"]] == [2]
+    assert coalescer.metrics()["dropped"] == 1
+
+
+def test_add_after_delete_cancels_the_delete():
+    coalescer = TransactionCoalescer()
+    coalescer.push(transaction(delete=[5, 6]))
+    coalescer.push(transaction(add=[obj(5, 4)]))
+    merged = only(coalescer)
+    assert merged["delete"] == [6]
+    assert [o["id"] for o in merged["add"]] == [5]
+
+
+def test_files_are_kept_apart():
+    coalescer = TransactionCoalescer()
+    coalescer.push(transaction("a", 1, update=[obj(1, 1)]))
+    coalescer.push(transaction("b", 7, update=[obj(1, 1)]))
+    merged = {t["filename"]: t for t in coalescer.take()}
+    assert sorted(merged) == ["a", "b"]
+    assert merged["b"]["version"] == 7
+    assert coalescer.take() == []
+
+
+def test_clear_drops_everything():
+    coalescer = TransactionCoalescer()
+    coalescer.push(transaction(update=[obj(1, 1)]))
+    coalescer.clear()
+    assert coalescer.take() == []
+    assert coalescer.push(transaction(update=[obj(1, 2)])) is True
+
+
+def test_empty_transaction():
+    coalescer = TransactionCoalescer()
+    coalescer.push({"filename": "a"})
+    assert only(coalescer) == {"filename": "a", "version": 0, "delete": [], "add": [], "update": []}
@@ -0,0 +1,276 @@
+import numpy as np
+
+import c4d
+from geometry import (GeometryWriter, buffer_fingerprint, convert_normals, convert_points, convert_polygons,
+                      faces_to_polygons, ngon_rounds, triangles_to_polygons)
+
+
+def signed_areas(points, polygons):
+    """Z of the cross product of every triangle (a, b, c); positive when wound counter-clockwise."""
+    a, b, c = (points[polygons[:, k]] for k in range(3))
+    return np.cross(b - a, c - a)[:, 2] / 2.0
+
+
+def test_triangles_to_polygons():
+    polygons = triangles_to_polygons([0, 1, 2, 2, 1, 3])
+    assert polygons.dtype == np.int32
+    assert polygons.tolist() == [[0, 1, 2, 2], [2, 1, 3, 3]]
+    assert triangles_to_polygons([]).shape == (0, 4)
+
+
+def test_faces_to_polygons_triangles_and_quads():
+    polygons, polygon_faces = faces_to_polygons([3, 4], [0, 1, 2, 3, 4, 5, 6])
+    assert polygons.tolist() == [[0, 1, 2, 2], [3, 4, 5, 6]]
+    assert polygon_faces.tolist() == [0, 1]
+
+
+def test_faces_to_polygons_splits_quads_without_keep_quads():
+    polygons, polygon_faces = faces_to_polygons([4], [0, 1, 2, 3], keep_quads=False)
+    assert polygons.tolist() == [[0, 1, 2, 2], [0, 2, 3, 3]]
+    assert polygon_faces.tolist() == [0, 0]
+
+
+def test_faces_to_polygons_fans_ngons():
+    polygons, polygon_faces = faces_to_polygons([3, 6], [9, 8, 7, 0, 1, 2, 3, 4, 5])
+    assert polygons.tolist() == [[9, 8, 7, 7], [0, 1, 2, 2], [0, 2, 3, 3], [0, 3, 4, 4], [0, 4, 5, 5]]
+    assert polygon_faces.tolist() == [0, 1, 1, 1, 1]
+
+
+def test_faces_to_polygons_empty():
+    polygons, polygon_faces = faces_to_polygons([], [])
+    assert polygons.shape == (0, 4) and polygons.dtype == np.int32
+    assert polygon_faces.shape == (0,)
+
+
+def test_faces_to_polygons_degenerate_faces_produce_nothing():
+    polygons, polygon_faces = faces_to_polygons([2, 0, 3], [0, 1, 2, 3, 4])
+    assert polygons.tolist() == [[2, 3, 4, 4]]
+    assert polygon_faces.tolist() == [2]
+
+
+def test_faces_to_polygons_convex_ngon_keeps_fan():
+    angles = np.linspace(0.0, 2.0 * np.pi, 6, endpoint=False)
+    points = np.stack((np.cos(angles), np.sin(angles), np.zeros(6)), axis=1)
+    fanned, _ = faces_to_polygons([6], np.arange(6))
+    with_points, _ = faces_to_polygons([6], np.arange(6), points=points)
+    assert np.array_equal(fanned, with_points)
+
+
+def test_faces_to_polygons_ear_clips_concave_faces():
+    # An L shape: fanning from the first vertex crosses the notch
+    points = np.array([(2, 0, 0), (2, 1, 0), (1, 1, 0), (1, 2, 0), (0, 2, 0), (0, 0, 0)], dtype=np.float64)
+    indices = np.array([10, 11, 12, 13, 14, 15])
+    scene = np.zeros((16, 3))
+    scene[10:] = points
+
+    fanned, _ = faces_to_polygons([6], indices, points=None)
+    assert (signed_areas(scene, fanned) < 0).any()
+
+    polygons, polygon_faces = faces_to_polygons([6], indices, points=scene)
+    areas = signed_areas(scene, polygons)
+    assert len(polygons) == 4 and polygon_faces.tolist() == [0] * 4
+    assert (areas > 0).all()
+    assert np.isclose(areas.sum(), 3.0)
+    assert set(polygons[:, :3].ravel().tolist()) == set(indices.tolist())
+    assert (polygons[:, 3] == polygons[:, 2]).all()
+
+
+def test_faces_to_polygons_ear_clip_keeps_clockwise_winding():
+    points = np.array([(2, 0, 0), (0, 0, 0), (0, 2, 0), (1, 2, 0), (1, 1, 0), (2, 1, 0)], dtype=np.float64)
+    polygons, _ = faces_to_polygons([3, 6], [0, 1, 2, 0, 1, 2, 3, 4, 5], points=points)
+    areas = signed_areas(points, polygons[1:])
+    assert (areas < 0).all()
+    assert np.isclose(areas.sum(), -3.0)
+
+
+def test_faces_to_polygons_ear_clips_only_the_concave_face():
+    square = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0.5, 1.2, 0), (0, 1, 0)]
+    notch = [(3, 0, 0), (5, 0, 0), (5, 2, 0), (4, 0.5, 0), (3, 2, 0)]
+    points = np.array(square + notch, dtype=np.float64)
+    faces = [5, 5]
+    indices = np.arange(10)
+    fanned, _ = faces_to_polygons(faces, indices)
+    polygons, polygon_faces = faces_to_polygons(faces, indices, points=points)
+    assert np.array_equal(polygons[:3], fanned[:3])
+    assert polygon_faces.tolist() == [0, 0, 0, 1, 1, 1]
+    assert (signed_areas(points, polygons) > 0).all()
+
+
+def star(rng, sides):
+    """A random simple star-shaped polygon around the origin, counter-clockwise in XY."""
+    while True:
+        angles = np.sort(rng.uniform(0.0, 2.0 * np.pi, sides))
+        if np.diff(np.r_[angles, angles[0] + 2.0 * np.pi]).max() < 0.95 * np.pi:
+            break
+    radii = rng.uniform(0.3, 1.0, sides)
+    return np.stack((radii * np.cos(angles), radii * np.sin(angles), np.zeros(sides)), axis=1)
+
+
+def test_faces_to_polygons_ear_clips_rotated_faces_of_mixed_sizes():
+    rng = np.random.default_rng(7)
+    faces, outlines, points = [], [], []
+    for _ in range(60):
+        sides = int(rng.integers(4, 40))
+        outline = star(rng, sides)
+        if rng.random() < 0.5:
+            outline = outline[::-1]
+        rotation, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+        faces.append(sides)
+        outlines.append(outline)
+        points.append(outline @ rotation.T + rng.normal(size=3))
+    starts = np.cumsum([0] + faces[:-1])
+
+    polygons, polygon_faces = faces_to_polygons(faces, np.arange(sum(faces)), keep_quads=False,
+                                                points=np.concatenate(points))
+    assert len(polygons) == sum(faces) - 2 * len(faces)
+    assert (np.diff(polygon_faces) >= 0).all()
+    for face, outline in enumerate(outlines):
+        triangles = polygons[polygon_faces == face, :3] - starts[face]
+        areas = signed_areas(outline, triangles)
+        x, y = outline[:, 0], outline[:, 1]
+        area = 0.5 * np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)
+        # Every triangle keeps the face's winding and together they tile it exactly
+        assert (areas * np.sign(area) > 0).all()
+        assert np.isclose(areas.sum(), area)
+
+
+def test_ngon_rounds_never_select_neighbours_together():
+    # Three hexagons in a row, sharing an edge with the next; a quad on the side
+    faces = [6, 6, 6, 4]
+    indices = [0, 1, 2, 3, 4, 5, 3, 2, 6, 7, 8, 9, 9, 8, 10, 11, 12, 13, 20, 21, 22, 23]
+    polygons, polygon_faces = faces_to_polygons(faces, indices)
+    rounds = ngon_rounds(faces, indices, polygon_faces)
+    assert 2 <= len(rounds) <= 3
+    chosen = [set(polygon_faces[mask].tolist()) for mask in rounds]
+    assert set().union(*chosen) == {0, 1, 2}
+    for faces_in_round in chosen:
+        assert not {0, 1} <= faces_in_round and not {1, 2} <= faces_in_round
+    # Each round selects whole faces
+    for mask in rounds:
+        assert np.array_equal(mask, np.isin(polygon_faces, polygon_faces[mask]))
+
+
+def test_ngon_rounds_without_large_faces():
+    polygons, polygon_faces = faces_to_polygons([3, 4], [0, 1, 2, 0, 2, 3, 4])
+    assert ngon_rounds([3, 4], [0, 1, 2, 0, 2, 3, 4], polygon_faces) == []
+
+
+def test_buffer_fingerprint():
+    a = np.arange(12, dtype=np.float32)
+    assert buffer_fingerprint(a) == buffer_fingerprint(a.copy())
+    assert buffer_fingerprint(a)[0] == 48
+    assert buffer_fingerprint(a) != buffer_fingerprint(a[::-1])
+    assert buffer_fingerprint(a) != buffer_fingerprint(a.astype(np.float64))
+    assert buffer_fingerprint(a.reshape(3, 4).T) == buffer_fingerprint(np.ascontiguousarray(a.reshape(3, 4).T))
+    assert buffer_fingerprint(None) is None
+
+
+def test_convert_points_swaps_y_and_z_and_scales():
+    points = np.array([(1.0, 2.0, 3.0), (0.1, -0.2, 0.3)], dtype=np.float32)
+    out = convert_points(points, 10.0, np.empty((2, 3)))
+    assert np.allclose(out, [(10, 30, 20), (1, 3, -2)])
+    # Dividing by the scale gives the float32 source back exactly
+    assert np.array_equal((out / 10.0).astype(np.float32)[:, [0, 2, 1]], points)
+
+
+def test_convert_polygons_reverses_winding():
+    polygons = np.array([(0, 1, 2, 3), (4, 5, 6, 6)], dtype=np.int32)
+    out = convert_polygons(polygons, np.empty_like(polygons))
+    assert out.tolist() == [[0, 3, 2, 1], [4, 6, 5, 5]]
+
+
+def test_convert_normals_packs_corners():
+    normals = np.array([(0, 0, 1), (0, 1, 0), (1, 0, 0)], dtype=np.float32).ravel()
+    out = convert_normals(normals, np.array([(0, 1, 2, 2)]), np.empty((1, 4, 3), dtype=np.int16))
+    assert out.tolist() == [[[0, 32000, 0], [0, 0, 32000], [32000, 0, 0], [32000, 0, 0]]]
+
+
+def quad_mesh():
+    """One Plasticity quad (Z-up) and its per-point normals."""
+    points = np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=np.float32)
+    normals = np.tile(np.float32([0, 0, 1]), 4)
+    return points, np.array([(0, 1, 2, 3)], dtype=np.int32), normals
+
+
+def test_geometry_writer_bulk_write():
+    points, polygons, normals = quad_mesh()
+    obj = c4d.PolygonObject(0, 0)
+    assert GeometryWriter().write(obj, points, polygons, normals=normals) == "bulk"
+    assert obj.GetPointCount() == 4 and obj.GetPolygonCount() == 1
+    assert obj.point_array().tolist() == [[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1]]
+    assert obj.polygon_array().tolist() == [[0, 3, 2, 1]]
+    assert np.frombuffer(obj.GetTag(c4d.Tnormal).buffer, dtype=np.int16).reshape(4, 3).tolist() == [[0, 32000, 0]] * 4
+
+
+def test_geometry_writer_points_only_write():
+    points, polygons, _ = quad_mesh()
+    obj = c4d.PolygonObject(0, 0)
+    writer = GeometryWriter()
+    writer.write(obj, points, polygons)
+    written_points, written_polygons = obj.point_array().copy(), obj.polygon_array().copy()
+    assert writer.write(obj, points * 2, None) == "bulk"
+    assert obj.resizes == 1
+    assert np.array_equal(obj.polygon_array(), written_polygons)
+    assert np.array_equal(obj.point_array(), written_points * 2)
+
+
+def test_geometry_writer_scales_points():
+    points, polygons, _ = quad_mesh()
+    obj = c4d.PolygonObject(0, 0)
+    GeometryWriter(scale=2.0).write(obj, points, polygons)
+    assert obj.point_array().tolist() == [[0, 0, 0], [2, 0, 0], [2, 0, 2], [0, 0, 2]]
+
+
+def test_geometry_writer_falls_back_per_write():
+    points, polygons, _ = quad_mesh()
+    obj = c4d.PolygonObject(4, 1)
+    obj.points.lowlevel = False  # for this object only
+    writer = GeometryWriter()
+    assert writer.write(obj, points, polygons) == "fallback"
+    assert writer.bulk
+    assert [(p.x, p.y, p.z) for p in obj.GetAllPoints()][2] == (1.0, 0.0, 1.0)
+    assert [(p.a, p.b, p.c, p.d) for p in obj.GetAllPolygons()] == [(0, 3, 2, 1)]
+    assert writer.write(c4d.PolygonObject(0, 0), points, polygons) == "bulk"
+
+
+def test_geometry_writer_turns_bulk_off_without_the_buffer_api(monkeypatch):
+    points, polygons, _ = quad_mesh()
+    monkeypatch.delattr(c4d.VariableTag, "GetLowlevelDataAddressW")
+    writer = GeometryWriter()
+    obj = c4d.PolygonObject(0, 0)
+    assert writer.write(obj, points, polygons) == "fallback"
+    assert not writer.bulk
+    assert obj.polygon_array().tolist() == [[0, 3, 2, 1]]
+
+
+def test_geometry_writer_rescale_matches_a_fresh_write():
+    rng = np.random.default_rng(3)
+    points = rng.uniform(-100, 100, (50, 3)).astype(np.float32)
+    writer = GeometryWriter(scale=1.0)
+    obj = c4d.PolygonObject(0, 0)
+    writer.write(obj, points, np.zeros((0, 4), dtype=np.int32))
+    for previous, scale in ((1.0, 0.1), (0.1, 2.54), (2.54, 1 / 3)):
+        writer.rescale(obj, previous, scale)
+    fresh = c4d.PolygonObject(0, 0)
+    GeometryWriter(scale=1 / 3).write(fresh, points, np.zeros((0, 4), dtype=np.int32))
+    assert np.array_equal(obj.point_array(), fresh.point_array())
+
+
+def test_geometry_writer_uvs():
+    points, polygons, _ = quad_mesh()
+    obj = c4d.PolygonObject(0, 0)
+    writer = GeometryWriter()
+    writer.write(obj, points, polygons)
+    uvs = np.array([[(0, 0), (1, 0), (1, 1), (0, 1)]], dtype=np.float32)
+    tag = writer.write_uvs(obj, uvs)
+    assert np.frombuffer(tag.buffer, dtype=np.float32).reshape(1, 4, 3)[..., :2].tolist() == uvs.tolist()
+
+
+def test_geometry_writer_polygon_colors():
+    points, polygons, _ = quad_mesh()
+    obj = c4d.PolygonObject(0, 0)
+    writer = GeometryWriter()
+    writer.write(obj, points, polygons)
+    tag = writer.write_polygon_colors(obj, np.array([(0.25, 0.5, 0.75)], dtype=np.float32))
+    assert not tag.IsPerPointColor() and obj.GetTag(c4d.Tvertexcolor) is tag
+    assert np.frombuffer(tag.buffer, dtype=np.float32).reshape(4, 4).tolist() == [[0.25, 0.5, 0.75, 1.0]] * 4
@@ -0,0 +1,260 @@
+import numpy as np
+
+import c4d
+import fake_c4d
+from client import decode_refacet_batch
+from conftest import encode_refacet_item
+from handler import PlasticityIdUniquenessScope, SceneHandler
+
+FILE = "part.plasticity"
+QUAD = np.array([0, 1, 2, 0, 2, 3], dtype=np.int32)
+
+# A hexagon and a quad side by side, as refacet channels
+HEXAGON = [(np.cos(a), np.sin(a), 0.0) for a in np.linspace(0.0, 2.0 * np.pi, 6, endpoint=False)]
+REFACET_POSITIONS = np.array(HEXAGON + [(3, 0, 0), (4, 0, 0), (4, 1, 0), (3, 1, 0)], dtype=np.float32).ravel()
+REFACET = ([6, 4], REFACET_POSITIONS, np.arange(10), np.tile(np.float32([0, 0, 1]), 10), [0, 6, 6, 4], [21, 22])
+
+
+class TickUI:
+    """Stands in for the plugin UI: work is only applied when the test drains the queue."""
+
+    def schedule_apply(self):
+        pass
+
+
+def quad(scale=1.0):
+    return np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=np.float32).ravel() * np.float32(scale)
+
+
+def solid(plasticity_id, version=1, parent_id=0, flags=2, name=None, vertices=None, faces=QUAD):
+    vertices = quad() if vertices is None else vertices
+    return {"type": 0, "id": plasticity_id, "version": version, "parent_id": parent_id, "flags": flags,
+            "name": name or f"Solid {plasticity_id}", "vertices": vertices, "faces": faces,
+            "normals": np.tile(np.float32([0, 0, 1]), len(vertices) // 3),
+            "groups": np.array([0, len(faces)], dtype=np.int32), "face_ids": np.array([plasticity_id], dtype=np.int32)}
+
+
+def group(plasticity_id, version=1, parent_id=0, flags=2, name=None):
+    return {"type": 5, "id": plasticity_id, "version": version, "parent_id": parent_id, "flags": flags,
+            "name": name or f"Group {plasticity_id}", "vertices": None, "faces": None, "normals": None,
+            "groups": None, "face_ids": None}
+
+
+def message(version, add=(), update=(), delete=()):
+    return {"filename": FILE, "version": version, "add": list(add), "update": list(update), "delete": list(delete)}
+
+
+def item(handler, plasticity_id, scope=PlasticityIdUniquenessScope.ITEM):
+    return handler.files[FILE][scope].get(plasticity_id)
+
+
+def inbox(doc):
+    return doc.SearchObject("Inbox")
+
+
+def refacet(handler):
+    faces, positions, indices, normals, groups, face_ids = REFACET
+    handler.on_refacet(FILE, 2, [1], [2], [faces], [positions], [indices], [normals], [groups], [face_ids])
+
+
+def test_list_builds_the_inbox_hierarchy_in_one_undo_group(doc):
+    handler = SceneHandler()
+    handler.on_list(message(1, add=[solid(1, parent_id=10), solid(2), group(10)]))
+    root = doc.SearchObject("Plasticity")
+    assert root.GetDown().GetName() == FILE
+    assert item(handler, 10, PlasticityIdUniquenessScope.GROUP).GetUp() is inbox(doc)
+    assert item(handler, 1).GetUp() is item(handler, 10, PlasticityIdUniquenessScope.GROUP)
+    assert item(handler, 2).GetUp() is inbox(doc)
+    assert item(handler, 2).GetPolygonCount() == 2
+    assert doc.undo.count("start") == 1 and doc.undo.count("end") == 1
+
+
+def test_live_link_transactions_skip_undo(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    assert item(handler, 1) is not None
+    assert doc.undo == []
+    assert handler.commit_stats["event_adds"] >= 1
+
+
+def test_stale_file_version_is_skipped(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(2, add=[solid(1)]))
+    handler.on_transaction(message(1, update=[solid(1, version=2, name="Older")]))
+    assert item(handler, 1).GetName() == "Solid 1"
+    assert handler.version_metrics() == {"objects": 1, "stale": 1}
+
+
+def test_stale_object_version_only_renames(doc):
+    handler = SceneHandler()
+    handler.on_list(message(3, add=[solid(1, version=5)]))
+    handler.on_transaction(message(4, update=[solid(1, version=5, name="Renamed", vertices=quad(3.0))]))
+    obj = item(handler, 1)
+    assert obj.GetName() == "Renamed"
+    assert obj.point_array().max() == 1.0
+    assert handler.stale_updates == 1
+
+
+def test_new_file_restarts_versions(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(5, add=[solid(1)]))
+    handler.on_new_file(FILE)
+    handler.on_transaction(message(1, update=[solid(1, version=1, vertices=quad(2.0))]))
+    assert item(handler, 1).point_array().max() == 2.0
+    assert handler.stale_updates == 0
+
+
+def test_outdated_until_the_announced_version_is_applied(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    assert not handler.is_outdated(FILE)
+    handler.on_new_version(FILE, 3)
+    assert handler.is_outdated(FILE)
+    handler.on_transaction(message(3, update=[solid(1, version=2)]))
+    assert not handler.is_outdated(FILE)
+
+
+def test_unchanged_geometry_is_not_written(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    writes = len(handler.geometry_writer.timings)
+    handler.on_transaction(message(2, update=[solid(1, version=2, name="Renamed")]))
+    assert item(handler, 1).GetName() == "Renamed"
+    assert len(handler.geometry_writer.timings) == writes
+    assert handler.geometry_cache_metrics() == {"entries": 1, "hits": 1, "misses": 0}
+
+
+def test_same_topology_writes_only_points(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    obj = item(handler, 1)
+    polygons, points = obj.polygons, obj.point_array().copy()
+    obj.polygon_array()[0] = (7, 7, 7, 7)  # marks the stored polygons
+
+    handler.on_transaction(message(2, update=[solid(1, version=2, vertices=quad(2.0))]))
+    assert obj.resizes == 0 and obj.polygons is polygons
+    assert obj.polygon_array()[0].tolist() == [7, 7, 7, 7]
+    assert np.allclose(obj.point_array(), points * 2)
+
+    # New topology: the polygons are written again
+    handler.on_transaction(message(3, update=[solid(1, version=3, vertices=quad(2.0), faces=QUAD[::-1].copy())]))
+    assert obj.polygon_array()[0].tolist() != [7, 7, 7, 7]
+
+
+def test_refacet_batch_melts_ngons_and_indexes_faces(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    batch = decode_refacet_batch(memoryview(encode_refacet_item(1, 2, *REFACET)), 0, 1)
+    handler.on_refacet_batch(FILE, 2, batch)
+
+    obj = item(handler, 1)
+    assert obj.GetPolygonCount() == 5
+    # One melt round selecting the fanned hexagon
+    assert fake_c4d.utils.melted == [[[0, 1, 2, 3]]]
+    assert handler.face_indices[(FILE, 1)].polygon_faces.tolist() == [0, 0, 0, 0, 1]
+    assert handler.face_indices[(FILE, 1)].face_ids.tolist() == [21, 22]
+
+
+def test_refacet_keeps_ngons(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    refacet(handler)
+    # Fanned hexagon and quad; the hexagon's triangles are melted in one round
+    assert item(handler, 1).GetPolygonCount() == 5
+    assert fake_c4d.utils.melted == [[[0, 1, 2, 3]]]
+
+
+def test_triangulate_rebuilds_from_cached_refacets(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    refacet(handler)
+    fake_c4d.utils.melted.clear()
+
+    handler.set_triangulate(True)
+    obj = item(handler, 1)
+    assert obj.GetPolygonCount() == 6
+    assert (obj.polygon_array()[:, 2] == obj.polygon_array()[:, 3]).all()
+    assert fake_c4d.utils.melted == []
+
+    handler.set_triangulate(False)
+    assert obj.GetPolygonCount() == 5 and len(fake_c4d.utils.melted) == 1
+
+
+def test_triangulate_keeps_the_face_index(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    refacet(handler)
+    handler.set_triangulate(True)
+    assert handler.face_indices[(FILE, 1)].polygon_faces.tolist() == [0, 0, 0, 0, 1, 1]
+    handler.set_triangulate(False)
+    assert handler.face_indices[(FILE, 1)].polygon_faces.tolist() == [0, 0, 0, 0, 1]
+
+
+def test_set_scale_rescales_meshes_in_place(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    handler.set_scale(2.5)
+    obj = item(handler, 1)
+    assert np.allclose(obj.point_array()[2], (2.5, 0, 2.5))
+    handler.on_transaction(message(2, add=[solid(2)]))
+    assert np.array_equal(item(handler, 2).point_array(), obj.point_array())
+
+
+def test_deletes_items_and_groups_together(doc):
+    handler = SceneHandler(live_link_undo=True)
+    handler.on_transaction(message(1, add=[group(10), solid(1), solid(2), solid(3)]))
+    obj, grp = item(handler, 1), item(handler, 10, PlasticityIdUniquenessScope.GROUP)
+    handler.on_transaction(message(2, delete=[1, 10, 99]))
+    assert item(handler, 1) is None and item(handler, 10, PlasticityIdUniquenessScope.GROUP) is None
+    assert obj.GetUp() is None and grp.GetUp() is None
+    assert (c4d.UNDOTYPE_DELETE, obj) in doc.undo and (c4d.UNDOTYPE_DELETE, grp) in doc.undo
+    assert (FILE, 1) not in handler.applied_versions
+
+    # A full list reconciles what is missing from it
+    handler.on_list(message(3, add=[solid(3, version=2)]))
+    assert item(handler, 2) is None and item(handler, 3) is not None
+    assert [child.GetName() for child in inbox(doc).GetChildren()] == ["Solid 3"]
+
+
+def test_index_is_kept_until_the_scene_changes_outside(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[solid(1)]))
+    index = handler.files[FILE]
+
+    handler.on_transaction(message(2, add=[solid(2)], update=[solid(1, version=2)]))
+    assert handler.files[FILE] is index and item(handler, 2) is not None
+
+    doc.InsertObject(c4d.BaseObject(c4d.Onull))
+    handler.on_transaction(message(3, update=[solid(1, version=3)]))
+    assert handler.files[FILE] is not index
+    assert set(handler.files[FILE][PlasticityIdUniquenessScope.ITEM]) == {1, 2}
+
+
+def test_rescan_keeps_placements_that_still_hold(doc):
+    handler = SceneHandler()
+    handler.on_transaction(message(1, add=[group(10), solid(1), solid(2)]))
+    mutations = handler.hierarchy_mutations
+
+    # An unrelated edit forces a rescan; nothing of ours moved
+    doc.InsertObject(c4d.BaseObject(c4d.Onull))
+    handler.on_transaction(message(2, update=[solid(1, version=2), solid(2, version=2)]))
+    assert handler.hierarchy_mutations == mutations
+
+    # The user drags solid 1 into the group; only it is put back
+    item(handler, 1).InsertUnder(item(handler, 10, PlasticityIdUniquenessScope.GROUP))
+    handler.on_transaction(message(3, update=[solid(1, version=3), solid(2, version=3)]))
+    assert item(handler, 1).GetUp() is inbox(doc)
+    assert handler.hierarchy_mutations == mutations + 2
+
+
+def test_list_over_many_ticks_is_one_undo_group(doc):
+    handler = SceneHandler(plasticity_ui=TickUI())
+    handler.on_list(message(1, add=[solid(plasticity_id) for plasticity_id in range(1, 21)]))
+    ticks = 0
+    while handler.apply_pending(1e-6):
+        ticks += 1
+    assert ticks >= 20
+    assert len(item(handler, 20).GetUp().GetChildren()) == 20
+    assert doc.undo.count("start") == 1 and doc.undo.count("end") == 1
+    assert handler.commit_stats["undo_groups"] == 1
+    assert handler.commit_stats["event_adds"] >= ticks
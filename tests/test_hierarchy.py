@@ -0,0 +1,34 @@
+from hierarchy import parent_first, placement_changes
+
+
+def group(plasticity_id, parent_id=0):
+    return {"id": plasticity_id, "parent_id": parent_id, "type": 5}
+
+
+def solid(plasticity_id, parent_id=0):
+    return {"id": plasticity_id, "parent_id": parent_id, "type": 0}
+
+
+def test_parent_first_orders_groups_before_children():
+    objects = [solid(1, 3), group(3, 2), group(2), solid(4)]
+    assert [o["id"] for o in parent_first(objects, 5)] == [2, 4, 3, 1]
+
+
+def test_parent_first_survives_cycles():
+    objects = [group(1, 2), group(2, 1), solid(3, 1)]
+    assert sorted(o["id"] for o in parent_first(objects, 5)) == [1, 2, 3]
+
+
+def test_placement_changes():
+    assert placement_changes(None, 0, 2) == (True, True)
+    assert placement_changes((1, 2), 1, 0) == (False, True)
+    assert placement_changes((1, 2), 3, 2) == (True, False)
+
+
+def test_parent_first_without_groups_keeps_the_list():
+    objects = [solid(2), solid(1)]
+    assert parent_first(objects, 5) is objects
+
+
+def test_placement_unchanged():
+    assert placement_changes((4, 6), 4, 6) == (False, False)
@@ -0,0 +1,69 @@
+import c4d
+import fake_c4d
+from apply_queue import ApplyQueue
+from scene_commit import SceneCommit
+
+
+def edits(commit, objects):
+    with commit:
+        for obj in objects:
+            commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+            yield
+
+
+def test_one_undo_group_and_event_add(doc):
+    objects = [c4d.BaseObject(c4d.Onull) for _ in range(3)]
+    with SceneCommit() as commit:
+        for obj in objects:
+            commit.touch(obj, c4d.UNDOTYPE_CHANGE)
+        commit.touch(objects[0])
+    assert doc.undo == ["start"] + [(c4d.UNDOTYPE_CHANGE, obj) for obj in objects] + ["end"]
+    assert fake_c4d.events["event_adds"] == 1
+    assert commit.stats == {"commits": 1, "event_adds": 1, "undo_groups": 1}
+
+
+def test_without_undo_only_redraws(doc):
+    with SceneCommit(undo=False) as commit:
+        commit.touch(c4d.BaseObject(c4d.Onull), c4d.UNDOTYPE_CHANGE)
+    assert doc.undo == []
+    assert commit.stats["event_adds"] == 1 and commit.stats["undo_groups"] == 0
+
+
+def test_nothing_touched_fires_nothing(doc):
+    with SceneCommit() as commit:
+        pass
+    assert doc.undo == [] and fake_c4d.events["event_adds"] == 0
+    assert commit.stats["commits"] == 1
+
+
+def test_group_stays_open_across_ticks(doc):
+    objects = [c4d.BaseObject(c4d.Onull) for _ in range(5)]
+    queue = ApplyQueue()
+    commit = SceneCommit()
+    queue.put(edits(commit, objects), commit.redraw)
+    ticks = 0
+    while queue.drain(1e-6):
+        ticks += 1
+    assert ticks >= 4
+    assert doc.undo.count("start") == 1 and doc.undo.count("end") == 1
+    assert doc.undo[0] == "start" and doc.undo[-1] == "end"
+    # Every paused tick drew its edits; nothing was left for the exit
+    assert fake_c4d.events["event_adds"] == ticks
+    assert SceneCommit.open_group is None
+
+
+def test_interrupting_commit_closes_the_open_group(doc):
+    first, second = c4d.BaseObject(c4d.Onull), c4d.BaseObject(c4d.Onull)
+    commit = SceneCommit()
+    work = edits(commit, [first, second])
+    next(work)
+    assert SceneCommit.open_group is commit
+    with SceneCommit() as selection:
+        selection.touch(first, c4d.UNDOTYPE_CHANGE_SELECTION)
+    for _ in work:
+        pass
+    # Three groups, never nested
+    assert doc.undo == ["start", (c4d.UNDOTYPE_CHANGE, first), "end",
+                        "start", (c4d.UNDOTYPE_CHANGE_SELECTION, first), "end",
+                        "start", (c4d.UNDOTYPE_CHANGE, second), "end"]
+    assert SceneCommit.open_group is None
@@ -0,0 +1,93 @@
+import numpy as np
+
+from topology import FaceIndex, face_colors, match_polygons, plasticity_edges
+
+
+def grid(columns, rows):
+    """Quad grid of columns x rows polygons in CPolygon layout, row-major."""
+    width = columns + 1
+    polygons = []
+    for row in range(rows):
+        for column in range(columns):
+            a = row * width + column
+            polygons.append((a, a + 1, a + width + 1, a + width))
+    return np.array(polygons, dtype=np.int32)
+
+
+def test_plasticity_edges_single_face_is_its_outline():
+    polygons = grid(2, 2)
+    edges = plasticity_edges(polygons, np.zeros(4, dtype=np.int32))
+    # Only the 8 outer edges; the 4 inner edges are shared by two polygons of the face
+    assert edges.tolist() == [0, 3, 4, 5, 10, 11, 13, 14]
+
+
+def test_plasticity_edges_between_faces():
+    polygons = grid(2, 1)
+    edges = plasticity_edges(polygons, np.array([0, 1]))
+    # Both polygons keep all four sides: the shared side separates the two faces
+    assert edges.tolist() == list(range(8))
+
+
+def test_plasticity_edges_triangles_skip_the_collapsed_side():
+    polygons = np.array([(0, 1, 2, 2), (0, 2, 3, 3)], dtype=np.int32)
+    edges = plasticity_edges(polygons, np.array([0, 0]))
+    assert edges.tolist() == [0, 1, 5, 7]
+    assert plasticity_edges(polygons, np.array([0, 1])).tolist() == [0, 1, 3, 4, 5, 7]
+
+
+def test_plasticity_edges_closed_cube():
+    polygons = np.array([(0, 1, 2, 3), (4, 7, 6, 5), (0, 4, 5, 1), (1, 5, 6, 2), (2, 6, 7, 3), (3, 7, 4, 0)])
+    assert plasticity_edges(polygons, np.zeros(6, dtype=np.int32)).tolist() == []
+    assert len(plasticity_edges(polygons, np.arange(6))) == 24
+
+
+def test_plasticity_edges_empty():
+    edges = plasticity_edges(np.zeros((0, 4), dtype=np.int32), np.zeros(0, dtype=np.int32))
+    assert edges.tolist() == []
+
+
+def test_face_index_maps_polygons_both_ways():
+    index = FaceIndex([1, 0, 1, -1, 0], [30, 40])
+    assert index.polygons_of([0]).tolist() == [1, 4]
+    assert index.polygons_of([1]).tolist() == [0, 2]
+    assert index.expand([True, False, False, False, False]).tolist() == [True, False, True, False, False]
+    assert index.expand([False, False, False, True, False]).tolist() == [False] * 5
+
+
+def test_face_index_from_groups():
+    index = FaceIndex.from_groups([0, 6, 6, 3], [7, 8], polygon_count=3)
+    assert index.polygon_faces.tolist() == [0, 0, 1]
+
+
+def test_match_polygons_after_reorder():
+    before = np.array([(0, 1, 2, 2), (2, 3, 4, 5), (5, 6, 7, 7)])
+    after = np.array([(6, 7, 5, 5), (0, 1, 2, 2), (3, 4, 5, 2)])
+    source = match_polygons(before, after)
+    assert source.tolist() == [2, 0, 1]
+    assert match_polygons(before, after[:2]) is None
+    assert match_polygons(before, np.array([(0, 1, 2, 2), (2, 3, 4, 5), (5, 6, 7, 8)])) is None
+
+
+def test_face_colors_are_stable_per_id():
+    colors = face_colors([5, 9, 5, 2 ** 32 - 1])
+    assert colors.shape == (4, 3) and colors.dtype == np.float32
+    assert np.array_equal(colors[0], colors[2])
+    assert not np.array_equal(colors[0], colors[1])
+    assert np.array_equal(face_colors([9]), colors[1:2])
+    # HSV with value 0.9 and saturation 0.55: the brightest channel is 0.9, the dimmest 0.405
+    assert np.allclose(colors.max(axis=1), 0.9) and np.allclose(colors.min(axis=1), 0.405)
+
+
+def test_polygon_colors_use_the_fallback_for_unknown_polygons():
+    index = FaceIndex([1, -1, 0], [30, 40])
+    colors = index.polygon_colors(fallback=(0.1, 0.2, 0.3))
+    palette = face_colors([30, 40])
+    assert np.array_equal(colors[0], palette[1]) and np.array_equal(colors[2], palette[0])
+    assert np.allclose(colors[1], (0.1, 0.2, 0.3))
+
+
+def test_face_index_from_refacet_groups_faces_by_index_range():
+    # Faces of 3, 4 and 5 indices start at 0, 3 and 7; the groups cover [0, 7) and [7, 12)
+    index = FaceIndex.from_refacet([0, 7, 7, 5], [11, 12], [3, 4, 5], np.array([0, 1, 2, 2, 2]))
+    assert index.polygon_faces.tolist() == [0, 0, 1, 1, 1]
+    assert index.polygons_of([1]).tolist() == [2, 3, 4]
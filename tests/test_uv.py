@@ -0,0 +1,90 @@
+import numpy as np
+
+from uv import chart_layouts, chart_uvs, polygon_normals, shelf_pack
+
+
+def cube():
+    """Unit cube as (8, 3) points and six outward-facing quads in CPolygon order."""
+    points = np.array([(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float64)
+    polygons = np.array([(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)])
+    return points, polygons
+
+
+def test_polygon_normals_quads_and_triangles():
+    points = np.array([(0, 0, 0), (2, 0, 0), (2, 1, 0), (0, 1, 0)], dtype=np.float64)
+    normals = polygon_normals(points, np.array([(0, 1, 2, 3), (0, 1, 2, 2), (0, 3, 2, 1)]))
+    # Twice the area along the normal: 4 for the 2x1 quad, 2 for its half
+    assert normals.tolist() == [[0, 0, 4], [0, 0, 2], [0, 0, -4]]
+
+
+def test_polygon_normals_of_a_cube_point_outward():
+    points, polygons = cube()
+    normals = polygon_normals(points, polygons)
+    centers = points[polygons].mean(axis=1) - 0.5
+    assert (np.einsum("ij,ij->i", normals, centers) > 0).all()
+
+
+def test_shelf_pack_keeps_rectangles_apart():
+    sizes = np.array([(1.0, 1.0), (0.5, 2.0), (1.0, 0.5), (0.25, 0.25)])
+    offsets, side = shelf_pack(sizes)
+    lows, highs = offsets, offsets + sizes
+    assert (lows >= 0).all() and (highs <= side + 1e-12).all()
+    for i in range(len(sizes)):
+        for j in range(i + 1, len(sizes)):
+            overlap = np.minimum(highs[i], highs[j]) - np.maximum(lows[i], lows[j])
+            assert (overlap <= 1e-12).any()
+    # Tallest first: the 2-high chart opens the first shelf
+    assert offsets[1].tolist() == [0.0, 0.0]
+
+
+def test_shelf_pack_empty():
+    offsets, side = shelf_pack(np.zeros((0, 2)))
+    assert offsets.shape == (0, 2) and side == 1.0
+
+
+def test_chart_uvs_one_chart_per_face():
+    points, polygons = cube()
+    polygon_faces = np.array([0, 1, 2, 3, 4, 5])
+    uvs = chart_uvs(points, polygons, polygon_faces)
+    assert uvs.shape == (6, 4, 2) and uvs.dtype == np.float32
+    assert (uvs >= 0).all() and (uvs <= 1).all()
+
+    # Six unit squares of equal size that don't overlap
+    lows, highs = uvs.min(axis=1), uvs.max(axis=1)
+    sizes = highs - lows
+    assert np.allclose(sizes, sizes[0])
+    for i in range(6):
+        for j in range(i + 1, 6):
+            overlap = np.minimum(highs[i], highs[j]) - np.maximum(lows[i], lows[j])
+            assert (overlap <= 1e-6).any()
+
+
+def test_chart_uvs_keeps_charts_unmirrored():
+    points, polygons = cube()
+    uvs = chart_uvs(points, polygons, np.arange(6)).astype(np.float64)
+    # Counter-clockwise outward quads stay counter-clockwise in UV space once v points up again
+    u, v = uvs[..., 0], 1.0 - uvs[..., 1]
+    areas = 0.5 * (u * np.roll(v, -1, axis=1) - np.roll(u, -1, axis=1) * v).sum(axis=1)
+    assert (areas > 0).all() or (areas < 0).all()
+
+
+def test_chart_uvs_shared_face_is_one_chart():
+    points = np.array([(0, 0, 0), (1, 0, 0), (2, 0, 0), (0, 1, 0), (1, 1, 0), (2, 1, 0)], dtype=np.float64)
+    polygons = np.array([(0, 1, 4, 3), (1, 2, 5, 4)])
+    uvs = chart_uvs(points, polygons, np.array([7, 7]))
+    # The shared corners land on the same UVs
+    assert np.allclose(uvs[0, 1], uvs[1, 0]) and np.allclose(uvs[0, 2], uvs[1, 3])
+    split = chart_uvs(points, polygons, np.array([-1, -1]))
+    assert not np.allclose(split[0, 1], split[1, 0])
+
+
+def test_chart_uvs_empty():
+    assert chart_uvs(np.zeros((0, 3)), np.zeros((0, 4), dtype=np.int32), np.zeros(0)).shape == (0, 4, 2)
+
+
+def test_chart_layouts_match_chart_uvs_in_order():
+    points, polygons = cube()
+    meshes = [(points * scale, polygons, np.arange(6) % faces) for scale, faces in ((1, 6), (2, 3), (3, 1))]
+    layouts = chart_layouts(meshes, max_workers=2)
+    for mesh, layout in zip(meshes, layouts):
+        assert np.array_equal(layout, chart_uvs(*mesh))
@@ -0,0 +1,149 @@
+# topology.py
+import numpy as np
+
+
+def _ranges(starts, counts):
+    """Concatenation of arange(start, start + count) for every pair, without a Python loop."""
+    counts = np.asarray(counts, dtype=np.int64)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(np.asarray(starts, dtype=np.int64), counts) + (np.arange(offsets.size, dtype=np.int64) - offsets)
+
+
+class FaceIndex:
+    """
+    CSR index from Plasticity B-rep faces to the C4D polygons they were
+    tessellated into. Face k has Plasticity id face_ids[k] and owns polygons
+    order[offsets[k]:offsets[k + 1]]; polygon_faces maps back (-1 when unknown).
+    The index is rebuilt with every mesh write, so `edges` caches the face
+    boundary edges (see plasticity_edges) and `painted` records a face color
+    pass for as long as the mesh is unchanged.
+    """
+
+    def __init__(self, polygon_faces, face_ids):
+        self.polygon_faces = np.asarray(polygon_faces, dtype=np.int32)
+        self.face_ids = np.asarray(face_ids, dtype=np.int32)
+        known = self.polygon_faces >= 0
+        self.order = np.flatnonzero(known)[np.argsort(self.polygon_faces[known], kind="stable")].astype(np.int32)
+        counts = np.bincount(self.polygon_faces[known], minlength=len(self.face_ids))
+        self.offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.edges = None
+        self.painted = False
+
+    def polygon_colors(self, fallback=(0.5, 0.5, 0.5)):
+        """(P, 3) float32 RGB per polygon from face_colors; polygons without a face get fallback."""
+        palette = np.vstack((face_colors(self.face_ids), np.asarray(fallback, dtype=np.float32)))
+        return palette[np.where(self.polygon_faces >= 0, self.polygon_faces, len(self.face_ids))]
+
+    @classmethod
+    def from_groups(cls, groups, face_ids, polygon_count):
+        """Triangle meshes: groups are (start, count) pairs over the flat triangle index buffer."""
+        groups = np.asarray(groups, dtype=np.int64).reshape(-1, 2)
+        polygon_faces = np.full(polygon_count, -1, dtype=np.int32)
+        counts = groups[:, 1] // 3
+        polygons = _ranges(groups[:, 0] // 3, counts)
+        valid = polygons < polygon_count
+        polygon_faces[polygons[valid]] = np.repeat(np.arange(len(groups), dtype=np.int32), counts)[valid]
+        return cls(polygon_faces, face_ids)
+
+    @classmethod
+    def from_refacet(cls, groups, face_ids, faces, polygon_faces):
+        """
+        Refacets: groups are (start, count) pairs over the CSR index buffer; each
+        refacet face (and so each polygon built from it) falls in one group.
+        """
+        groups = np.asarray(groups, dtype=np.int64).reshape(-1, 2)
+        face_starts = np.zeros(len(faces), dtype=np.int64)
+        np.cumsum(np.asarray(faces, dtype=np.int64)[:-1], out=face_starts[1:])
+        order = np.argsort(groups[:, 0], kind="stable")
+        slot = np.searchsorted(groups[order, 0], face_starts, side="right") - 1
+        face_groups = np.where(slot >= 0, order[np.maximum(slot, 0)], -1)
+        # A start past the end of its group range belongs to no group
+        inside = (slot >= 0) & (face_starts < groups[np.maximum(face_groups, 0), 0] + groups[np.maximum(face_groups, 0), 1])
+        face_groups = np.where(inside, face_groups, -1).astype(np.int32)
+        return cls(face_groups[np.asarray(polygon_faces)], face_ids)
+
+    def polygons_of(self, faces):
+        """Polygon indices of the given face slots (not Plasticity ids)."""
+        faces = np.asarray(faces, dtype=np.int64)
+        starts = self.offsets[faces]
+        return self.order[_ranges(starts, self.offsets[faces + 1] - starts)]
+
+    def expand(self, selected):
+        """(P,) bool polygon selection -> the same, grown to whole Plasticity faces."""
+        faces = np.unique(self.polygon_faces[np.asarray(selected, dtype=bool)])
+        mask = np.zeros(len(self.polygon_faces), dtype=bool)
+        mask[self.polygons_of(faces[faces >= 0])] = True
+        return mask
+
+
+def match_polygons(before, after):
+    """
+    For (P, 4) CPolygons `after` that should hold the same corner sets as
+    `before` in any order and winding (e.g. after a melt), returns source with
+    after[i] ~ before[source[i]], or None when they don't match. Triangles
+    (c == d) compare by their three corners, whichever one is repeated.
+    """
+    def corners(polygons):
+        polygons = np.array(polygons, dtype=np.int64).reshape(-1, 4)
+        polygons[polygons[:, 2] == polygons[:, 3], 3] = -1
+        return np.sort(polygons, axis=1)
+
+    before = corners(before)
+    after = corners(after)
+    if before.shape != after.shape:
+        return None
+    order_before = np.lexsort(before.T[::-1])
+    order_after = np.lexsort(after.T[::-1])
+    if not np.array_equal(before[order_before], after[order_after]):
+        return None
+    source = np.empty(len(after), dtype=np.int64)
+    source[order_after] = order_before
+    return source
+
+
+def plasticity_edges(polygons, polygon_faces):
+    """
+    C4D edge indices (4 * polygon + side) lying on Plasticity face boundaries:
+    edges whose polygons belong to different faces, plus open edges. polygons
+    is (P, 4) in CPolygon order; triangles (c == d) have no side 2.
+    """
+    polygons = np.asarray(polygons, dtype=np.int64).reshape(-1, 4)
+    polygon_faces = np.asarray(polygon_faces, dtype=np.int64)
+    start = polygons
+    end = np.roll(polygons, -1, axis=1)  # sides (a,b), (b,c), (c,d), (d,a)
+    valid = start != end
+    edge_ids = np.flatnonzero(valid)  # row-major, so already 4 * polygon + side
+    if not len(edge_ids):
+        return edge_ids
+    a, b = start[valid], end[valid]
+    keys = np.minimum(a, b) * (int(polygons.max(initial=0)) + 1) + np.maximum(a, b)
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    faces = polygon_faces[edge_ids[order] >> 2]
+    run_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    run_lengths = np.diff(np.r_[run_starts, len(keys)])
+    boundary = ((run_lengths == 1)
+                | (np.minimum.reduceat(faces, run_starts) != np.maximum.reduceat(faces, run_starts)))
+    return np.sort(edge_ids[order][np.repeat(boundary, run_lengths)])
+
+
+def face_colors(face_ids, saturation=0.55, value=0.9):
+    """
+    (F, 3) float32 RGB per Plasticity face id. The hue comes from a
+    multiplicative hash of the id, so a face keeps its color across updates.
+    """
+    hashed = (np.asarray(face_ids, dtype=np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+    hue = (hashed.astype(np.float64) / 2.0 ** 32) * 6.0
+    sector = hue.astype(np.int64) % 6
+    fraction = hue - np.floor(hue)
+    p = value * (1.0 - saturation)
+    q = value * (1.0 - saturation * fraction)
+    t = value * (1.0 - saturation * (1.0 - fraction))
+    v = np.full_like(hue, value)
+    # Standard HSV sectors, picked per face
+    r = np.choose(sector, (v, q, p, p, t, v))
+    g = np.choose(sector, (t, v, v, q, p, p))
+    b = np.choose(sector, (p, p, t, v, v, q))
+    return np.stack((r, g, b), axis=1).astype(np.float32)
@@ -0,0 +1,101 @@
+# uv.py
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Per projection axis (X, Y, Z): the point axes used for u and v, and the u sign
+# that keeps a chart unmirrored when seen from the positive side of its axis
+_U_AXES = np.array([2, 0, 0])
+_V_AXES = np.array([1, 2, 1])
+_U_SIGNS = np.array([1.0, 1.0, -1.0])
+
+
+def polygon_normals(points, polygons):
+    """(P, 3) area-weighted normals of (P, 4) CPolygons; for triangles (c == d) the diagonals still span the face."""
+    corners = points[polygons]
+    return np.cross(corners[:, 2] - corners[:, 0], corners[:, 3] - corners[:, 1])
+
+
+def _runs(sorted_labels):
+    """Start index of every run of equal values in a sorted array."""
+    return np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+
+
+def shelf_pack(sizes):
+    """
+    Packs (C, 2) rectangles into rows, tallest first, aiming for a square.
+    Returns ((C, 2) offsets, side length of the square they fit in).
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    offsets = np.zeros_like(sizes)
+    if not len(sizes):
+        return offsets, 1.0
+    widths, heights = sizes[:, 0].tolist(), sizes[:, 1].tolist()
+    row_width = max(float(np.sqrt((sizes[:, 0] * sizes[:, 1]).sum())), max(widths))
+
+    x = y = shelf_height = used_width = 0.0
+    for chart in np.argsort(-sizes[:, 1], kind="stable").tolist():
+        if x > 0.0 and x + widths[chart] > row_width:
+            y += shelf_height
+            x = shelf_height = 0.0
+        offsets[chart] = (x, y)
+        x += widths[chart]
+        used_width = max(used_width, x)
+        shelf_height = max(shelf_height, heights[chart])
+    return offsets, max(used_width, y + shelf_height) or 1.0
+
+
+def chart_uvs(points, polygons, polygon_faces, margin=0.004):
+    """
+    Auto UV layout with one chart per Plasticity face. Each chart is projected
+    along the dominant axis of its summed normal, then all charts are shelf
+    packed into the unit square at their relative scale. polygons is (P, 4) in
+    CPolygon order; polygons without a face (-1) become charts of their own.
+    Returns (P, 4, 2) float32 UVs, v pointing down as in C4D.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    polygons = np.asarray(polygons, dtype=np.int64).reshape(-1, 4)
+    polygon_count = len(polygons)
+    if not polygon_count:
+        return np.zeros((0, 4, 2), dtype=np.float32)
+    polygon_faces = np.asarray(polygon_faces, dtype=np.int64)
+    faces = np.where(polygon_faces >= 0, polygon_faces, polygon_faces.max(initial=0) + 1 + np.arange(polygon_count))
+    _, chart = np.unique(faces, return_inverse=True)
+    chart = chart.ravel()
+
+    normals = polygon_normals(points, polygons)
+    chart_normals = np.stack([np.bincount(chart, weights=normals[:, axis]) for axis in range(3)], axis=1)
+    axis = np.argmax(np.abs(chart_normals), axis=1)
+    flip = np.where(chart_normals[np.arange(len(axis)), axis] < 0.0, -1.0, 1.0) * _U_SIGNS[axis]
+
+    corners = points[polygons]  # (P, 4, 3)
+    rows = np.arange(polygon_count)[:, None]
+    uv = np.empty((polygon_count, 4, 2), dtype=np.float64)
+    uv[..., 0] = corners[rows, np.arange(4), _U_AXES[axis][chart][:, None]] * flip[chart][:, None]
+    uv[..., 1] = corners[rows, np.arange(4), _V_AXES[axis][chart][:, None]]
+
+    # Chart bounds: reduce per polygon, then per chart over the chart-sorted polygons
+    order = np.argsort(chart, kind="stable")
+    starts = _runs(chart[order])
+    lows = np.minimum.reduceat(uv.min(axis=1)[order], starts)
+    highs = np.maximum.reduceat(uv.max(axis=1)[order], starts)
+    sizes = highs - lows
+    padding = margin * max(float(np.sqrt((sizes[:, 0] * sizes[:, 1]).sum())), float(sizes.max()), 1e-12)
+
+    offsets, side = shelf_pack(sizes + 2.0 * padding)
+    uv += (offsets + padding - lows)[chart][:, None, :]
+    uv /= side
+    uv[..., 1] = 1.0 - uv[..., 1]
+    return uv.astype(np.float32)
+
+
+def chart_layouts(meshes, max_workers=None):
+    """
+    chart_uvs for many (points, polygons, polygon_faces) meshes on a thread pool;
+    the NumPy work releases the GIL. Results come back in input order.
+    """
+    meshes = list(meshes)
+    if len(meshes) < 2:
+        return [chart_uvs(*mesh) for mesh in meshes]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda mesh: chart_uvs(*mesh), meshes))